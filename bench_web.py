@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Web APIの負荷テスト用スクリプト（同時リクエスト時のレイテンシを計測）"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from web.app import app
+
+
+async def run_load(paths, concurrency, total):
+    """paths をラウンドロビンで total 件、同時 concurrency 件で叩く"""
+    latencies = {path: [] for path in paths}
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                path = paths[i % len(paths)]
+                response = await client.get(path)
+                latencies[path].append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    print(f"requests: {total}  concurrency: {concurrency}")
+    print(f"throughput: {total / elapsed:.1f} req/s")
+    print_latency('all', sorted(sum(latencies.values(), [])))
+    # 遅いエンドポイントが軽いエンドポイントを巻き込んでいないかパスごとにも出す
+    if len(paths) > 1:
+        for path in paths:
+            print_latency(path, sorted(latencies[path]))
+
+
+def print_latency(label, latencies):
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    print(f"  {label}: p50={pct(0.50):.1f}ms  p90={pct(0.90):.1f}ms  p99={pct(0.99):.1f}ms  max={latencies[-1]:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('paths', nargs='*', default=['/api/articles?limit=50', '/'])
+    args = parser.parse_args()
+
+    async def run():
+        # startupイベントを実行してからリクエストを送る
+        async with app.router.lifespan_context(app):
+            await run_load(args.paths, args.concurrency, args.requests)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
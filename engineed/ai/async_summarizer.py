@@ -0,0 +1,65 @@
+import logging
+from twisted.internet import defer, threads
+from twisted.python.threadpool import ThreadPool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSummarizer:
+    """要約生成をリアクタースレッドの外で並行実行する
+
+    OpenAI APIへのブロッキング呼び出しを専用スレッドプールで実行し、
+    Deferredを返す。同時実行数は max_in_flight で制限し、timeout 秒を
+    超えた要求や失敗した要求は _simple_summary にフォールバックする。
+    """
+
+    def __init__(self, keyword_extractor, max_in_flight=4, timeout=30.0):
+        self.keyword_extractor = keyword_extractor
+        self.timeout = timeout
+        self.semaphore = defer.DeferredSemaphore(max_in_flight)
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=max_in_flight, name='summarizer')
+        self.fallback_count = 0
+        self._pending = set()
+
+    def start(self):
+        self.threadpool.start()
+
+    def stop(self):
+        """実行中の要約の完了（またはタイムアウトによるフォールバック）を待ってプールを止めるDeferred
+
+        ThreadPool.stop() はワーカースレッドの終了を待つため（タイムアウト後もAPI呼び出しが
+        残っている場合がある）、リアクタースレッドではなくリアクターのスレッドプールで呼ぶ。
+        """
+        from twisted.internet import reactor
+
+        d = defer.DeferredList(list(self._pending))
+        d.addCallback(lambda _: reactor.callInThread(self.threadpool.stop))
+        return d
+
+    def summarize(self, content):
+        """(要約, キャッシュキー) を返すDeferred"""
+        d = self.semaphore.run(self._summarize, content)
+        self._pending.add(d)
+
+        def forget(result):
+            self._pending.discard(d)
+            return result
+        d.addBoth(forget)
+        return d
+
+    def _summarize(self, content):
+        from twisted.internet import reactor
+
+        d = threads.deferToThreadPool(
+            reactor, self.threadpool,
+            self.keyword_extractor.generate_summary_with_key, content,
+            timeout=self.timeout, raise_errors=True,
+        )
+        d.addTimeout(self.timeout, reactor)
+        d.addErrback(self._fallback, content)
+        return d
+
+    def _fallback(self, failure, content):
+        self.fallback_count += 1
+        logger.warning(f"Summary generation failed, using simple summary: {failure.value!r}")
+        return self.keyword_extractor._simple_summary(content), None
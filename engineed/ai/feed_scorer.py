@@ -0,0 +1,185 @@
+import math
+import time
+import logging
+from datetime import datetime, timezone
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 時間減衰の基準時刻。スコアは差だけに意味があるため任意の固定時刻でよい
+SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# load() が返す構造化配列の列
+SCORE_COLUMNS = np.dtype([
+    ('id', '<i8'),
+    ('engagement', '<f8'),
+    ('published', '<i8'),
+    ('source', '<i8'),
+    ('source_mean', '<f8'),
+    ('tag_popularity', '<f8'),
+    ('current', '<f8'),
+])
+
+
+class FeedScorer:
+    """Article.tech_feed_score をNumPyでまとめて計算する
+
+    score = ln(1 + ソース内相対エンゲージメント) + ln(1 + タグ人気度ボーナス)
+            + ln2 * (公開時刻 - SCORE_EPOCH) / 半減期
+
+    公開時刻の項で時間減衰を表す（半減期が経つごとに、同じ品質の新しい記事との
+    差が ln2 だけ開く）。計算時刻に依存しないため、一部の記事だけを
+    再計算しても全体の順位と矛盾しない。
+    """
+
+    def __init__(self, like_weight=1.0, comment_weight=2.0, view_weight=0.01,
+                 tag_weight=0.5, half_life_hours=48.0):
+        self.like_weight = like_weight
+        self.comment_weight = comment_weight
+        self.view_weight = view_weight
+        self.tag_weight = tag_weight
+        self.half_life_hours = half_life_hours
+
+    def score(self, session, since=None, article_ids=None):
+        """記事のスコアを計算し、値が変わった記事だけを一括UPDATEして更新件数を返す
+
+        since（scraped_at の下限）か article_ids を指定した場合はその記事だけを対象にする。
+        近似重複の記事（canonical_id あり）は一覧に出ないためスコアを計算しない。
+        """
+        started = time.monotonic()
+        cursor = session.connection().connection.cursor()
+        try:
+            columns = self.load(cursor, since=since, article_ids=article_ids)
+            if len(columns) == 0:
+                return 0
+
+            scores = self.compute(columns)
+            # スコアは計算時刻に依存しないため、前回から変わらない記事は書き込まない
+            changed = ~np.isclose(scores, columns['current'], rtol=0.0, atol=1e-6)
+            self.write(cursor, columns['id'][changed], scores[changed])
+        finally:
+            cursor.close()
+
+        logger.info(
+            f"Scored {len(scores)} articles ({int(changed.sum())} changed) "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return int(changed.sum())
+
+    def _engagement_sql(self):
+        """いいね・コメント・閲覧数の重み付き和（SQL式）"""
+        return (
+            f"coalesce(like_count, 0) * {self.like_weight} "
+            f"+ coalesce(comment_count, 0) * {self.comment_weight} "
+            f"+ coalesce(view_count, 0) * {self.view_weight}"
+        )
+
+    def load(self, cursor, since=None, article_ids=None):
+        """スコア計算に使う値をNumPyの構造化配列（id順）として読み込む
+
+        ORMを介さずDBAPIカーソルから数値列だけを取り出し、ソース平均・
+        タグ人気度はそれぞれ集計クエリ1回で求めて配列上で突き合わせる。
+        公開日時が無い記事は初回保存時刻（再取得でも変わらない）を公開時刻とみなす。
+        """
+        where, params = self._conditions(since, article_ids)
+        if where is None:
+            return np.zeros(0, dtype=SCORE_COLUMNS)
+
+        cursor.execute(f"SELECT DISTINCT source_site FROM articles {where}", params)
+        sources = [row[0] for row in cursor.fetchall()]
+        if not sources:
+            # 対象の記事が1件も無い（空の CASE 式はSQLの構文エラーになる）
+            return np.zeros(0, dtype=SCORE_COLUMNS)
+        source_code = "CASE source_site " + " ".join(
+            f"WHEN ? THEN {code}" for code in range(len(sources))
+        ) + " ELSE 0 END"
+
+        canonical_where = f"{where} AND canonical_id IS NULL" if where else "WHERE canonical_id IS NULL"
+        cursor.execute(
+            f"SELECT id, {self._engagement_sql()}, "
+            "coalesce(CAST(strftime('%s', coalesce(published_at, first_seen_at, scraped_at)) AS INTEGER), ?), "
+            f"{source_code}, 0, 0, coalesce(tech_feed_score, 0) "
+            f"FROM articles {canonical_where} ORDER BY id",
+            [int(SCORE_EPOCH.timestamp())] + sources + params,
+        )
+        columns = np.array(cursor.fetchall(), dtype=SCORE_COLUMNS)
+        if len(columns) == 0:
+            return columns
+
+        means = self._source_means(cursor, sources, partial=bool(where))
+        source_means = np.array([means.get(source) or 0.0 for source in sources] or [0.0])
+        columns['source_mean'] = source_means[columns['source']]
+
+        # 記事ごとのタグ平均人気度をid順の配列に合わせる
+        tag_where = f"WHERE at.article_id IN (SELECT id FROM articles {where})" if where else ""
+        cursor.execute(
+            "SELECT at.article_id, avg(t.popularity_score) FROM article_tags at "
+            f"JOIN tech_tags t ON t.id = at.tag_id {tag_where} "
+            "GROUP BY at.article_id ORDER BY at.article_id",
+            params,
+        )
+        tag_rows = np.array(cursor.fetchall(), dtype=[('id', '<i8'), ('popularity', '<f8')])
+        if len(tag_rows):
+            positions = np.clip(np.searchsorted(tag_rows['id'], columns['id']), 0, len(tag_rows) - 1)
+            matched = tag_rows['id'][positions] == columns['id']
+            columns['tag_popularity'][matched] = np.nan_to_num(tag_rows['popularity'][positions[matched]])
+        return columns
+
+    def _source_means(self, cursor, sources, partial):
+        """ソースごとの平均エンゲージメント（そのソースの全記事で集計する）
+
+        全件の再計算ではインデックスを使わない全件走査、部分更新では対象記事のソースだけを
+        source_site のインデックスで読む。
+        """
+        if partial:
+            cursor.execute(
+                f"SELECT source_site, avg({self._engagement_sql()}) FROM articles "
+                f"WHERE source_site IN ({', '.join('?' * len(sources))}) GROUP BY source_site",
+                sources,
+            )
+        else:
+            cursor.execute(
+                f"SELECT source_site, avg({self._engagement_sql()}) FROM articles NOT INDEXED GROUP BY source_site"
+            )
+        return dict(cursor.fetchall())
+
+    def _conditions(self, since, article_ids):
+        """対象記事を絞り込むWHERE句とパラメータ（対象が空なら WHERE句は None）"""
+        conditions, params = [], []
+        if since is not None:
+            # DateTime列と同じ書式の文字列で比較する
+            conditions.append("scraped_at >= ?")
+            params.append(since.strftime('%Y-%m-%d %H:%M:%S.%f'))
+        if article_ids is not None:
+            article_ids = [int(article_id) for article_id in article_ids]
+            if not article_ids:
+                return None, params
+            conditions.append(f"id IN ({', '.join('?' * len(article_ids))})")
+            params.extend(article_ids)
+        return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def compute(self, columns):
+        """1回のベクトル演算で全記事のスコアを求める"""
+        # ソース間で反応の桁が違うため、ソース平均との比で正規化する
+        relative = columns['engagement'] / (columns['source_mean'] + 1.0)
+        popularity = np.clip(columns['tag_popularity'], 0, 100) / 100.0
+        age_term = (columns['published'] - SCORE_EPOCH.timestamp()) / (self.half_life_hours * 3600)
+        scores = np.log1p(relative) + np.log1p(self.tag_weight * popularity) + math.log(2) * age_term
+        return np.round(scores, 6)
+
+    def write(self, cursor, article_ids, scores):
+        """スコアを一括UPDATE"""
+        if len(article_ids):
+            cursor.executemany(
+                "UPDATE articles SET tech_feed_score = ? WHERE id = ?",
+                zip(scores.tolist(), article_ids.tolist()),
+            )
+
+
+_scorers = {}
+
+def get_feed_scorer(half_life_hours=48.0):
+    """プロセス内で共有されるFeedScorerを取得"""
+    if half_life_hours not in _scorers:
+        _scorers[half_life_hours] = FeedScorer(half_life_hours=half_life_hours)
+    return _scorers[half_life_hours]
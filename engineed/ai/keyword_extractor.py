@@ -1,60 +1,89 @@
 import re
-import spacy
-from collections import Counter
-from engineed.utils.tech_keywords import TechKeywordManager
-import openai
-import os
+import hashlib
+import unicodedata
+from engineed.utils.tech_keywords import get_keyword_manager
+from engineed.ai.model_registry import get_model_registry
+
+# 要約のモデル・プロンプト（変更時は SUMMARY_PROMPT_VERSION を上げてキャッシュを無効化）
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_PROMPT_VERSION = 1
+SUMMARY_SYSTEM_PROMPT = "あなたは技術記事の要約を作成するAIです。記事の要点を3-5文で簡潔にまとめてください。"
+
+# 新しいキーワードの発見に使うパターン
+TECH_TERM_PATTERNS = [
+    re.compile(r'\b[A-Z][a-z]*(?:[A-Z][a-z]*)*\b'),  # CamelCase
+    re.compile(r'\b[A-Z]+(?:\.[A-Z]+)*\b'),  # 略語 (API, REST等)
+    re.compile(r'\b\w+\.(js|py|rb|go|rs|java|kt|swift)\b'),  # ファイル拡張子
+]
+
+# 新語の候補にする語の形（2文字目以降に大文字・数字・. を含む: GraphQL, API, Next.js 等）
+# 文頭などで大文字で始まるだけの英単語（However, Today 等）は候補にしない
+CANDIDATE_SHAPE = re.compile(r'.[A-Z0-9.]')
+
+# 候補の形に当てはまる一般的な英単語（新語の候補にしない）
+CANDIDATE_STOPWORDS = frozenset("""
+the this that these those there then than and but for not you your our all any are was were
+with from into when where what which who why how has have had can will may should would could
+its also just only some such each more most other over under after before about again here
+let now new next first last use using used get set see note step part true false none null todo fixme
+""".split())
 
 class TechKeywordExtractor:
     """技術キーワード抽出とAI機能"""
     
-    def __init__(self):
-        self.keyword_manager = TechKeywordManager()
-        self.tech_keywords = set(kw.lower() for kw in self.keyword_manager.get_all_keywords())
-        
-        # OpenAI設定
-        self.openai_client = None
-        if os.getenv('OPENAI_API_KEY'):
-            openai.api_key = os.getenv('OPENAI_API_KEY')
-            self.openai_client = openai.OpenAI()
+    def __init__(self, summary_cache=None):
+        self.keyword_manager = get_keyword_manager()
+        self.summary_cache = summary_cache
         
-        # spaCyモデル（日本語）
-        try:
-            self.nlp = spacy.load("ja_core_news_sm")
-        except OSError:
-            print("Warning: Japanese spaCy model not found. Install with: python -m spacy download ja_core_news_sm")
-            self.nlp = None
+        # spaCy・OpenAIは実際に使われた時点でレジストリからロード（プロセス内で共有）
+        self.model_registry = get_model_registry()
+    
+    @property
+    def openai_client(self):
+        """OpenAIクライアント"""
+        return self.model_registry.get('openai')
+    
+    @property
+    def nlp(self):
+        """spaCyモデル（日本語）"""
+        return self.model_registry.get('spacy_ja')
     
     def extract_keywords(self, text):
         """テキストから技術キーワードを抽出"""
+        return self.extract_keywords_with_candidates(text)[0]
+    
+    def extract_keywords_with_candidates(self, text):
+        """技術キーワードと、キーワード辞書に無い新語の候補（小文字→出現形のdict）を抽出"""
         if not text:
-            return []
+            return [], {}
         
-        text_lower = text.lower()
+        # 既知のキーワードを1回の走査でマッチング（出現回数つき）
+        matcher = self.keyword_manager.get_matcher()
+        keyword_counts = matcher.count(text)
         found_keywords = []
-        
-        # 既知のキーワードをマッチング
-        for keyword in self.tech_keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
+        candidates = {}
         
         # 新しいキーワードの発見（大文字で始まる技術用語など）
-        tech_patterns = [
-            r'\b[A-Z][a-z]*(?:[A-Z][a-z]*)*\b',  # CamelCase
-            r'\b[A-Z]+(?:\.[A-Z]+)*\b',  # 略語 (API, REST等)
-            r'\b\w+\.(js|py|rb|go|rs|java|kt|swift)\b',  # ファイル拡張子
-        ]
-        
-        for pattern in tech_patterns:
-            matches = re.findall(pattern, text)
-            found_keywords.extend([m.lower() for m in matches if len(m) > 2])
+        for pattern in TECH_TERM_PATTERNS:
+            for match in pattern.finditer(text):
+                value = match.group(1) if pattern.groups else match.group(0)
+                if len(value) > 2:
+                    found_keywords.append(value.lower())
+                term = match.group(0)
+                key = term.lower()
+                if (len(term) > 2 and CANDIDATE_SHAPE.search(term)
+                        and key not in matcher.keyword_set and key not in CANDIDATE_STOPWORDS):
+                    candidates.setdefault(key, term)
         
         # 重複除去と頻度ソート
-        keyword_counts = Counter(found_keywords)
-        return [kw for kw, count in keyword_counts.most_common(10)]
+        keyword_counts.update(found_keywords)
+        return [kw for kw, count in keyword_counts.most_common(10)], candidates
     
-    def estimate_difficulty(self, text):
-        """記事の難易度を推定（1-5）"""
+    def estimate_difficulty(self, text, code_block_count=None):
+        """記事の難易度を推定（1-5）
+
+        code_block_count: HTML抽出時に数えたコードブロック数（省略時はMarkdownのフェンスを数える）
+        """
         if not text:
             return 1
         
@@ -72,8 +101,9 @@ class TechKeywordExtractor:
                 difficulty_score += 0.5
         
         # コードブロックの複雑さ
-        code_blocks = re.findall(r'```[\s\S]*?```', text)
-        if len(code_blocks) > 3:
+        if code_block_count is None:
+            code_block_count = len(re.findall(r'```[\s\S]*?```', text))
+        if code_block_count > 3:
             difficulty_score += 1
         
         # 文章の長さ
@@ -93,25 +123,61 @@ class TechKeywordExtractor:
         text_lower = text.lower()
         return any(indicator in text_lower for indicator in tutorial_indicators)
     
-    def generate_summary(self, content):
-        """AI要約生成"""
+    def summary_key(self, content):
+        """正規化した本文・モデル・プロンプト版数から要約キャッシュのキーを算出"""
+        model = SUMMARY_MODEL if self.openai_client else 'simple'
+        normalized = ' '.join(unicodedata.normalize('NFKC', content or '').split())
+        source = f"{model}\0{SUMMARY_PROMPT_VERSION}\0{normalized}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+    
+    def cached_summary(self, summary_key):
+        """キャッシュ済みのAI要約を取得（無ければ None）"""
+        if self.summary_cache is None or not self.openai_client:
+            return None
+        return self.summary_cache.get(summary_key)
+    
+    def generate_summary(self, content, timeout=None):
+        """AI要約生成（timeout: API呼び出しのタイムアウト秒）"""
+        return self.generate_summary_with_key(content, timeout=timeout)[0]
+    
+    def generate_summary_with_key(self, content, timeout=None, raise_errors=False):
+        """要約とキャッシュキーを返す（API失敗でフォールバックした場合のキーは None）
+
+        raise_errors=True の場合はフォールバックせずAPIの例外をそのまま送出する
+        （AsyncSummarizer がフォールバックと件数の記録を行う）。
+        """
         if not self.openai_client or not content:
-            return self._simple_summary(content)
+            # 抽出による要約は毎回作っても安いためキャッシュしない（キーは要約元の本文の識別に使う）
+            summary = self._simple_summary(content)
+            return summary, self.summary_key(content) if content and summary else None
         
         try:
             response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=SUMMARY_MODEL,
                 messages=[
-                    {"role": "system", "content": "あなたは技術記事の要約を作成するAIです。記事の要点を3-5文で簡潔にまとめてください。"},
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                     {"role": "user", "content": f"以下の技術記事を要約してください:\n\n{content[:2000]}"}
                 ],
                 max_tokens=200,
-                temperature=0.3
+                temperature=0.3,
+                timeout=timeout
             )
-            return response.choices[0].message.content.strip()
+            summary = response.choices[0].message.content.strip()
+            return summary, self._store_summary(content, summary)
         except Exception as e:
+            if raise_errors:
+                raise
+            # フォールバックの要約はキャッシュしない（次回API成功時に置き換えるため）
             print(f"OpenAI API error: {e}")
-            return self._simple_summary(content)
+            return self._simple_summary(content), None
+    
+    def _store_summary(self, content, summary):
+        if not content or not summary:
+            return None
+        key = self.summary_key(content)
+        if self.summary_cache is not None:
+            self.summary_cache.put(key, summary)
+        return key
     
     def _simple_summary(self, content):
         """シンプルな要約（最初の数文を抽出）"""
@@ -0,0 +1,110 @@
+import logging
+import os
+import resource
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """プロセス内で共有するモデルの遅延ロードレジストリ
+
+    モデルは最初に get() された時点でロードされ、以降は同じインスタンスを返す。
+    ロードに失敗した（None を返した）場合も結果をキャッシュし、再試行しない。
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        """モデル名とロード関数を登録"""
+        self._loaders[name] = loader
+
+    def get(self, name):
+        """モデルを取得（未ロードならここでロード）"""
+        if name in self._models:
+            return self._models[name]
+
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+        return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """指定モデル（省略時は登録済み全モデル）を事前ロード"""
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def report(self):
+        """モデルごとのロード時間（秒）と常駐メモリ増分（MB）"""
+        return dict(self._stats)
+
+    def _load(self, name):
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        rss_before = _current_rss_mb()
+        started = time.monotonic()
+        model = self._loaders[name]()
+        load_seconds = time.monotonic() - started
+        rss_delta = _current_rss_mb() - rss_before
+
+        self._stats[name] = {
+            'loaded': model is not None,
+            'load_seconds': round(load_seconds, 3),
+            'rss_delta_mb': round(rss_delta, 1),
+        }
+        logger.info(
+            f"Loaded model '{name}' in {load_seconds:.2f}s (+{rss_delta:.1f} MB RSS)"
+        )
+        return model
+
+
+def _current_rss_mb():
+    """現在の常駐メモリ（MB）"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # /proc が無い環境ではピークRSSで代用（Linux: KB単位）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_spacy_ja():
+    """spaCy日本語モデル"""
+    try:
+        import spacy
+        return spacy.load("ja_core_news_sm")
+    except (ImportError, OSError):
+        print("Warning: Japanese spaCy model not found. Install with: python -m spacy download ja_core_news_sm")
+        return None
+
+
+def _load_openai_client():
+    """OpenAIクライアント（APIキー未設定時は None）"""
+    if not os.getenv('OPENAI_API_KEY'):
+        return None
+
+    import openai
+    openai.api_key = os.getenv('OPENAI_API_KEY')
+    return openai.OpenAI()
+
+
+_registry = None
+
+def get_model_registry():
+    """プロセス内で共有されるModelRegistryを取得"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+        _registry.register('spacy_ja', _load_spacy_ja)
+        _registry.register('openai', _load_openai_client)
+    return _registry
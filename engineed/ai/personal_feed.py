@@ -0,0 +1,323 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from engineed.models.database import Article, TechTag, User, ReadRecord, user_interests
+from engineed.models.queries import listing_select, attach_tag_names
+from engineed.utils.tag_aliases import get_tag_alias_map
+from engineed import settings
+
+logger = logging.getLogger(__name__)
+
+# 記事の活動時刻（公開日時、無ければ初回保存時刻）。式インデックスで期間を絞り込む
+ACTIVITY_AT = "coalesce(a.published_at, a.first_seen_at)"
+
+MAX_FEED_SIZE = 100
+
+
+class PostingIndex:
+    """直近の記事のタグ別ポスティングリスト（構築後は変更しない）
+
+    記事は id 順の配列に並べ、タグごとにその配列上の位置を持つ。
+    """
+
+    def __init__(self, ids, difficulty, quality, tag_norm, postings):
+        self.ids = ids
+        self.difficulty = difficulty
+        self.quality = quality  # tech_feed_score を期間内で0-1に正規化した値
+        self.tag_norm = tag_norm  # 1 / sqrt(記事のタグ数)。タグの多い記事が有利にならないようにする
+        self.postings = postings
+        self.built_at = time.monotonic()
+
+
+class UserProfile:
+    """ユーザーの興味ベクトル（タグID→重み）と既読記事ID（構築後は変更しない）"""
+
+    def __init__(self, experience_level, tag_ids, weights, read_ids):
+        self.experience_level = experience_level
+        self.tag_ids = tag_ids
+        self.weights = weights
+        self.read_ids = read_ids
+        self.built_at = time.monotonic()
+
+
+class PersonalFeed:
+    """ユーザーごとのパーソナルフィードをメモリ上のキャッシュから求める
+
+    ユーザーの興味ベクトルは明示的な興味タグ（User.interested_tags）と、
+    既読記事のタグを読了率・評価で重み付けした値の和。直近 window_days 日の
+    記事（近似重複を除く）のタグ別ポスティングリストと突き合わせ、候補記事だけを集計して上位を返す。
+
+    興味ベクトル・既読記事はユーザーごとにキャッシュし、既読・興味タグの変更時に
+    invalidate_user() で破棄する（他プロセスからの変更に備え profile_ttl でも破棄）。
+    ポスティングリストは postings_ttl ごとに作り直す。
+    """
+
+    def __init__(self, window_days=14, postings_ttl=300.0, profile_ttl=600.0, max_profiles=10000,
+                 interest_weight=1.0, history_weight=1.0, quality_weight=0.5):
+        self.window_days = window_days
+        self.postings_ttl = postings_ttl
+        self.profile_ttl = profile_ttl
+        self.max_profiles = max_profiles
+        self.interest_weight = interest_weight
+        self.history_weight = history_weight
+        self.quality_weight = quality_weight
+
+        self._index = None
+        self._profiles = OrderedDict()
+        self._version = 0  # invalidate のたびに進め、構築中に無効化されたプロファイルを保存しない
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+
+    def feed(self, session, user_id, limit=20, difficulty_level=None):
+        """ユーザー向けのおすすめ記事一覧（ユーザーが存在しなければ None）
+
+        difficulty_level を指定しない場合はユーザーの経験レベル+1までの難易度に絞る。
+        """
+        profile = self.profile(session, user_id)
+        if profile is None:
+            return None
+        index = self.posting_index(session)
+        limit = max(1, min(limit, MAX_FEED_SIZE))
+
+        # 興味タグのポスティングだけを連結し、記事ごとに重みを合計する
+        lists = [
+            (index.postings[tag_id], weight)
+            for tag_id, weight in zip(profile.tag_ids.tolist(), profile.weights.tolist())
+            if tag_id in index.postings
+        ]
+        if not lists:
+            return []
+        positions = np.concatenate([chunk for chunk, _ in lists])
+        weights = np.repeat([weight for _, weight in lists], [len(chunk) for chunk, _ in lists])
+        candidates, inverse = np.unique(positions, return_inverse=True)
+        relevance = np.bincount(inverse, weights=weights)
+
+        scores = relevance * index.tag_norm[candidates] * (1.0 + self.quality_weight * index.quality[candidates])
+        keep = scores > 0
+        if difficulty_level is not None:
+            keep &= index.difficulty[candidates] == difficulty_level
+        else:
+            keep &= index.difficulty[candidates] <= profile.experience_level + 1
+        # 既読記事はキャッシュ済みの既読IDで除外する
+        keep &= ~np.isin(index.ids[candidates], profile.read_ids, assume_unique=True)
+        candidates, scores = candidates[keep], scores[keep]
+
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((-index.ids[candidates], -scores))
+        ranked = dict(zip(index.ids[candidates[order]].tolist(), np.round(scores[order], 6).tolist()))
+        if not ranked:
+            return []
+
+        rank = {article_id: i for i, article_id in enumerate(ranked)}
+        rows = session.execute(listing_select().where(Article.id.in_(list(ranked)))).mappings().all()
+        rows = sorted(rows, key=lambda row: rank[row['id']])
+        return [dict(row, relevance=ranked[row['id']]) for row in attach_tag_names(session, rows)]
+
+    def profile(self, session, user_id):
+        """ユーザーの興味ベクトルと既読記事（キャッシュが無い・古い場合は読み込む）"""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None and time.monotonic() - profile.built_at < self.profile_ttl:
+                self._profiles.move_to_end(user_id)
+                return profile
+            version = self._version
+
+        profile = self._load_profile(session, user_id)
+        if profile is None:
+            return None
+        with self._lock:
+            if version == self._version:
+                self._profiles[user_id] = profile
+                self._profiles.move_to_end(user_id)
+                while len(self._profiles) > self.max_profiles:
+                    self._profiles.popitem(last=False)
+        return profile
+
+    def _load_profile(self, session, user_id):
+        user = session.execute(select(User.id, User.experience_level).where(User.id == user_id)).first()
+        if user is None:
+            return None
+
+        weights = {}
+        for (tag_id,) in session.execute(
+            select(user_interests.c.tag_id).where(user_interests.c.user_id == user_id)
+        ):
+            weights[tag_id] = weights.get(tag_id, 0.0) + self.interest_weight
+
+        # 既読記事のタグを、読了率と評価で重み付けして興味に加える
+        history = {}
+        read_ids = set()
+        rows = session.connection().exec_driver_sql(
+            "SELECT r.article_id, r.completion_rate, r.rating, at.tag_id FROM read_records r "
+            "LEFT JOIN article_tags at ON at.article_id = r.article_id WHERE r.user_id = ?",
+            (user_id,),
+        )
+        for article_id, completion_rate, rating, tag_id in rows:
+            read_ids.add(article_id)
+            if tag_id is not None:
+                history[tag_id] = history.get(tag_id, 0.0) + self.read_signal(completion_rate, rating)
+        if history:
+            top = max(history.values())
+            for tag_id, value in history.items():
+                if value > 0:
+                    weights[tag_id] = weights.get(tag_id, 0.0) + self.history_weight * value / top
+
+        tag_ids = np.array(list(weights), dtype=np.int64)
+        return UserProfile(
+            experience_level=user.experience_level or 1,
+            tag_ids=tag_ids,
+            weights=np.array([weights[tag_id] for tag_id in tag_ids.tolist()], dtype=np.float64),
+            read_ids=np.array(sorted(read_ids), dtype=np.int64),
+        )
+
+    def read_signal(self, completion_rate, rating):
+        """既読1件の興味の強さ（読了率 0→0.5, 1→1.0 に、評価 1-5 を 1/3-5/3 倍で掛ける）"""
+        strength = 0.5 + 0.5 * min(max(completion_rate or 0.0, 0.0), 1.0)
+        return strength * (rating / 3.0 if rating else 1.0)
+
+    def posting_index(self, session):
+        """タグ別ポスティングリスト（postings_ttl を過ぎていれば作り直す）"""
+        index = self._index
+        if index is not None and time.monotonic() - index.built_at < self.postings_ttl:
+            return index
+        with self._index_lock:
+            # 他のスレッドが作り直していればそれを使う
+            index = self._index
+            if index is None or time.monotonic() - index.built_at >= self.postings_ttl:
+                index = self._index = self._build_posting_index(session)
+        return index
+
+    def _build_posting_index(self, session):
+        started = time.monotonic()
+        since = (datetime.utcnow() - timedelta(days=self.window_days)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        cursor = session.connection().connection.cursor()
+        try:
+            # 記事とタグの関連付けを1つのクエリ（同じスナップショット）で読む（タグの無い記事は tag_id = 0）
+            cursor.execute(
+                "SELECT a.id, coalesce(a.difficulty_level, 1), coalesce(a.tech_feed_score, 0), "
+                "coalesce(at.tag_id, 0) "
+                "FROM articles a LEFT JOIN article_tags at ON at.article_id = a.id "
+                f"WHERE {ACTIVITY_AT} >= ? AND a.canonical_id IS NULL ORDER BY a.id",
+                (since,),
+            )
+            rows = np.array(
+                cursor.fetchall(),
+                dtype=[('id', '<i8'), ('difficulty', '<i8'), ('score', '<f8'), ('tag_id', '<i8')],
+            )
+        finally:
+            cursor.close()
+
+        _, first = np.unique(rows['id'], return_index=True)
+        articles = rows[first]
+        tagged = rows[rows['tag_id'] != 0]
+        links = np.empty(len(tagged), dtype=[('tag_id', '<i8'), ('article_id', '<i8')])
+        links['tag_id'] = tagged['tag_id']
+        links['article_id'] = tagged['id']
+
+        ids = articles['id']
+        scores = articles['score']
+        spread = scores.max() - scores.min() if len(scores) else 0.0
+        quality = (scores - scores.min()) / spread if spread > 0 else np.zeros(len(scores))
+
+        postings = {}
+        tag_counts = np.zeros(len(ids))
+        if len(links):
+            links.sort(order=['tag_id', 'article_id'])
+            positions = np.searchsorted(ids, links['article_id']).astype(np.int64)
+            # 記事一覧に無い記事への関連付けは除く
+            found = positions < len(ids)
+            found[found] = ids[positions[found]] == links['article_id'][found]
+            links, positions = links[found], positions[found]
+        if len(links):
+            tag_counts = np.bincount(positions, minlength=len(ids)).astype(np.float64)
+            tag_ids, starts = np.unique(links['tag_id'], return_index=True)
+            for tag_id, chunk in zip(tag_ids.tolist(), np.split(positions, starts[1:])):
+                postings[tag_id] = chunk
+
+        index = PostingIndex(
+            ids=ids,
+            difficulty=articles['difficulty'],
+            quality=quality,
+            tag_norm=1.0 / np.sqrt(np.maximum(tag_counts, 1.0)),
+            postings=postings,
+        )
+        logger.info(
+            f"Built feed postings for {len(ids)} articles / {len(postings)} tags "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return index
+
+    def invalidate_user(self, user_id):
+        """ユーザーの興味ベクトル・既読記事のキャッシュを破棄"""
+        with self._lock:
+            self._version += 1
+            self._profiles.pop(user_id, None)
+
+    def invalidate_postings(self):
+        """ポスティングリストを破棄（次のリクエストで作り直す）"""
+        self._index = None
+
+
+def record_read(session, user_id, article_id, completion_rate=None, rating=None, reading_time=None):
+    """既読を記録してコミットし、そのユーザーのフィードのキャッシュを破棄する
+
+    同じ記事の既読記録があれば指定された値だけ更新する。ユーザーか記事が無ければ None。
+    """
+    user = session.get(User, user_id)
+    if user is None or session.get(Article, article_id) is None:
+        return None
+    record = session.scalars(
+        select(ReadRecord).where(ReadRecord.user_id == user_id, ReadRecord.article_id == article_id)
+    ).first()
+    if record is None:
+        record = ReadRecord(user_id=user_id, article_id=article_id)
+        session.add(record)
+        user.total_articles_read = (user.total_articles_read or 0) + 1
+    if completion_rate is not None:
+        record.completion_rate = min(max(completion_rate, 0.0), 1.0)
+    if rating is not None:
+        record.rating = rating
+    if reading_time is not None:
+        record.reading_time = reading_time
+    user.last_active = datetime.utcnow()
+    session.commit()
+    get_personal_feed().invalidate_user(user_id)
+    return record.id
+
+
+def set_interests(session, user_id, tag_names):
+    """ユーザーの興味タグを置き換えてコミットし、フィードのキャッシュを破棄する
+
+    タグ名は正規タグ名に解決し、登録済みのタグだけを設定して、設定したタグ名のリストを返す。
+    ユーザーが無ければ None。
+    """
+    user = session.get(User, user_id)
+    if user is None:
+        return None
+    tag_names = get_tag_alias_map().resolve_all(tag_names)
+    tags = session.scalars(select(TechTag).where(TechTag.name.in_(tag_names))).all()
+    user.interested_tags = list(tags)
+    session.commit()
+    get_personal_feed().invalidate_user(user_id)
+    return sorted(tag.name for tag in tags)
+
+
+_feed = None
+
+def get_personal_feed():
+    """プロセス内で共有されるPersonalFeedを取得"""
+    global _feed
+    if _feed is None:
+        _feed = PersonalFeed(
+            window_days=settings.PERSONAL_FEED_WINDOW_DAYS,
+            postings_ttl=settings.PERSONAL_FEED_POSTINGS_TTL,
+            profile_ttl=settings.PERSONAL_FEED_PROFILE_TTL,
+            max_profiles=settings.PERSONAL_FEED_MAX_PROFILES,
+        )
+    return _feed
@@ -0,0 +1,193 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import bindparam
+from engineed.models.database import Article, get_shared_database
+from engineed.models.queries import load_tag_names
+from engineed.models.search import index_articles, has_search_index
+from engineed.models.stats import increment_stats
+from engineed.pipelines import (
+    _stage_worker, init_stage_worker, enrich_article_text, link_article_tags, get_tag_id_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _reenrich_chunk_in_worker(rows):
+    """記事 (id, title, content, タグ名リスト, コードブロック数) のチャンクをエンリッチし直す（ワーカープロセスで実行）
+
+    記事ごとに (id, 追加するタグ名リスト, difficulty_level, is_tutorial) を返す。
+    保存済みの本文はHTMLから抽出したテキストでコードブロックを数え直せないため、
+    コードブロック数が記録されていない記事の difficulty_level は None（現在の値のまま）にする。
+    """
+    results = []
+    for article_id, title, content, tags, code_block_count in rows:
+        enrichment = enrich_article_text(
+            _stage_worker['keyword_extractor'], title or '', content or '', tags, code_block_count
+        )
+        new_tags = sorted(set(enrichment['tags']) - set(tags))
+        difficulty = enrichment['difficulty_level'] if code_block_count is not None else None
+        results.append((article_id, new_tags, difficulty, enrichment['is_tutorial']))
+    return results
+
+
+class Reenricher:
+    """保存済み記事のキーワード抽出・難易度推定・チュートリアル判定をやり直す
+
+    記事を id 順のチャンクでSQLiteから読み出し、AIEnrichmentPipeline と同じ処理
+    （enrich_article_text）をプロセスプールで実行して、変わった値だけを一括UPDATEする。
+    チャンクごとにコミットして最後に処理した id をチェックポイントファイルに書くため、
+    中断しても続きから再開できる（最後まで終わるとチェックポイントは削除する）。
+
+    タグは元サイトのタグと抽出したタグを区別して保存していないため、追加のみ行う。
+    """
+
+    def __init__(self, database_url='sqlite:///data/articles.db', checkpoint_path='data/reenrich_checkpoint.json',
+                 chunk_size=500, workers=None):
+        self.database_url = database_url
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = max(1, chunk_size)
+        self.workers = workers or os.cpu_count() or 1
+        self.search_index = False
+        self.tag_cache = None
+
+    def run(self, restart=False, progress=None):
+        """全記事（restart しない場合はチェックポイントの続き）を処理して集計を返す
+
+        progress を指定するとチャンクの書き込みごとに集計dictを渡して呼ぶ。
+        """
+        checkpoint = {} if restart else self.load_checkpoint()
+        totals = {
+            'last_id': checkpoint.get('last_id', 0),
+            'processed': checkpoint.get('processed', 0),
+            'updated': checkpoint.get('updated', 0),
+            'tags_added': checkpoint.get('tags_added', 0),
+        }
+        if totals['last_id']:
+            logger.info(f"Resuming re-enrichment after article {totals['last_id']}")
+
+        engine, SessionLocal = get_shared_database(self.database_url)
+        self.search_index = has_search_index(engine)
+        self.tag_cache = get_tag_id_cache(self.database_url)
+        started = time.monotonic()
+        processed_at_start = totals['processed']
+
+        def write_next():
+            self._write_next(session, pending.popleft(), totals)
+            elapsed = time.monotonic() - started
+            totals['rate'] = round((totals['processed'] - processed_at_start) / elapsed, 1) if elapsed else 0.0
+            if progress is not None:
+                progress(dict(totals))
+
+        session = SessionLocal()
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_stage_worker,
+        )
+        try:
+            self.tag_cache.warm(session)
+            # ワーカーが処理している間に次のチャンクを読み、結果は id 順に書き込む
+            pending = deque()
+            for rows, current in self._read_chunks(session, totals['last_id']):
+                pending.append((rows[-1][0], current, pool.submit(_reenrich_chunk_in_worker, rows)))
+                if len(pending) >= self.workers * 2:
+                    write_next()
+            while pending:
+                write_next()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            session.close()
+
+        self.clear_checkpoint()
+        elapsed = time.monotonic() - started
+        totals['seconds'] = round(elapsed, 2)
+        totals['rate'] = round((totals['processed'] - processed_at_start) / elapsed, 1) if elapsed else 0.0
+        logger.info(
+            f"Re-enriched {totals['processed']} articles ({totals['updated']} updated, "
+            f"{totals['tags_added']} tags added) at {totals['rate']} articles/sec"
+        )
+        return totals
+
+    def _read_chunks(self, session, last_id):
+        """(記事行のリスト, 記事ID→現在の (difficulty_level, is_tutorial)) を id 順に返す"""
+        while True:
+            rows = session.connection().exec_driver_sql(
+                "SELECT id, title, content, difficulty_level, is_tutorial, code_block_count FROM articles "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, self.chunk_size),
+            ).all()
+            session.commit()  # 読み取りトランザクションを閉じ、書き込みをブロックしない
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            tag_names = load_tag_names(session, [row[0] for row in rows])
+            session.commit()
+            yield (
+                [(row[0], row[1], row[2], tag_names.get(row[0], []), row[5]) for row in rows],
+                {row[0]: (row[3], bool(row[4])) for row in rows},
+            )
+
+    def _write_next(self, session, chunk, totals):
+        """ワーカーの結果を一括で書き戻してコミットし、チェックポイントを進める"""
+        last_id, current, future = chunk
+        results = future.result()
+
+        articles = Article.__table__
+        changed = []
+        for article_id, _, difficulty, is_tutorial in results:
+            if difficulty is None:
+                # 難易度を推定し直せない記事は現在の値のまま
+                difficulty = current[article_id][0]
+            if current[article_id] != (difficulty, is_tutorial):
+                changed.append({'b_id': article_id, 'b_difficulty_level': difficulty, 'b_is_tutorial': is_tutorial})
+        new_tags = {article_id: tags for article_id, tags, _, _ in results if tags}
+        linked = []
+        try:
+            if changed:
+                session.execute(
+                    articles.update()
+                    .where(articles.c.id == bindparam('b_id'))
+                    .values(difficulty_level=bindparam('b_difficulty_level'), is_tutorial=bindparam('b_is_tutorial')),
+                    changed,
+                )
+            if new_tags:
+                # 別名の解決や同時実行で既に付いていたタグは追加されないため、実際に挿入された行で数える
+                linked = link_article_tags(session, self.tag_cache, new_tags)
+                increment_stats(session, [], [name for _, name in linked])
+                if self.search_index and linked:
+                    index_articles(session, sorted({article_id for article_id, _ in linked}))
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.tag_cache.clear()
+            raise
+
+        totals['last_id'] = last_id
+        totals['processed'] += len(results)
+        totals['updated'] += len({row['b_id'] for row in changed} | {article_id for article_id, _ in linked})
+        totals['tags_added'] += len(linked)
+        self.save_checkpoint(totals)
+
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_checkpoint(self, totals):
+        """チェックポイントを書き換え（途中で止まっても壊れないよう置き換えで書く）"""
+        if os.path.dirname(self.checkpoint_path):
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        checkpoint = {key: totals[key] for key in ('last_id', 'processed', 'updated', 'tags_added')}
+        with open(self.checkpoint_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
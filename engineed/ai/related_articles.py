@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import logging
+import unicodedata
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 英数字の語・カタカナ語・漢字の連続（ひらがなは助詞・活用語尾が多いため使わない）
+_TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9_+#.\-]*[a-z0-9+#]|[a-z]|[\u30a0-\u30ff]{2,}|[\u3400-\u9fff]+')
+
+# 1記事あたりベクトル化に使う本文の長さの上限
+MAX_TEXT_LENGTH = 10000
+
+# この類似度（コサイン）未満の記事は関連記事にしない
+MIN_SIMILARITY = 0.1
+
+# 語彙の学習に必要な最小の記事数（min_df=2・max_df=0.5 を満たす語が残りうるのは4記事から）
+MIN_FIT_DOCUMENTS = 4
+
+# 類似度行列のブロック（クエリ行数 × 全記事数）の要素数の上限（float32で約128MB）
+BLOCK_ELEMENTS = 32 * 1024 * 1024
+
+
+def tokenize(text):
+    """日本語・英語混在の技術記事のトークン分割（辞書を使わない）
+
+    英数字は語単位、カタカナ語はひとまとまり、漢字の連続は文字bigramにする。
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower()):
+        if '\u3400' <= token[0] <= '\u9fff' and len(token) > 2:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class RelatedArticlesIndex:
+    """TF-IDF＋SVD（LSA）の記事ベクトルから関連記事テーブルを作る
+
+    ベクトルは L2正規化した float32 行列として index_dir/vectors.f32 にmemmapで置き、
+    行ごとの記事IDを ids.npy に持つ。関連記事は内積（コサイン類似度）の上位 top_k 件を
+    ブロック単位の行列積で求め、related_articles テーブルに保存する（Webはこれを読むだけ）。
+
+    update() は学習済みのTF-IDF語彙・SVDで新しい記事だけをベクトル化して行列に追記し
+    （全体の再学習はしない）、新しい記事の関連記事と、新しい記事が上位に入る既存記事の
+    関連記事だけを計算し直す。refit=True で全記事から学習し直す。
+    """
+
+    def __init__(self, index_dir='data/related', top_k=10, dimensions=128, max_fit_documents=50000):
+        self.index_dir = index_dir
+        self.top_k = top_k
+        self.dimensions = dimensions
+        self.max_fit_documents = max_fit_documents
+
+    @property
+    def model_path(self):
+        return os.path.join(self.index_dir, 'model.joblib')
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.index_dir, 'vectors.f32')
+
+    @property
+    def ids_path(self):
+        return os.path.join(self.index_dir, 'ids.npy')
+
+    def update(self, session, refit=False):
+        """新しい記事を行列に追加して関連記事を更新し、ベクトル化した記事数を返す"""
+        started = time.monotonic()
+        if refit or not os.path.exists(self.model_path):
+            count = self._rebuild(session)
+        else:
+            count = self._fold_in(session)
+        logger.info(f"Updated related articles for {count} new articles in {time.monotonic() - started:.2f}s")
+        return count
+
+    def _rebuild(self, session):
+        """全記事からTF-IDF・SVDを学習し、行列と関連記事テーブルを作り直す"""
+        import joblib
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        ids = self._article_ids(session)
+        if len(ids) < MIN_FIT_DOCUMENTS:
+            logger.info(f"Skipped related articles: {len(ids)} articles (need at least {MIN_FIT_DOCUMENTS})")
+            return 0
+
+        # 語彙・SVDは新しい記事からの標本で学習し、全記事はその変換で求める
+        sample = np.sort(ids[-self.max_fit_documents:])
+        vectorizer = TfidfVectorizer(
+            analyzer=tokenize, min_df=2, max_df=0.5, sublinear_tf=True, max_features=200000, dtype=np.float32,
+        )
+        try:
+            tfidf = vectorizer.fit_transform(self._texts(session, sample))
+        except ValueError as e:
+            # 語彙が空（min_df・max_df で語が1つも残らない）
+            logger.info(f"Skipped related articles: {e}")
+            return 0
+        n_components = min(self.dimensions, min(tfidf.shape) - 1)
+        if n_components < 1:
+            logger.info(f"Skipped related articles: {tfidf.shape[1]} terms in {tfidf.shape[0]} articles")
+            return 0
+        svd = TruncatedSVD(n_components=n_components, random_state=0)
+        svd.fit(tfidf)
+        model = {'vectorizer': vectorizer, 'svd': svd}
+        dimensions = svd.components_.shape[0]
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        vectors_tmp = self.vectors_path + '.tmp'
+        with open(vectors_tmp, 'wb') as f:
+            for chunk in self._chunks(ids):
+                f.write(self._vectorize(model, self._texts(session, chunk)).tobytes())
+
+        vectors = self._load_vectors(len(ids), dimensions, path=vectors_tmp)
+        session.connection().exec_driver_sql("DELETE FROM related_articles")
+        self._write_neighbors(session, ids, vectors, np.arange(len(ids)))
+        del vectors
+
+        # 関連記事を書き終えてからファイルを置き換える。モデルは最初に消して最後に書くため、
+        # 途中で止まっても次回は古いモデルと新しい行列を組み合わせずに作り直しになる
+        joblib.dump(model, self.model_path + '.tmp')
+        if os.path.exists(self.model_path):
+            os.remove(self.model_path)
+        os.replace(vectors_tmp, self.vectors_path)
+        self._save_ids(ids)
+        os.replace(self.model_path + '.tmp', self.model_path)
+        return len(ids)
+
+    def _fold_in(self, session):
+        """学習済みモデルで新しい記事をベクトル化して追記し、影響する関連記事だけ計算し直す"""
+        import joblib
+
+        model = joblib.load(self.model_path)
+        dimensions = model['svd'].components_.shape[0]
+        known = np.load(self.ids_path)
+        new_ids = self._article_ids(session, after=known[-1] if len(known) else 0)
+        if len(new_ids) == 0:
+            return 0
+
+        # 追記はIDより先にベクトルを書く（途中で止まっても ids.npy の行数までが有効）
+        with open(self.vectors_path, 'r+b') as f:
+            f.truncate(len(known) * dimensions * 4)
+            f.seek(0, os.SEEK_END)
+            for chunk in self._chunks(new_ids):
+                f.write(self._vectorize(model, self._texts(session, chunk)).tobytes())
+        ids = np.concatenate([known, new_ids])
+        self._save_ids(ids)
+        vectors = self._load_vectors(len(ids), dimensions)
+
+        new_rows = np.arange(len(known), len(ids))
+        # 新しい記事との類似度が現在の top_k 件目を上回る既存記事も計算し直す
+        kth = self._kth_scores(session, known)
+        affected = np.zeros(len(known), dtype=bool)
+        for block in self._blocks(new_rows, len(known)):
+            similarity = vectors[block] @ vectors[:len(known)].T
+            affected |= (similarity > np.maximum(kth, MIN_SIMILARITY)).any(axis=0)
+        rows = np.concatenate([np.flatnonzero(affected), new_rows])
+        self._write_neighbors(session, ids, vectors, rows)
+        return len(new_ids)
+
+    def _article_ids(self, session, after=0):
+        """ベクトル化の対象（近似重複を除く）の記事ID（id順）"""
+        rows = session.connection().exec_driver_sql(
+            "SELECT id FROM articles WHERE id > ? AND canonical_id IS NULL ORDER BY id", (int(after),)
+        ).all()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def _texts(self, session, article_ids):
+        """タイトル（2回）・タグ名・本文の先頭をつなげた文書（article_ids の順）"""
+        ids = [int(article_id) for article_id in article_ids]
+        rows = session.connection().exec_driver_sql(
+            "SELECT a.id, a.title, "
+            "(SELECT group_concat(t.name, ' ') FROM article_tags at "
+            " JOIN tech_tags t ON t.id = at.tag_id WHERE at.article_id = a.id), "
+            f"substr(a.content, 1, {MAX_TEXT_LENGTH}) "
+            f"FROM articles a WHERE a.id IN ({', '.join('?' * len(ids))})",
+            tuple(ids),
+        ).all()
+        texts = {row[0]: f"{row[1] or ''} {row[1] or ''} {row[2] or ''} {row[3] or ''}" for row in rows}
+        return [texts.get(article_id, '') for article_id in ids]
+
+    def _chunks(self, ids, size=2000):
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
+
+    def _vectorize(self, model, texts):
+        """文書をL2正規化したLSAベクトル（float32）にする"""
+        vectors = model['svd'].transform(model['vectorizer'].transform(texts)).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _save_ids(self, ids):
+        with open(self.ids_path + '.tmp', 'wb') as f:
+            np.save(f, ids)
+        os.replace(self.ids_path + '.tmp', self.ids_path)
+
+    def _load_vectors(self, rows, dimensions, path=None):
+        if rows == 0:
+            return np.zeros((0, dimensions), dtype=np.float32)
+        return np.memmap(path or self.vectors_path, dtype=np.float32, mode='r', shape=(rows, dimensions))
+
+    def _blocks(self, rows, columns):
+        size = max(1, BLOCK_ELEMENTS // max(columns, 1))
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def _kth_scores(self, session, ids):
+        """既存記事ごとの top_k 件目の類似度（関連記事が top_k 件に満たない記事は -inf）"""
+        kth = np.full(len(ids), -np.inf, dtype=np.float32)
+        rows = session.connection().exec_driver_sql(
+            "SELECT article_id, score FROM related_articles WHERE rank = ?", (self.top_k - 1,)
+        ).all()
+        if rows and len(ids):
+            scored = np.array([tuple(row) for row in rows], dtype=[('id', '<i8'), ('score', '<f4')])
+            positions = np.clip(np.searchsorted(ids, scored['id']), 0, len(ids) - 1)
+            matched = ids[positions] == scored['id']
+            kth[positions[matched]] = scored['score'][matched]
+        return kth
+
+    def _write_neighbors(self, session, ids, vectors, rows):
+        """指定した行の記事の関連記事をブロック単位の行列積で求めて書き込む"""
+        cursor = session.connection().connection.cursor()
+        k = min(self.top_k, len(ids) - 1)
+        try:
+            for block in self._blocks(rows, len(ids)):
+                article_ids = ids[block].tolist()
+                cursor.execute(
+                    f"DELETE FROM related_articles WHERE article_id IN ({', '.join('?' * len(article_ids))})",
+                    article_ids,
+                )
+                if k <= 0:
+                    continue
+                similarity = vectors[block] @ vectors.T
+                similarity[np.arange(len(block)), block] = -np.inf  # 自分自身は除く
+                top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(similarity, top, axis=1)
+                order = np.argsort(-scores, axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+                scores = np.take_along_axis(scores, order, axis=1)
+                cursor.executemany(
+                    "INSERT INTO related_articles (article_id, rank, related_id, score) VALUES (?, ?, ?, ?)",
+                    [
+                        (article_id, rank, int(ids[column]), round(float(score), 4))
+                        for article_id, columns, row_scores in zip(article_ids, top, scores)
+                        for rank, (column, score) in enumerate(zip(columns, row_scores))
+                        if score >= MIN_SIMILARITY
+                    ],
+                )
+        finally:
+            cursor.close()
+
+
+_indexes = {}
+
+def get_related_articles_index(index_dir='data/related', top_k=10, dimensions=128):
+    """プロセス内で共有されるRelatedArticlesIndexを取得"""
+    key = (index_dir, top_k, dimensions)
+    if key not in _indexes:
+        _indexes[key] = RelatedArticlesIndex(index_dir=index_dir, top_k=top_k, dimensions=dimensions)
+    return _indexes[key]
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class SummaryCache:
+    """記事本文のハッシュをキーにした要約の永続キャッシュ（SQLite）
+
+    max_entries を超えた分は最終利用が古い順に、max_age_days を過ぎた
+    エントリは作成日時で削除する。ヒット・ミス数を記録する。
+
+    ヒット時の最終利用時刻は TOUCH_INTERVAL 秒以上前のものだけをメモリに溜め、
+    TOUCH_BATCH 件ごと（または put・削除処理・close の際）にまとめて書き込む。
+    """
+
+    EVICT_EVERY = 500  # この件数のputごとに削除処理を行う
+    TOUCH_INTERVAL = 3600  # 最終利用時刻がこの秒数以内なら更新しない
+    TOUCH_BATCH = 100  # 溜まった最終利用時刻の更新をまとめて書き込む件数
+
+    def __init__(self, path='data/summary_cache.db', max_entries=50000, max_age_days=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._touched = {}  # キー→未書き込みの最終利用時刻
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 要約生成はスレッドプールからも呼ばれるため、ロックで直列化して共有する
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summary_cache ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_summary_cache_last_used ON summary_cache (last_used)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key):
+        """要約を取得（無ければ None）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, last_used FROM summary_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            now = time.time()
+            if now - row[1] >= self.TOUCH_INTERVAL:
+                self._touched[key] = now
+                if len(self._touched) >= self.TOUCH_BATCH:
+                    self._write_touched()
+                    self._conn.commit()
+            return row[0]
+
+    def _write_touched(self):
+        """溜めておいた最終利用時刻を書き込む（ロックを取得した状態で呼ぶ。コミットは呼び出し側）"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE summary_cache SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()],
+            )
+            self._touched = {}
+
+    def put(self, key, summary):
+        """要約を保存"""
+        now = time.time()
+        with self._lock:
+            self._touched.pop(key, None)
+            self._write_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summary_cache (key, summary, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, summary, now, now),
+            )
+            self._conn.commit()
+            self._puts += 1
+            evict_now = self._puts % self.EVICT_EVERY == 0
+
+        if evict_now:
+            self.evict()
+
+    def evict(self):
+        """期限切れ・上限超過のエントリを削除"""
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock:
+            self._write_touched()
+            self._conn.execute("DELETE FROM summary_cache WHERE created_at < ?", (cutoff,))
+            self._conn.execute(
+                "DELETE FROM summary_cache WHERE key IN ("
+                "SELECT key FROM summary_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def flush(self):
+        """溜めておいた最終利用時刻を書き込む"""
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+
+    def stats(self):
+        """ヒット・ミス数とヒット率"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+
+def get_summary_cache(path='data/summary_cache.db', max_entries=50000, max_age_days=30):
+    """プロセス内で共有されるSummaryCacheを取得"""
+    if path not in _caches:
+        _caches[path] = SummaryCache(path, max_entries=max_entries, max_age_days=max_age_days)
+    return _caches[path]
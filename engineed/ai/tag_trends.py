@@ -0,0 +1,173 @@
+import time
+import logging
+from datetime import datetime, timezone
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+# 記事の活動時刻（公開日時、無ければ初回保存時刻）とその時間バケット（SQL式）
+ACTIVITY_AT = "coalesce(a.published_at, a.first_seen_at)"
+ACTIVITY_HOUR = f"CAST(strftime('%s', {ACTIVITY_AT}) AS INTEGER) / {HOUR}"
+
+# 集計する時間窓（時間）
+WINDOWS = {'24h': 24, '7d': 7 * 24, '30d': 30 * 24}
+
+TREND_COLUMNS = np.dtype([
+    ('tag_id', '<i8'),
+    ('count_24h', '<f8'),
+    ('count_7d', '<f8'),
+    ('count_30d', '<f8'),
+    ('engagement_7d', '<f8'),
+])
+
+
+def _to_db_time(hour):
+    """時間バケットをDateTime列と同じ書式の文字列にする"""
+    return datetime.fromtimestamp(hour * HOUR, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+class TagTrendEngine:
+    """TechTag.popularity_score / trend_score を時間窓の集計から求める
+
+    tag_activity にタグ×1時間ごとの記事数・エンゲージメントを持ち、
+    クロール後は今回保存・更新した記事が属する時間バケットだけを集計し直す。
+    スコアは tag_activity の直近30日分から1回の集計クエリとNumPyで求める。
+
+    - popularity_score: 24h/7d/30dの1日あたり記事数と記事あたりエンゲージメントを
+      合成し、最大のタグを100とした値
+    - trend_score: 直近24hの記事数と、その前6日間の1日平均との比（log2）。正なら上昇中
+    """
+
+    def __init__(self, engagement_weight=0.5):
+        self.engagement_weight = engagement_weight
+
+    def update(self, session, since=None, now=None):
+        """since（scraped_at の下限）以降に保存・更新された記事の分だけ集計し直してスコアを更新"""
+        started = time.monotonic()
+        now = now or time.time()
+        oldest_hour = int(now) // HOUR - WINDOWS['30d']
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.execute("SELECT 1 FROM tag_activity LIMIT 1")
+            if since is None or cursor.fetchone() is None:
+                # 初回（または明示的な全件指定）は30日分のバケットを作り直す
+                hours = None
+                self._rebuild_buckets(cursor, oldest_hour)
+            else:
+                hours = [hour for hour in self._dirty_hours(cursor, since) if hour > oldest_hour]
+                self._refresh_buckets(cursor, hours)
+            updated = self._update_scores(cursor, now)
+        finally:
+            cursor.close()
+
+        touched = 'all' if hours is None else len(hours)
+        logger.info(
+            f"Updated trends for {updated} tags ({touched} hour buckets) "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return updated
+
+    def rebuild(self, session, now=None):
+        """直近30日分の記事から集計し直す"""
+        return self.update(session, since=None, now=now)
+
+    def _engagement_sql(self):
+        return "coalesce(a.like_count, 0) + 2 * coalesce(a.comment_count, 0)"
+
+    def _dirty_hours(self, cursor, since):
+        """since 以降に保存・更新された記事が属する時間バケット"""
+        cursor.execute(
+            f"SELECT DISTINCT {ACTIVITY_HOUR} FROM articles a WHERE a.scraped_at >= ?",
+            (since.strftime('%Y-%m-%d %H:%M:%S.%f'),),
+        )
+        return [hour for (hour,) in cursor.fetchall() if hour is not None]
+
+    def _refresh_buckets(self, cursor, hours):
+        """指定した時間バケットをarticles/article_tagsから集計し直す"""
+        for hour in hours:
+            cursor.execute("DELETE FROM tag_activity WHERE hour = ?", (hour,))
+            # 活動時刻の式インデックスで該当1時間の記事だけを読む
+            cursor.execute(
+                "INSERT INTO tag_activity (tag_id, hour, article_count, engagement) "
+                f"SELECT at.tag_id, ?, count(*), sum({self._engagement_sql()}) "
+                "FROM articles a JOIN article_tags at ON at.article_id = a.id "
+                f"WHERE {ACTIVITY_AT} >= ? AND {ACTIVITY_AT} < ? "
+                "GROUP BY at.tag_id",
+                (hour, _to_db_time(hour), _to_db_time(hour + 1)),
+            )
+
+    def _rebuild_buckets(self, cursor, oldest_hour):
+        cursor.execute("DELETE FROM tag_activity")
+        cursor.execute(
+            "INSERT INTO tag_activity (tag_id, hour, article_count, engagement) "
+            f"SELECT at.tag_id, {ACTIVITY_HOUR} AS hour, count(*), sum({self._engagement_sql()}) "
+            "FROM articles a JOIN article_tags at ON at.article_id = a.id "
+            f"WHERE {ACTIVITY_AT} >= ? "
+            "GROUP BY at.tag_id, hour",
+            (_to_db_time(oldest_hour + 1),),
+        )
+
+    def load_windows(self, cursor, now):
+        """タグごとの時間窓別の記事数・エンゲージメントを1回の集計で読む"""
+        now_hour = int(now) // HOUR
+        cursor.execute(
+            "SELECT tag_id, "
+            "sum(CASE WHEN hour > :h24 THEN article_count ELSE 0 END), "
+            "sum(CASE WHEN hour > :h7d THEN article_count ELSE 0 END), "
+            "sum(article_count), "
+            "sum(CASE WHEN hour > :h7d THEN engagement ELSE 0 END) "
+            "FROM tag_activity WHERE hour > :h30d AND hour <= :now GROUP BY tag_id",
+            {
+                'now': now_hour,
+                'h24': now_hour - WINDOWS['24h'],
+                'h7d': now_hour - WINDOWS['7d'],
+                'h30d': now_hour - WINDOWS['30d'],
+            },
+        )
+        return np.array(cursor.fetchall(), dtype=TREND_COLUMNS)
+
+    def compute(self, windows):
+        """(popularity_score, trend_score) の配列を返す"""
+        daily_rate = (
+            windows['count_24h']
+            + windows['count_7d'] / 7.0
+            + windows['count_30d'] / 30.0
+        ) / 3.0
+        engagement_per_article = windows['engagement_7d'] / np.maximum(windows['count_7d'], 1.0)
+        raw = np.log1p(daily_rate) * (1.0 + self.engagement_weight * np.log1p(engagement_per_article))
+        top = raw.max() if len(raw) else 0.0
+        popularity = 100.0 * raw / top if top > 0 else np.zeros(len(raw))
+
+        # 直近24hを除いた6日間の1日平均をベースラインにする
+        baseline = (windows['count_7d'] - windows['count_24h']) / 6.0
+        trend = np.log2((windows['count_24h'] + 1.0) / (baseline + 1.0))
+        return np.round(popularity, 3), np.round(trend, 3)
+
+    def _update_scores(self, cursor, now):
+        windows = self.load_windows(cursor, now)
+        popularity, trend = self.compute(windows)
+
+        # 窓から外れたタグは0に戻し、窓内のタグを一括UPDATE
+        cursor.execute(
+            "UPDATE tech_tags SET popularity_score = 0, trend_score = 0 "
+            "WHERE popularity_score != 0 OR trend_score != 0"
+        )
+        cursor.executemany(
+            "UPDATE tech_tags SET popularity_score = ?, trend_score = ? WHERE id = ?",
+            zip(popularity.tolist(), trend.tolist(), windows['tag_id'].tolist()),
+        )
+        # 30日より古いバケットはスコアに使わないので削除
+        cursor.execute("DELETE FROM tag_activity WHERE hour <= ?", (int(now) // HOUR - WINDOWS['30d'],))
+        return len(windows)
+
+
+_engine = None
+
+def get_tag_trend_engine():
+    """プロセス内で共有されるTagTrendEngineを取得"""
+    global _engine
+    if _engine is None:
+        _engine = TagTrendEngine()
+    return _engine
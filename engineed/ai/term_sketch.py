@@ -0,0 +1,179 @@
+import os
+import time
+import heapq
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+
+
+class TermSketch:
+    """キーワード辞書に無い候補語の出現記事数を固定メモリで数えるストリーミングカウンタ
+
+    全語の回数は Count-Min sketch（depth × width の float32 配列、保守的更新）で近似し、
+    上位の語だけを Space-Saving 方式で capacity 件まで保持する（溢れたら推定値が最小の
+    語を追い出す）。語彙がどれだけ増えてもメモリは sketch の大きさ＋capacity 件で一定。
+
+    回数は1記事につき1回（記事数）で数え、half_life_days の半減期で減衰させるため、
+    最近よく出るようになった語が上位に残る。save()/load() で実行をまたいで引き継ぐ。
+    """
+
+    # ヒープに古いエントリがこの倍数まで溜まったら作り直す
+    HEAP_SLACK = 4
+
+    def __init__(self, path='data/term_sketch.npz', width=65536, depth=4, capacity=2000, half_life_days=30.0):
+        self.path = path
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.half_life_days = half_life_days
+        self.counts = np.zeros((depth, width), dtype=np.float32)
+        self.estimates = {}  # 小文字の語→推定回数（上位 capacity 件）
+        self.labels = {}  # 小文字の語→最初に見た表記
+        self.documents = 0.0
+        self.updated_at = time.time()
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _indices(self, key):
+        """各行のカウンタ位置（2つのハッシュの線形結合で depth 個作る）"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add_document(self, candidates):
+        """1記事分の候補語（小文字→表記のdict）を数える"""
+        keys = list(candidates)
+        with self._lock:
+            self.documents += 1
+            if not keys:
+                return
+            rows = np.broadcast_to(np.arange(self.depth), (len(keys), self.depth))
+            columns = np.array([self._indices(key) for key in keys], dtype=np.int64)
+            # 保守的更新: 各語の最小のカウンタ＋1 までしか引き上げず、過大評価を抑える
+            estimates = self.counts[rows, columns].min(axis=1) + 1.0
+            np.maximum.at(self.counts, (rows, columns), estimates[:, None])
+            for key, estimate in zip(keys, estimates.tolist()):
+                self._offer(key, candidates[key], estimate)
+
+    def _offer(self, key, label, estimate):
+        if key in self.estimates:
+            self.estimates[key] = estimate
+        elif len(self.estimates) < self.capacity:
+            self.estimates[key] = estimate
+            self.labels[key] = label
+        else:
+            smallest = self._smallest()
+            if estimate <= self.estimates[smallest]:
+                return
+            del self.estimates[smallest]
+            del self.labels[smallest]
+            self.estimates[key] = estimate
+            self.labels[key] = label
+        heapq.heappush(self._heap, (estimate, key))
+        if len(self._heap) > self.capacity * self.HEAP_SLACK:
+            self._rebuild_heap()
+
+    def _smallest(self):
+        """推定値が最小の語（ヒープの古いエントリは読み飛ばす）"""
+        while True:
+            estimate, key = self._heap[0]
+            if self.estimates.get(key) == estimate:
+                return key
+            heapq.heappop(self._heap)
+
+    def _rebuild_heap(self):
+        self._heap = [(estimate, key) for key, estimate in self.estimates.items()]
+        heapq.heapify(self._heap)
+
+    def decay(self, now=None):
+        """前回の減衰から経過した時間の分だけ回数を半減期で減らす"""
+        now = now or time.time()
+        elapsed = max(0.0, now - self.updated_at)
+        self.updated_at = now
+        if not elapsed or not self.half_life_days:
+            return
+        factor = 0.5 ** (elapsed / (self.half_life_days * SECONDS_PER_DAY))
+        with self._lock:
+            self.counts *= np.float32(factor)
+            self.documents *= factor
+            self.estimates = {key: estimate * factor for key, estimate in self.estimates.items()}
+            self._rebuild_heap()
+
+    def top(self, min_count=5.0, limit=50, exclude=()):
+        """推定回数が min_count 以上の語を (表記, 推定回数) の多い順に返す（exclude の語は除く）"""
+        with self._lock:
+            terms = [
+                (self.labels[key], estimate) for key, estimate in self.estimates.items()
+                if estimate >= min_count and key not in exclude
+            ]
+        terms.sort(key=lambda term: (-term[1], term[0]))
+        return terms[:limit]
+
+    def discard(self, keys):
+        """キーワード辞書に登録した語などを上位の候補から外す"""
+        with self._lock:
+            for key in keys:
+                self.estimates.pop(key, None)
+                self.labels.pop(key, None)
+            self._rebuild_heap()
+
+    def load(self):
+        """保存済みの状態を読み込み、保存時からの経過時間分を減衰させる"""
+        if not os.path.exists(self.path):
+            return self
+        with np.load(self.path, allow_pickle=False) as data:
+            counts = data['counts']
+            if counts.shape != self.counts.shape:
+                logger.warning(
+                    f"Ignoring term sketch {self.path}: shape {counts.shape} does not match {self.counts.shape}"
+                )
+                return self
+            keys = data['keys'].tolist()
+            self.counts = counts.astype(np.float32)
+            self.estimates = dict(zip(keys, data['estimates'].tolist()))
+            self.labels = dict(zip(keys, data['labels'].tolist()))
+            self.documents, self.updated_at = data['meta'].tolist()
+        # capacity を小さくした場合は推定値の大きい語だけ残す
+        if len(self.estimates) > self.capacity:
+            kept = sorted(self.estimates, key=self.estimates.get, reverse=True)[:self.capacity]
+            self.estimates = {key: self.estimates[key] for key in kept}
+            self.labels = {key: self.labels[key] for key in kept}
+        self._rebuild_heap()
+        self.decay()
+        return self
+
+    def save(self):
+        """状態をファイルに書き出す（途中で止まっても壊れないよう置き換えで書く）"""
+        self.decay()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            keys = list(self.estimates)
+            arrays = {
+                'counts': self.counts,
+                'keys': np.array(keys, dtype=str),
+                'labels': np.array([self.labels[key] for key in keys], dtype=str),
+                'estimates': np.array([self.estimates[key] for key in keys], dtype=np.float64),
+                'meta': np.array([self.documents, self.updated_at], dtype=np.float64),
+            }
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path)
+
+
+_sketches = {}
+
+def get_term_sketch(path='data/term_sketch.npz', width=65536, depth=4, capacity=2000, half_life_days=30.0):
+    """プロセス内で共有されるTermSketchを取得（初回は保存済みの状態を読み込む）"""
+    if path not in _sketches:
+        _sketches[path] = TermSketch(
+            path, width=width, depth=depth, capacity=capacity, half_life_days=half_life_days
+        ).load()
+    return _sketches[path]
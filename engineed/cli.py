@@ -1,7 +1,13 @@
 import click
+import logging
+import os
 import subprocess
 import sys
-from engineed.models.database import create_database
+import time
+from datetime import datetime
+from engineed.models.database import create_database, get_shared_database
+
+SPIDERS = ['qiita', 'zenn', 'hateb']
 
 @click.group()
 def main():
@@ -12,20 +18,25 @@ def main():
 @click.option('--spider', '-s', help='Spider name to run (qiita, zenn, hateb)')
 @click.option('--all', 'run_all', is_flag=True, help='Run all spiders')
 @click.option('--test', is_flag=True, help='Run in test mode (limited items)')
-def crawl(spider, run_all, test):
+@click.option('--parallel', is_flag=True, help='With --all, run every spider concurrently in one process')
+def crawl(spider, run_all, test, parallel):
     """Run scrapy spiders"""
     test_args = []
+    test_settings = {}
     if test:
         test_args = ['-s', 'CLOSESPIDER_ITEMCOUNT=3', '-s', 'ITEM_PIPELINES={}']
+        test_settings = {'CLOSESPIDER_ITEMCOUNT': 3, 'ITEM_PIPELINES': {}}
     
-    if run_all:
-        spiders = ['qiita', 'zenn', 'hateb']
-        for spider_name in spiders:
+    if run_all and parallel:
+        click.echo(f"Running spiders in parallel: {', '.join(SPIDERS)}")
+        run_spiders_in_process(SPIDERS, test_settings)
+    elif run_all:
+        for spider_name in SPIDERS:
             click.echo(f"Running spider: {spider_name}")
             cmd = ['scrapy', 'crawl', spider_name] + test_args
             subprocess.run(cmd)
     elif spider:
-        if spider not in ['qiita', 'zenn', 'hateb']:
+        if spider not in SPIDERS:
             click.echo(f"Error: Unknown spider '{spider}'. Available: qiita, zenn, hateb")
             return
         click.echo(f"Running spider: {spider}")
@@ -36,6 +47,55 @@ def crawl(spider, run_all, test):
         click.echo("Use: python -m engineed.cli crawl -s <spider_name>")
         click.echo("Or:  python -m engineed.cli crawl --all")
 
+def run_spiders_in_process(spider_names, extra_settings=None):
+    """複数スパイダーを1つのCrawlerProcessで並行実行し、スパイダーごとの実績を表示
+
+    パイプライン・DBエンジン・キーワードマッチャー・モデルはプロセス内で共有される。
+    """
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    
+    settings = get_project_settings()
+    settings.setdict(extra_settings or {}, priority='cmdline')
+    if settings.get('LOG_FILE'):
+        os.makedirs(os.path.dirname(settings.get('LOG_FILE')) or '.', exist_ok=True)
+    # 終了時の集計処理はスパイダーごとではなく、全スパイダーの終了後に1回だけ行う
+    close_jobs = 'engineed.pipelines.DatabasePipeline' in settings.getdict('ITEM_PIPELINES')
+    settings.set('CRAWL_CLOSE_JOBS_PER_SPIDER', False, priority='cmdline')
+    process = CrawlerProcess(settings)
+    
+    crawlers = {}
+    for spider_name in spider_names:
+        crawlers[spider_name] = process.create_crawler(spider_name)
+        process.crawl(crawlers[spider_name])
+    
+    started = time.monotonic()
+    started_at = datetime.utcnow()
+    process.start()
+    if close_jobs:
+        from engineed.pipelines import CrawlCloseJobs
+
+        _, SessionLocal = get_shared_database(settings.get('DATABASE_URL'))
+        CrawlCloseJobs.from_settings(settings).run(SessionLocal, started_at, logging.getLogger(__name__))
+    wall_clock = time.monotonic() - started
+    
+    click.echo("\nCrawl summary:")
+    total_items = 0
+    for spider_name, crawler in crawlers.items():
+        stats = crawler.stats.get_stats()
+        elapsed = stats.get('elapsed_time_seconds', 0) or 0
+        items = stats.get('item_scraped_count', 0)
+        responses = stats.get('response_received_count', 0)
+        rate = items / elapsed if elapsed else 0.0
+        total_items += items
+        click.echo(
+            f"  {spider_name:<8} {elapsed:8.1f}s  {items:5d} items  "
+            f"{responses:5d} responses  {rate:6.2f} items/sec  "
+            f"({stats.get('finish_reason', 'unknown')})"
+        )
+    rate = total_items / wall_clock if wall_clock else 0.0
+    click.echo(f"  {'total':<8} {wall_clock:8.1f}s  {total_items:5d} items  {rate:6.2f} items/sec")
+
 @main.command()
 def init_db():
     """Initialize database"""
@@ -43,6 +103,214 @@ def init_db():
     create_database()
     click.echo("Database initialized successfully!")
 
+@main.command()
+def rebuild_search():
+    """Rebuild the full-text search index from all articles"""
+    from engineed.models.search import rebuild_search_index
+
+    click.echo("Rebuilding search index...")
+    engine, _ = create_database()
+    started = time.monotonic()
+    count = rebuild_search_index(engine)
+    click.echo(f"Indexed {count} articles in {time.monotonic() - started:.1f}s")
+
+@main.command()
+def recompute_stats():
+    """Rebuild the article statistics table from scratch"""
+    from engineed.models.stats import recompute_stats as recompute
+
+    click.echo("Recomputing statistics...")
+    engine, _ = create_database()
+    started = time.monotonic()
+    with engine.begin() as conn:
+        recompute(conn)
+    click.echo(f"Statistics recomputed in {time.monotonic() - started:.1f}s")
+
+@main.command()
+@click.option('--since-hours', type=float, help='Only rescore articles scraped within the last N hours')
+def rescore(since_hours):
+    """Recompute tech_feed_score for all (or recently scraped) articles"""
+    from datetime import timedelta
+    from engineed import settings
+    from engineed.ai.feed_scorer import get_feed_scorer
+
+    since = datetime.utcnow() - timedelta(hours=since_hours) if since_hours else None
+    _, SessionLocal = create_database()
+    scorer = get_feed_scorer(settings.FEED_SCORE_HALF_LIFE_HOURS)
+    session = SessionLocal()
+    try:
+        started = time.monotonic()
+        count = scorer.score(session, since=since)
+        session.commit()
+    finally:
+        session.close()
+    click.echo(f"Scored {count} articles in {time.monotonic() - started:.1f}s")
+
+@main.command()
+@click.option('--since-hours', type=float, help='Only re-aggregate articles scraped within the last N hours')
+def tag_trends(since_hours):
+    """Recompute tag popularity and trend scores (24h/7d/30d windows)"""
+    from datetime import timedelta
+    from engineed.ai.tag_trends import get_tag_trend_engine
+
+    since = datetime.utcnow() - timedelta(hours=since_hours) if since_hours else None
+    _, SessionLocal = create_database()
+    session = SessionLocal()
+    try:
+        started = time.monotonic()
+        count = get_tag_trend_engine().update(session, since=since)
+        session.commit()
+    finally:
+        session.close()
+    click.echo(f"Updated {count} tags in {time.monotonic() - started:.1f}s")
+
+@main.command()
+@click.option('--rebuild', is_flag=True, help='Drop all fingerprints and duplicate links first')
+def dedupe(rebuild):
+    """Fingerprint articles and link near-duplicates to a canonical article"""
+    from engineed import settings
+    from engineed.models.duplicates import fingerprint_articles
+
+    _, SessionLocal = create_database()
+    session = SessionLocal()
+    try:
+        started = time.monotonic()
+        processed, linked = fingerprint_articles(
+            session, rebuild=rebuild, threshold=settings.NEAR_DUPLICATE_THRESHOLD
+        )
+    finally:
+        session.close()
+    click.echo(
+        f"Fingerprinted {processed} articles, linked {linked} near-duplicates "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+
+@main.command()
+@click.option('--refit', is_flag=True, help='Refit TF-IDF/SVD on the whole corpus instead of folding in new articles')
+def related(refit):
+    """Update the related-articles vectors and top-k neighbor table"""
+    from engineed import settings
+    from engineed.ai.related_articles import get_related_articles_index
+
+    _, SessionLocal = create_database()
+    index = get_related_articles_index(
+        settings.RELATED_ARTICLES_DIR,
+        top_k=settings.RELATED_ARTICLES_TOP_K,
+        dimensions=settings.RELATED_ARTICLES_DIMENSIONS,
+    )
+    session = SessionLocal()
+    try:
+        started = time.monotonic()
+        count = index.update(session, refit=refit)
+        session.commit()
+    finally:
+        session.close()
+    click.echo(f"Vectorized {count} articles in {time.monotonic() - started:.1f}s")
+
+@main.command()
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first article')
+@click.option('--workers', type=int, help='Number of worker processes (default: REENRICH_WORKERS or CPU count)')
+@click.option('--chunk-size', type=int, help='Articles read and written per chunk')
+def reenrich(restart, workers, chunk_size):
+    """Re-run keyword extraction, difficulty and tutorial detection on stored articles"""
+    from engineed import settings
+    from engineed.ai.reenricher import Reenricher
+
+    create_database()
+    reenricher = Reenricher(
+        database_url=settings.DATABASE_URL,
+        checkpoint_path=settings.REENRICH_CHECKPOINT_PATH,
+        chunk_size=chunk_size or settings.REENRICH_CHUNK_SIZE,
+        workers=workers or settings.REENRICH_WORKERS or None,
+    )
+
+    def report(totals):
+        click.echo(
+            f"  up to id {totals['last_id']}: {totals['processed']} articles, "
+            f"{totals['updated']} updated ({totals['rate']} articles/sec)"
+        )
+
+    totals = reenricher.run(restart=restart, progress=report)
+    click.echo(
+        f"Re-enriched {totals['processed']} articles: {totals['updated']} updated, "
+        f"{totals['tags_added']} tags added in {totals['seconds']:.1f}s ({totals['rate']} articles/sec)"
+    )
+
+@main.command()
+@click.option('--dry-run', is_flag=True, help='Only show which tags would be merged')
+def merge_tags(dry_run):
+    """Merge tags that resolve to the same canonical tag through the alias map"""
+    from engineed.ai.tag_trends import get_tag_trend_engine
+    from engineed.models.tags import merge_tags as merge_alias_tags
+
+    _, SessionLocal = create_database()
+    session = SessionLocal()
+    try:
+        started = time.monotonic()
+        merged, articles, planned = merge_alias_tags(session, dry_run=dry_run)
+        if dry_run:
+            for name, canonical in sorted(planned.items(), key=lambda item: (item[1], item[0])):
+                click.echo(f"  {name} -> {canonical}")
+            click.echo(f"Would merge {merged} tags ({len(planned)} tag names change)")
+            return
+        if planned:
+            # 統合先タグのトレンドは統合元の記事を含めて集計し直す
+            get_tag_trend_engine().rebuild(session)
+        session.commit()
+    finally:
+        session.close()
+    click.echo(
+        f"Merged {merged} tags ({len(planned)} tag names changed) on {articles} articles "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+
+@main.command()
+@click.option('--min-count', type=float, help='Minimum estimated article count (default: EMERGING_TERM_MIN_COUNT)')
+@click.option('--limit', default=30, help='Maximum number of terms to show')
+@click.option('--promote', is_flag=True, help='Ask whether to add each term to the keyword dictionary')
+@click.option('--category', default='trending', help='Keyword category for promoted terms')
+@click.option('--yes', is_flag=True, help='With --promote, add every listed term without asking')
+def emerging_terms(min_count, limit, promote, category, yes):
+    """Show frequent candidate terms that are not in the keyword dictionary yet"""
+    from engineed import settings
+    from engineed.ai.term_sketch import get_term_sketch
+    from engineed.utils.tech_keywords import get_keyword_manager
+
+    sketch = get_term_sketch(
+        settings.TERM_SKETCH_PATH,
+        width=settings.TERM_SKETCH_WIDTH,
+        depth=settings.TERM_SKETCH_DEPTH,
+        capacity=settings.TERM_SKETCH_TOP_K,
+        half_life_days=settings.TERM_SKETCH_HALF_LIFE_DAYS,
+    )
+    manager = get_keyword_manager()
+    known = manager.get_matcher().keyword_set
+    terms = sketch.top(
+        min_count=settings.EMERGING_TERM_MIN_COUNT if min_count is None else min_count,
+        limit=limit,
+        exclude=known,
+    )
+    if not terms:
+        click.echo(f"No emerging terms yet ({sketch.documents:.0f} articles counted)")
+        return
+
+    click.echo(f"Emerging terms ({sketch.documents:.0f} articles counted, estimated article counts):")
+    for label, count in terms:
+        click.echo(f"  {label:<30} {count:8.1f}")
+    if not promote:
+        return
+
+    promoted = []
+    for label, _ in terms:
+        if yes or click.confirm(f"Add '{label}' to '{category}'?", default=False):
+            manager.add_keyword(category, label)
+            promoted.append(label.lower())
+    if promoted:
+        # 辞書に入った語は以後既知のキーワードとして数えられるため候補から外す
+        sketch.discard(promoted)
+        sketch.save()
+    click.echo(f"Added {len(promoted)} keywords to '{category}'")
+
 @main.command()
 @click.option('--host', default='127.0.0.1', help='Host to bind')
 @click.option('--port', default=8000, help='Port to bind')
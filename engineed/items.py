@@ -18,8 +18,20 @@ class ArticleItem(scrapy.Item):
     language = scrapy.Field()
     is_tutorial = scrapy.Field()
     
+    # パイプラインで付与するフィールド
+    summary = scrapy.Field()
+    summary_hash = scrapy.Field()  # 要約元本文のハッシュ（SummaryCacheのキー）
+    difficulty_level = scrapy.Field()
+    content_hash = scrapy.Field()  # 取得時点のタイトル＋本文のハッシュ
+    is_unchanged = scrapy.Field()  # 前回取得時から本文に変化なし
+    content_extracted = scrapy.Field()  # スパイダーで抽出・正規化済みの本文か
+    code_blocks = scrapy.Field()  # 本文中のコードブロック位置 [(開始, 終了), ...]
+    fingerprint = scrapy.Field()  # 本文のMinHash署名
+    duplicate_of = scrapy.Field()  # 保存済みの近似重複の代表記事ID
+    
     # 追加メタデータ
     scraped_at = scrapy.Field()
+    request_urls = scrapy.Field()  # リダイレクト前を含むリクエストのURL（URLフロンティアに取得済みとして記録する）
     raw_html = scrapy.Field()
     images = scrapy.Field()
     external_links = scrapy.Field()
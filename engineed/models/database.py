@@ -1,10 +1,12 @@
 # tech_feed/models/database.py
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Table
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, DateTime, Float, Boolean, LargeBinary, ForeignKey, Table, Index, inspect, text, event, func
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, deferred
 from sqlalchemy.dialects.sqlite import JSON
 from datetime import datetime
 import sqlite3
+from engineed import settings as project_settings
 
 Base = declarative_base()
 
@@ -13,14 +15,17 @@ article_tags = Table(
     'article_tags',
     Base.metadata,
     Column('article_id', Integer, ForeignKey('articles.id')),
-    Column('tag_id', Integer, ForeignKey('tech_tags.id'))
+    Column('tag_id', Integer, ForeignKey('tech_tags.id')),
+    Index('uq_article_tags_article_tag', 'article_id', 'tag_id', unique=True),
+    Index('ix_article_tags_tag_article', 'tag_id', 'article_id'),  # タグでの絞り込み用
 )
 
 user_interests = Table(
     'user_interests',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
-    Column('tag_id', Integer, ForeignKey('tech_tags.id'))
+    Column('tag_id', Integer, ForeignKey('tech_tags.id')),
+    Index('ix_user_interests_user_tag', 'user_id', 'tag_id'),  # パーソナルフィードの興味タグ取得用
 )
 
 class Article(Base):
@@ -29,12 +34,18 @@ class Article(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String(500), nullable=False)
     url = Column(String(1000), unique=True, nullable=False)
-    content = Column(Text)
-    summary = Column(Text)  # AI生成要約
+    # 本文・要約は大きいため、一覧取得で読み込まないよう遅延ロードにする
+    content = deferred(Column(Text))
+    summary = deferred(Column(Text))  # AI生成要約
+    summary_hash = Column(String(64))  # 要約元本文のハッシュ
+    content_hash = Column(String(64))  # 取得時点のタイトル＋本文のハッシュ（変更検知用）
+    fingerprint = deferred(Column(LargeBinary))  # 本文のMinHash署名（近似重複検出用）
+    canonical_id = Column(Integer, ForeignKey('articles.id'))  # 近似重複の代表記事（代表記事自身はNULL）
     author = Column(String(200))
     source_site = Column(String(100), nullable=False)  # qiita, zenn, etc.
     published_at = Column(DateTime)
     scraped_at = Column(DateTime, default=datetime.utcnow)
+    first_seen_at = Column(DateTime, default=datetime.utcnow)  # 初回保存時刻（再取得でも更新しない）
     
     # スコアリング
     view_count = Column(Integer, default=0)
@@ -42,6 +53,7 @@ class Article(Base):
     comment_count = Column(Integer, default=0)
     tech_feed_score = Column(Float, default=0.0)  # 独自スコア
     difficulty_level = Column(Integer, default=1)  # 1-5の難易度
+    code_block_count = Column(Integer)  # HTML抽出時に数えたコードブロック数（難易度の再推定用、不明ならNULL）
     
     # メタデータ
     reading_time = Column(Integer)  # 推定読了時間（分）
@@ -53,6 +65,23 @@ class Article(Base):
     tags = relationship("TechTag", secondary=article_tags, back_populates="articles")
     read_records = relationship("ReadRecord", back_populates="article")
 
+    # 一覧APIのキーセットページネーション用インデックス
+    # (並び順の列, id) と、絞り込み条件を先頭に置いた複合インデックス
+    __table_args__ = (
+        Index('ix_articles_scraped_at_id', 'scraped_at', 'id'),
+        Index('ix_articles_score_id', 'tech_feed_score', 'id'),
+        Index('ix_articles_published_at_id', 'published_at', 'id'),
+        Index('ix_articles_source_scraped_at_id', 'source_site', 'scraped_at', 'id'),
+        Index('ix_articles_source_score_id', 'source_site', 'tech_feed_score', 'id'),
+        Index('ix_articles_tutorial_scraped_at_id', 'is_tutorial', 'scraped_at', 'id'),
+        Index('ix_articles_difficulty_scraped_at_id', 'difficulty_level', 'scraped_at', 'id'),
+        # タグトレンドの時間バケット再集計用（公開日時、無ければ初回保存時刻）
+        Index('ix_articles_activity_at', func.coalesce(published_at, first_seen_at)),
+        # 代表記事の付け替え（canonical_id = ?）用。一覧の canonical_id IS NULL の絞り込みに選ばれて
+        # 並び順のインデックスが使われなくならないよう、重複記事の行だけの部分インデックスにする
+        Index('ix_articles_canonical_id', 'canonical_id', sqlite_where=canonical_id.isnot(None)),
+    )
+
 class TechTag(Base):
     __tablename__ = 'tech_tags'
     
@@ -106,6 +135,10 @@ class ReadRecord(Base):
     user = relationship("User", back_populates="read_records")
     article = relationship("Article", back_populates="read_records")
 
+    __table_args__ = (
+        Index('ix_read_records_user_article', 'user_id', 'article_id'),  # ユーザーの既読記事の取得用
+    )
+
 class LearningPath(Base):
     __tablename__ = 'learning_paths'
     
@@ -140,6 +173,48 @@ class LearningStep(Base):
     # リレーション
     path = relationship("LearningPath", back_populates="steps")
 
+class TagActivity(Base):
+    """タグごとの1時間単位の記事数・エンゲージメント（タグトレンドの集計元）"""
+    __tablename__ = 'tag_activity'
+
+    tag_id = Column(Integer, ForeignKey('tech_tags.id'), primary_key=True)
+    hour = Column(Integer, primary_key=True)  # UNIX時刻 // 3600
+    article_count = Column(Integer, default=0, nullable=False)
+    engagement = Column(Float, default=0.0, nullable=False)
+
+    __table_args__ = (
+        Index('ix_tag_activity_hour', 'hour'),
+    )
+
+class ArticleStat(Base):
+    """記事数などの集計値（DatabasePipelineが記事保存と同じトランザクションで加算する）"""
+    __tablename__ = 'article_stats'
+
+    scope = Column(String(20), primary_key=True)  # total, source, tag, day
+    key = Column(String(200), primary_key=True)  # ソース名・タグ名・日付(YYYY-MM-DD)など
+    count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ArticleBand(Base):
+    """近似重複検出のLSHバケット（代表記事の署名のバンドごとに1行）"""
+    __tablename__ = 'article_lsh_bands'
+
+    bucket = Column(BigInteger, primary_key=True)  # バンド番号と署名の一部から作るキー
+    article_id = Column(Integer, ForeignKey('articles.id'), primary_key=True)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+class RelatedArticle(Base):
+    """記事ごとの関連記事（類似度の上位から rank = 0, 1, ...）"""
+    __tablename__ = 'related_articles'
+
+    article_id = Column(Integer, ForeignKey('articles.id'), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    related_id = Column(Integer, ForeignKey('articles.id'), nullable=False)
+    score = Column(Float, nullable=False)  # コサイン類似度
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
 class ScrapingJob(Base):
     __tablename__ = 'scraping_jobs'
     
@@ -153,17 +228,136 @@ class ScrapingJob(Base):
     logs = Column(Text)
 
 # データベース接続
-DATABASE_URL = "sqlite:///data/articles.db"
-engine = create_engine(DATABASE_URL, echo=False)
+DATABASE_URL = project_settings.DATABASE_URL
+
+_engines = {}
+
+def get_engine(database_url=DATABASE_URL, **engine_kwargs):
+    """プロセス内で共有するエンジンを取得（URLごとに1つ、engine_kwargsは初回のみ反映）"""
+    if database_url not in _engines:
+        _engines[database_url] = _create_engine(database_url, **engine_kwargs)
+    return _engines[database_url]
+
+def _create_engine(database_url, **engine_kwargs):
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(database_url, echo=False, **engine_kwargs)
+
+    in_memory = url.database in (None, '', ':memory:')
+    if not in_memory:
+        # クローラーとWebで共有する接続プール
+        engine_kwargs.setdefault('pool_size', project_settings.DATABASE_POOL_SIZE)
+        engine_kwargs.setdefault('max_overflow', project_settings.DATABASE_MAX_OVERFLOW)
+    engine = create_engine(database_url, echo=False, **engine_kwargs)
+
+    pragmas = dict(project_settings.SQLITE_PRAGMAS)
+    if in_memory:
+        # メモリDBではWAL・mmapは使えない
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    event.listen(engine, 'connect', lambda dbapi_connection, record: _apply_pragmas(dbapi_connection, pragmas))
+    return engine
+
+def _apply_pragmas(dbapi_connection, pragmas):
+    """接続ごとにSQLiteのプラグマを設定"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+engine = get_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def create_database(database_url=DATABASE_URL):
+def create_database(database_url=DATABASE_URL, **engine_kwargs):
+    """スキーマを作成・移行し、(共有エンジン, セッションファクトリ) を返す"""
     global engine, SessionLocal
-    engine = create_engine(database_url, echo=False)
+    engine = get_engine(database_url, **engine_kwargs)
     Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    _ensure_article_tags_unique(engine)
+    _add_missing_indexes(engine)
+    _ensure_search_index(engine)
+    _ensure_stats(engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     return engine, SessionLocal
 
+_shared_databases = {}
+
+def get_shared_database(database_url=DATABASE_URL, **engine_kwargs):
+    """プロセス内で共有するエンジンとセッションファクトリを取得（スキーマ作成は初回のみ）
+
+    engine_kwargs（pool_size等）は初回のエンジン作成時にのみ反映される。
+    """
+    if database_url not in _shared_databases:
+        _shared_databases[database_url] = create_database(database_url, **engine_kwargs)
+    return _shared_databases[database_url]
+
+# 既存DBに列を追加した際に既存行を埋める値（列名→SQL式）
+_COLUMN_BACKFILLS = {
+    ('articles', 'first_seen_at'): 'scraped_at',
+}
+
+def _add_missing_columns(engine):
+    """既存DBのテーブルにモデルで追加された列をALTER TABLEで追加"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                backfill = _COLUMN_BACKFILLS.get((table.name, column.name))
+                if backfill:
+                    conn.execute(text(f'UPDATE {table.name} SET {column.name} = {backfill}'))
+
+def _add_missing_indexes(engine):
+    """既存DBのテーブルにモデルで追加されたインデックスを作成"""
+    with engine.begin() as conn:
+        # 式インデックスはリフレクションできず checkfirst が使えないため名前で確認する
+        existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+
+def _ensure_search_index(engine):
+    """全文検索用のFTS5テーブルを用意（SQLiteのみ）"""
+    if engine.dialect.name != 'sqlite':
+        return
+    from engineed.models.search import ensure_search_index
+    ensure_search_index(engine)
+
+def _ensure_stats(engine):
+    """集計テーブルが空で記事がある場合（既存DBへの初回導入時）は全件から集計"""
+    from engineed.models.stats import recompute_stats
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM article_stats LIMIT 1")).first():
+            return
+        if not conn.execute(text("SELECT 1 FROM articles LIMIT 1")).first():
+            return
+        recompute_stats(conn)
+
+def _ensure_article_tags_unique(engine):
+    """既存DBのarticle_tagsから重複行を除去し、一意インデックスを付与（インデックスが無い場合のみ）"""
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_article_tags_article_tag'"
+        )).first()
+        if exists:
+            return
+        conn.execute(text(
+            "DELETE FROM article_tags WHERE rowid NOT IN ("
+            "SELECT MIN(rowid) FROM article_tags GROUP BY article_id, tag_id)"
+        ))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX uq_article_tags_article_tag "
+            "ON article_tags (article_id, tag_id)"
+        ))
+
 def get_db_session(SessionLocal):
     db = SessionLocal()
     try:
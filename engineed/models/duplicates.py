@@ -0,0 +1,187 @@
+import time
+import logging
+import numpy as np
+from engineed.utils.fingerprint import NUM_PERM, band_keys, signature_array, estimate_similarity, minhash_signature
+
+logger = logging.getLogger(__name__)
+
+# 署名の一致率がこれ以上なら同じ記事（転載・引用元の再掲）とみなす
+DUPLICATE_THRESHOLD = 0.8
+
+
+def _placeholders(values):
+    return ', '.join('?' * len(values))
+
+
+def find_canonical(cursor, signature, threshold=DUPLICATE_THRESHOLD, exclude_id=None):
+    """署名が近い代表記事のIDを返す（無ければ None）
+
+    バケット表には代表記事だけが入っているため、バンドごとの主キー検索で
+    候補を集め、候補の署名とだけ比較する（全記事との総当たりはしない）。
+    """
+    keys = band_keys(signature)
+    cursor.execute(
+        f"SELECT DISTINCT article_id FROM article_lsh_bands WHERE bucket IN ({_placeholders(keys)})", keys
+    )
+    candidate_ids = [article_id for (article_id,) in cursor.fetchall() if article_id != exclude_id]
+    if not candidate_ids:
+        return None
+
+    cursor.execute(
+        f"SELECT id, fingerprint FROM articles WHERE id IN ({_placeholders(candidate_ids)}) "
+        "AND fingerprint IS NOT NULL",
+        candidate_ids,
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    similarity = estimate_similarity(signature, np.array([signature_array(row[1]) for row in rows]))
+    best = int(np.argmax(similarity))
+    return rows[best][0] if similarity[best] >= threshold else None
+
+
+class BandSnapshot:
+    """保存済みの代表記事のバケットと署名をメモリに読み込んだ索引（読み取り専用）
+
+    FingerprintPipeline がアイテムごとにDBを引かずに済むよう、クロール開始時に1回だけ読み込む。
+    バケットはソート済みの配列にして二分探索で引く。クロール中に保存された記事は含まないが、
+    それらの紐付けは DatabasePipeline が保存時に link_duplicates で行う。
+    """
+
+    def __init__(self, buckets, bucket_article_ids, article_ids, signatures):
+        self.buckets = buckets
+        self.bucket_article_ids = bucket_article_ids
+        self.article_ids = article_ids
+        self.signatures = signatures
+
+    @classmethod
+    def load(cls, session):
+        cursor = session.connection().connection.cursor()
+        try:
+            # 主キー (bucket, article_id) の順に読むためソート済みで返る
+            cursor.execute("SELECT bucket, article_id FROM article_lsh_bands ORDER BY bucket")
+            bands = np.array(cursor.fetchall(), dtype=[('bucket', '<i8'), ('article_id', '<i8')])
+            cursor.execute(
+                "SELECT id, fingerprint FROM articles WHERE id IN (SELECT article_id FROM article_lsh_bands) "
+                "AND fingerprint IS NOT NULL ORDER BY id"
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        signatures = np.array([signature_array(row[1]) for row in rows], dtype='<u4').reshape(len(rows), NUM_PERM)
+        return cls(
+            bands['bucket'], bands['article_id'],
+            np.array([row[0] for row in rows], dtype='<i8'), signatures,
+        )
+
+    def __len__(self):
+        return len(self.article_ids)
+
+    def find(self, signature, threshold=DUPLICATE_THRESHOLD):
+        """署名が近い代表記事のIDを返す（無ければ None）"""
+        keys = np.array(band_keys(signature), dtype='<i8')
+        starts = np.searchsorted(self.buckets, keys, side='left')
+        ends = np.searchsorted(self.buckets, keys, side='right')
+        if not (ends > starts).any():
+            return None
+        candidate_ids = np.unique(np.concatenate([
+            self.bucket_article_ids[start:end] for start, end in zip(starts, ends)
+        ]))
+        positions = np.clip(np.searchsorted(self.article_ids, candidate_ids), 0, len(self.article_ids) - 1)
+        positions = positions[self.article_ids[positions] == candidate_ids]
+        if len(positions) == 0:
+            return None
+        similarity = estimate_similarity(signature, self.signatures[positions])
+        best = int(np.argmax(similarity))
+        return int(self.article_ids[positions[best]]) if similarity[best] >= threshold else None
+
+
+def link_duplicates(session, fingerprints, threshold=DUPLICATE_THRESHOLD):
+    """記事の署名を保存し、近似重複なら代表記事に紐付ける（呼び出し側のトランザクション内で実行）
+
+    fingerprints は 記事ID→署名（bytes、本文が短い場合は None）。
+    id の小さい（先に保存された）記事を代表とし、代表記事の署名だけをバケット表に入れる。
+    代表記事に紐付けた 記事ID→代表記事ID を返す。
+    """
+    article_ids = sorted(int(article_id) for article_id in fingerprints)
+    if not article_ids:
+        return {}
+
+    linked = {}
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"SELECT id, fingerprint, canonical_id FROM articles WHERE id IN ({_placeholders(article_ids)})",
+            article_ids,
+        )
+        previous = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        for article_id in article_ids:
+            signature = fingerprints[article_id]
+            old_signature, old_canonical = previous.get(article_id, (None, None))
+            if signature is not None and old_signature == signature:
+                continue  # 本文が変わっていない
+
+            if old_signature is not None and old_canonical is None:
+                # 代表記事だった場合は古い署名のバケットを外す
+                keys = band_keys(old_signature)
+                cursor.execute(
+                    f"DELETE FROM article_lsh_bands WHERE article_id = ? AND bucket IN ({_placeholders(keys)})",
+                    [article_id] + keys,
+                )
+
+            canonical_id = None
+            if signature is not None:
+                canonical_id = find_canonical(cursor, signature, threshold, exclude_id=article_id)
+            cursor.execute(
+                "UPDATE articles SET fingerprint = ?, canonical_id = ? WHERE id = ?",
+                (signature, canonical_id, article_id),
+            )
+            if canonical_id is not None:
+                linked[article_id] = canonical_id
+                # この記事を代表としていた記事は新しい代表に付け替える
+                cursor.execute(
+                    "UPDATE articles SET canonical_id = ? WHERE canonical_id = ?", (canonical_id, article_id)
+                )
+            elif signature is not None:
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO article_lsh_bands (bucket, article_id) VALUES (?, ?)",
+                    [(key, article_id) for key in band_keys(signature)],
+                )
+    finally:
+        cursor.close()
+    return linked
+
+
+def fingerprint_articles(session, rebuild=False, batch_size=1000, threshold=DUPLICATE_THRESHOLD):
+    """署名の無い記事（rebuild なら全記事）の署名を作って紐付け、(処理件数, 紐付け件数) を返す
+
+    id順に batch_size 件ずつ処理してコミットするため、途中で止めても続きから再開できる。
+    """
+    started = time.monotonic()
+    connection = session.connection()
+    if rebuild:
+        connection.exec_driver_sql("DELETE FROM article_lsh_bands")
+        connection.exec_driver_sql("UPDATE articles SET fingerprint = NULL, canonical_id = NULL")
+        session.commit()
+
+    processed = linked = 0
+    last_id = 0
+    while True:
+        rows = session.connection().exec_driver_sql(
+            "SELECT id, content FROM articles WHERE id > ? AND fingerprint IS NULL ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        fingerprints = {article_id: minhash_signature(content) for article_id, content in rows}
+        linked += len(link_duplicates(session, fingerprints, threshold))
+        session.commit()
+        processed += len(rows)
+
+    logger.info(
+        f"Fingerprinted {processed} articles ({linked} near-duplicates) "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return processed, linked
@@ -0,0 +1,199 @@
+import base64
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import select, func, and_, or_, tuple_, literal_column
+from engineed.models.database import Article, TechTag, RelatedArticle, article_tags
+from engineed.utils.tag_aliases import get_tag_alias_map
+
+# 一覧表示に必要な列（本文・要約は含めない）
+LISTING_COLUMNS = (
+    Article.id,
+    Article.title,
+    Article.url,
+    Article.author,
+    Article.source_site,
+    Article.published_at,
+    Article.scraped_at,
+    Article.reading_time,
+    Article.like_count,
+    Article.difficulty_level,
+    Article.tech_feed_score,
+    Article.is_tutorial,
+)
+
+EXCERPT_LENGTH = 200
+
+
+def listing_select(with_excerpt=False):
+    """一覧用の列だけを取得するSELECT文（with_excerpt で要約/本文の先頭をSQL側で切り出す）"""
+    columns = list(LISTING_COLUMNS)
+    if with_excerpt:
+        columns.append(
+            func.substr(func.coalesce(func.nullif(Article.summary, ''), Article.content), 1, EXCERPT_LENGTH).label('excerpt')
+        )
+    return select(*columns)
+
+
+def load_tag_names(session, article_ids):
+    """記事IDごとのタグ名リストを1クエリで取得"""
+    tag_names = defaultdict(list)
+    if not article_ids:
+        return tag_names
+
+    rows = session.execute(
+        select(article_tags.c.article_id, TechTag.name)
+        .join(TechTag, TechTag.id == article_tags.c.tag_id)
+        .where(article_tags.c.article_id.in_(article_ids))
+        .order_by(article_tags.c.article_id, TechTag.name)
+    )
+    for article_id, name in rows:
+        tag_names[article_id].append(name)
+    return tag_names
+
+
+def fetch_article_listing(session, stmt):
+    """listing_select() ベースの文を実行し、タグ付きの軽量なdictのリストを返す
+
+    ORMインスタンスを作らないため、セッションを閉じた後でもそのまま
+    テンプレートやJSONに渡せる。
+    """
+    return attach_tag_names(session, session.execute(stmt).mappings().all())
+
+
+def attach_tag_names(session, rows):
+    """一覧の各行をdictにし、タグ名リストを tags として付ける"""
+    tag_names = load_tag_names(session, [row['id'] for row in rows])
+    return [dict(row, tags=tag_names.get(row['id'], [])) for row in rows]
+
+
+# キーセットページネーションで使える並び順（いずれも (列, id) の降順）
+KEYSET_SORTS = {
+    'scraped_at': Article.scraped_at,
+    'score': Article.tech_feed_score,
+}
+
+MAX_PAGE_SIZE = 100
+
+# since / until の範囲内の記事がこの件数未満なら (published_at, id) のインデックスで範囲を読んでから並べ替える
+# （それ以上なら並び順のインデックスを先頭から読む方が早くページが埋まる）
+PUBLISHED_RANGE_SORT_MAX = 2000
+
+
+def encode_cursor(sort, value, article_id):
+    """ページ末尾の (並び順の値, id) を不透明なカーソル文字列にする"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, article_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(sort, cursor):
+    """カーソル文字列を (並び順の値, id) に戻す（不正な場合は ValueError）"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, article_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or not isinstance(article_id, int):
+            raise ValueError
+        if value is not None and sort == 'scraped_at':
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise ValueError(f"Invalid cursor for sort '{sort}'")
+    return value, article_id
+
+
+def _utc_naive(value):
+    """タイムゾーン付きの日時はUTCに変換してタイムゾーンを外す（DBの日時はUTCのnaive）"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def article_page(session, sort='scraped_at', limit=10, cursor=None, source_site=None, tag=None,
+                 since=None, until=None, is_tutorial=None, difficulty_level=None, with_excerpt=False,
+                 include_duplicates=False):
+    """絞り込み条件付きで記事一覧を1ページ取得し、(記事リスト, 次ページのカーソル) を返す
+
+    include_duplicates を指定しない限り、近似重複の記事（canonical_id あり）は除く。
+    since / until は公開日時（published_at、UTC）の範囲。ほかにインデックスの先頭の列で絞り込まず、
+    範囲内の記事が少ない場合は (published_at, id) のインデックスで範囲だけを読んで並べ替える。
+
+    OFFSETを使わず、直前のページ末尾の (並び順の値, id) より後ろを
+    インデックス上で読み始めるため、深いページでも1ページ目と同じコストで済む。
+    """
+    if sort not in KEYSET_SORTS:
+        raise ValueError(f"Unknown sort '{sort}' (expected one of: {', '.join(KEYSET_SORTS)})")
+    sort_column = KEYSET_SORTS[sort]
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    stmt = listing_select(with_excerpt=with_excerpt)
+    if not include_duplicates:
+        stmt = stmt.where(Article.canonical_id.is_(None))
+    if source_site:
+        stmt = stmt.where(Article.source_site == source_site)
+    if is_tutorial is not None:
+        stmt = stmt.where(Article.is_tutorial == is_tutorial)
+    if difficulty_level is not None:
+        stmt = stmt.where(Article.difficulty_level == difficulty_level)
+    published_range = []
+    if since is not None:
+        published_range.append(Article.published_at >= _utc_naive(since))
+    if until is not None:
+        published_range.append(Article.published_at < _utc_naive(until))
+    stmt = stmt.where(*published_range)
+    if tag:
+        stmt = stmt.where(Article.id.in_(
+            select(article_tags.c.article_id)
+            .join(TechTag, TechTag.id == article_tags.c.tag_id)
+            .where(TechTag.name == get_tag_alias_map().resolve(tag))
+        ))
+
+    if cursor:
+        value, last_id = decode_cursor(sort, cursor)
+        if value is None:
+            # NULLは降順の末尾に並ぶため、NULL同士をidで続きから読む
+            stmt = stmt.where(and_(sort_column.is_(None), Article.id < last_id))
+        else:
+            stmt = stmt.where(or_(
+                tuple_(sort_column, Article.id) < tuple_(value, last_id),
+                sort_column.is_(None),
+            ))
+
+    order_column = sort_column
+    indexed_filter = source_site or is_tutorial is not None or difficulty_level is not None
+    if published_range and not indexed_filter and _narrow_published_range(session, published_range):
+        # 単項 + で並び順の列のインデックスを使わせず、公開日時のインデックスで範囲を読ませる
+        order_column = literal_column(f"+{Article.__tablename__}.{sort_column.key}")
+
+    # 1件多く取得して次ページの有無を判定する
+    stmt = stmt.order_by(order_column.desc(), Article.id.desc()).limit(limit + 1)
+    rows = session.execute(stmt).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1][sort_column.key], rows[-1]['id'])
+    return attach_tag_names(session, rows), next_cursor
+
+
+def _narrow_published_range(session, conditions):
+    """公開日時の範囲内の記事が PUBLISHED_RANGE_SORT_MAX 件未満か（インデックス上で上限件数までだけ数える）
+
+    SQLiteの統計（sqlite_stat4 なし）では範囲の件数を見積もれず、常に並び順のインデックスの
+    走査が選ばれて、狭い範囲の指定でも全記事を読むことになるため。
+    """
+    matched = select(Article.id).where(*conditions).limit(PUBLISHED_RANGE_SORT_MAX).subquery()
+    return session.execute(select(func.count()).select_from(matched)).scalar() < PUBLISHED_RANGE_SORT_MAX
+
+
+def related_articles(session, article_id, limit=5):
+    """事前計算した関連記事（類似度順、近似重複を除く）"""
+    stmt = (
+        listing_select()
+        .add_columns(RelatedArticle.score)
+        .join(RelatedArticle, RelatedArticle.related_id == Article.id)
+        .where(RelatedArticle.article_id == article_id, Article.canonical_id.is_(None))
+        .order_by(RelatedArticle.rank)
+        .limit(limit)
+    )
+    return fetch_article_listing(session, stmt)
@@ -0,0 +1,155 @@
+import logging
+from sqlalchemy import text, bindparam, DateTime
+from engineed.models.queries import attach_tag_names
+from engineed.utils.tag_aliases import get_tag_alias_map
+
+logger = logging.getLogger(__name__)
+
+# 記事の全文検索インデックス（FTS5、rowid = articles.id）
+# 日本語は分かち書きされないため trigram トークナイザで3文字単位に索引する
+SEARCH_TABLE = 'articles_fts'
+
+CREATE_SEARCH_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    "USING fts5(title, summary, content, tags, tokenize='trigram')"
+)
+
+# articles からインデックス行を作るSELECT（タグ名は空白区切りで1列にまとめる）
+_INDEX_SELECT = (
+    "SELECT a.id, a.title, a.summary, a.content, "
+    "(SELECT group_concat(t.name, ' ') FROM article_tags at "
+    " JOIN tech_tags t ON t.id = at.tag_id WHERE at.article_id = a.id) "
+    "FROM articles a"
+)
+
+# BM25の列ごとの重み（title, summary, content, tags）
+BM25_WEIGHTS = (10.0, 4.0, 1.0, 6.0)
+
+# trigramで索引できない短い語（2文字以下）は、MATCHの結果を title / tags の部分一致で絞り込む。
+# 短い語だけの検索（"Go"、"AI" など）はタグ名の一致で探す（全文の走査はしない）
+MIN_MATCH_LENGTH = 3
+
+MAX_RESULTS = 100
+SNIPPET_TOKENS = 16
+
+
+def has_search_index(engine):
+    """全文検索テーブルが存在するか"""
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': SEARCH_TABLE},
+        ).first() is not None
+
+
+def ensure_search_index(engine):
+    """全文検索テーブルを作成し、新規作成時は既存記事で埋める（FTS5が無ければ False）"""
+    if has_search_index(engine):
+        return True
+    with engine.begin() as conn:
+        try:
+            conn.execute(text(CREATE_SEARCH_TABLE))
+        except Exception as e:
+            logger.warning(f"Full-text search is disabled (FTS5 trigram unavailable): {e}")
+            return False
+        conn.execute(text(f"INSERT INTO {SEARCH_TABLE} (rowid, title, summary, content, tags) {_INDEX_SELECT}"))
+    return True
+
+
+def index_articles(session, article_ids):
+    """指定記事のインデックス行を作り直す（呼び出し側のトランザクション内で実行）"""
+    article_ids = [int(article_id) for article_id in article_ids]
+    if not article_ids:
+        return
+    ids = bindparam('ids', expanding=True)
+    session.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :ids").bindparams(ids), {'ids': article_ids}
+    )
+    session.execute(text(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, summary, content, tags) "
+        f"{_INDEX_SELECT} WHERE a.id IN :ids"
+    ).bindparams(ids), {'ids': article_ids})
+
+
+def rebuild_search_index(engine):
+    """インデックスを全記事から作り直し、索引した記事数を返す"""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+        conn.execute(text(CREATE_SEARCH_TABLE))
+        conn.execute(text(f"INSERT INTO {SEARCH_TABLE} (rowid, title, summary, content, tags) {_INDEX_SELECT}"))
+        # セグメントを1つにまとめて検索を速くする
+        conn.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+        return conn.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+
+
+def build_match_query(query):
+    """検索語を (FTS5のMATCH式, 短い語のリスト) に分ける
+
+    3文字以上の語はフレーズとしてクォートし、すべてを含む記事（AND）にマッチさせる。
+    """
+    phrases, short_terms = [], []
+    for term in query.split():
+        if len(term) >= MIN_MATCH_LENGTH:
+            phrases.append('"' + term.replace('"', '""') + '"')
+        else:
+            short_terms.append(term)
+    return ' '.join(phrases), short_terms
+
+
+def search_articles(session, query, limit=20, offset=0):
+    """全文検索（BM25順）。各結果に一致箇所のスニペットとタグ名を付けて返す"""
+    match, short_terms = build_match_query(query)
+    if not match and not short_terms:
+        return []
+
+    limit = max(1, min(limit, MAX_RESULTS))
+    params = {'limit': limit, 'offset': max(0, offset)}
+    if not match:
+        return _search_by_tags(session, short_terms, params)
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    snippet = f"snippet({SEARCH_TABLE}, -1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS})"
+    rank = f"bm25({SEARCH_TABLE}, {weights})"
+    conditions = [f"{SEARCH_TABLE} MATCH :match"]
+    params['match'] = match
+    for i, term in enumerate(short_terms):
+        # MATCHで絞り込んだ行だけを調べる
+        conditions.append(
+            f"(instr({SEARCH_TABLE}.title, :short{i}) > 0 OR instr({SEARCH_TABLE}.tags, :short{i}) > 0)"
+        )
+        params[f'short{i}'] = term
+
+    rows = session.execute(text(
+        f"SELECT a.id, a.title, a.url, a.author, a.source_site, a.published_at, "
+        f"a.tech_feed_score, {snippet} AS snippet, {rank} AS rank "
+        f"FROM {SEARCH_TABLE} JOIN articles a ON a.id = {SEARCH_TABLE}.rowid "
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY rank LIMIT :limit OFFSET :offset"
+    ).columns(published_at=DateTime()), params).mappings().all()
+    return attach_tag_names(session, rows)
+
+
+def _search_by_tags(session, short_terms, params):
+    """短い語だけの検索。すべての語をタグに持つ記事を新しい順に返す
+
+    MATCHが使えず、本文やタイトルの部分一致では全記事の走査になるため、
+    語を正規タグ名に解決してタグのインデックス（ix_article_tags_tag_article）で引く。
+    """
+    tag_names = get_tag_alias_map().resolve_all(short_terms)
+    if not tag_names:
+        return []
+    conditions = []
+    for i, name in enumerate(tag_names):
+        conditions.append(
+            "a.id IN (SELECT at.article_id FROM article_tags at "
+            f"JOIN tech_tags t ON t.id = at.tag_id WHERE t.name = :tag{i})"
+        )
+        params[f'tag{i}'] = name
+
+    rows = session.execute(text(
+        "SELECT a.id, a.title, a.url, a.author, a.source_site, a.published_at, "
+        "a.tech_feed_score, NULL AS snippet, -a.id AS rank FROM articles a "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY a.id DESC LIMIT :limit OFFSET :offset"
+    ).columns(published_at=DateTime()), params).mappings().all()
+    return attach_tag_names(session, rows)
@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SessionRunner:
+    """同期セッションでのDB処理を専用スレッドプールで実行する
+
+    async関数から同期のSQLAlchemyクエリを直接呼ぶとイベントループが
+    止まるため、fn(session, *args) をスレッドで実行して結果をawaitする。
+    同時実行数は max_workers で制限され、接続プールもこれに合わせて確保する。
+    """
+
+    def __init__(self, SessionLocal, max_workers=8):
+        self.SessionLocal = SessionLocal
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+
+    async def run(self, fn, *args):
+        """fn(session, *args) をスレッドで実行し、その戻り値を返す"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._run, fn, args)
+
+    def _run(self, fn, args):
+        session = self.SessionLocal()
+        try:
+            return fn(session, *args)
+        finally:
+            session.close()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
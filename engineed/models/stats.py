@@ -0,0 +1,105 @@
+from datetime import datetime
+from sqlalchemy import select, delete, func, insert, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from engineed.models.database import Article, TechTag, ArticleStat, article_tags
+
+SCOPE_TOTAL = 'total'
+SCOPE_SOURCE = 'source'
+SCOPE_TAG = 'tag'
+SCOPE_DAY = 'day'
+
+TOTAL_ARTICLES = 'articles'
+
+
+def day_key(published_at):
+    """日別集計のキー（公開日が無い記事は集計しない）"""
+    return published_at.date().isoformat() if published_at else None
+
+
+def increment_stats(session, new_articles=(), new_tag_names=(), now=None):
+    """新規記事・新規タグ付けの分だけ集計値を加算する（呼び出し側のトランザクション内で実行）
+
+    new_articles は source_site / published_at を持つdict。記事が無くても
+    total の更新時刻を進めるため、最終スクレイピング時刻として使える。
+    """
+    now = now or datetime.utcnow()
+    deltas = {(SCOPE_TOTAL, TOTAL_ARTICLES): 0}
+    for article in new_articles:
+        deltas[(SCOPE_TOTAL, TOTAL_ARTICLES)] += 1
+        source_key = (SCOPE_SOURCE, article['source_site'])
+        deltas[source_key] = deltas.get(source_key, 0) + 1
+        day = day_key(article.get('published_at'))
+        if day:
+            deltas[(SCOPE_DAY, day)] = deltas.get((SCOPE_DAY, day), 0) + 1
+    for name in new_tag_names:
+        deltas[(SCOPE_TAG, name)] = deltas.get((SCOPE_TAG, name), 0) + 1
+
+    stmt = sqlite_insert(ArticleStat).values([
+        {'scope': scope, 'key': key, 'count': count, 'updated_at': now}
+        for (scope, key), count in deltas.items()
+    ])
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[ArticleStat.scope, ArticleStat.key],
+        set_={
+            'count': ArticleStat.count + stmt.excluded.count,
+            'updated_at': stmt.excluded.updated_at,
+        },
+    ))
+
+
+def recompute_stats(session):
+    """集計テーブルを記事・タグのテーブルから作り直す（Session/Connectionどちらでも可）"""
+    now = datetime.utcnow()
+    columns = ['scope', 'key', 'count', 'updated_at']
+    session.execute(delete(ArticleStat))
+    session.execute(insert(ArticleStat).from_select(columns, select(
+        literal(SCOPE_TOTAL), literal(TOTAL_ARTICLES), func.count(Article.id),
+        func.coalesce(func.max(Article.scraped_at), now),
+    )))
+    session.execute(insert(ArticleStat).from_select(columns, select(
+        literal(SCOPE_SOURCE), Article.source_site, func.count(Article.id), func.max(Article.scraped_at),
+    ).group_by(Article.source_site)))
+    session.execute(insert(ArticleStat).from_select(columns, select(
+        literal(SCOPE_DAY), func.date(Article.published_at), func.count(Article.id), literal(now),
+    ).where(Article.published_at.isnot(None)).group_by(func.date(Article.published_at))))
+    session.execute(insert(ArticleStat).from_select(columns, select(
+        literal(SCOPE_TAG), TechTag.name, func.count(article_tags.c.article_id), literal(now),
+    ).join(article_tags, article_tags.c.tag_id == TechTag.id).group_by(TechTag.name)))
+
+
+def total_articles(session):
+    """総記事数（主キー1行の参照）"""
+    count = session.scalar(
+        select(ArticleStat.count)
+        .where(ArticleStat.scope == SCOPE_TOTAL, ArticleStat.key == TOTAL_ARTICLES)
+    )
+    return count or 0
+
+
+def read_stats(session, days=30, top_tags=20):
+    """統計ページ用の集計値（記事は全件走査をせず集計テーブルだけを読む）
+
+    タグ数は記事の無いタグも含めた tech_tags の件数（タグは記事より桁違いに少ないため count(*) で数える）。
+    """
+    total = session.execute(
+        select(ArticleStat.count, ArticleStat.updated_at)
+        .where(ArticleStat.scope == SCOPE_TOTAL, ArticleStat.key == TOTAL_ARTICLES)
+    ).first()
+
+    def scope_rows(scope, order_by, limit=None):
+        stmt = (
+            select(ArticleStat.key, ArticleStat.count)
+            .where(ArticleStat.scope == scope, ArticleStat.count > 0)
+            .order_by(order_by)
+            .limit(limit)
+        )
+        return [tuple(row) for row in session.execute(stmt)]
+
+    return {
+        "total_articles": total.count if total else 0,
+        "last_scraped_at": total.updated_at if total else None,
+        "total_tags": session.scalar(select(func.count(TechTag.id))),
+        "sources": scope_rows(SCOPE_SOURCE, ArticleStat.count.desc()),
+        "top_tags": scope_rows(SCOPE_TAG, ArticleStat.count.desc(), top_tags),
+        "articles_per_day": scope_rows(SCOPE_DAY, ArticleStat.key.desc(), days),
+    }
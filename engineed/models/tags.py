@@ -0,0 +1,134 @@
+import json
+import time
+import logging
+from collections import defaultdict
+from engineed.models.search import index_articles, has_search_index
+from engineed.models.stats import recompute_stats
+from engineed.utils.tag_aliases import get_tag_alias_map
+
+logger = logging.getLogger(__name__)
+
+# タグIDのリストをJSONで持つ列（統合したタグのIDを書き換える）
+TAG_ID_LIST_COLUMNS = [
+    ('learning_paths', 'target_tags'),
+    ('learning_steps', 'prerequisites'),
+]
+
+
+def plan_tag_merges(tags, aliases):
+    """(id, name, 記事数) のタグ一覧から、(統合元ID→残すタグID, 残すタグID→新しい名前) を作る
+
+    正規タグ名が同じタグのうち、正規タグ名そのもののタグ（無ければ記事数の最も多いタグ）を残す。
+    """
+    groups = defaultdict(list)
+    for tag in tags:
+        canonical = aliases.resolve(tag[1])
+        if canonical:
+            groups[canonical].append(tag)
+
+    merges = {}
+    renames = {}
+    for canonical, group in groups.items():
+        target = next((tag for tag in group if tag[1] == canonical), None)
+        if target is None:
+            target = max(group, key=lambda tag: (tag[2], -tag[0]))
+            renames[target[0]] = canonical
+        for tag_id, _, _ in group:
+            if tag_id != target[0]:
+                merges[tag_id] = target[0]
+    return merges, renames
+
+
+def merge_tags(session, aliases=None, dry_run=False):
+    """既存のタグを正規タグ名ごとに統合し、(統合したタグ数, 付け替えた記事数, 統合元タグ名→正規タグ名) を返す
+
+    関連付け（article_tags・user_interests・親タグ・学習パスのタグIDリスト）は
+    統合元→統合先の対応表（一時テーブル）を使った集合演算で一括で付け替え、
+    統合元のタグを削除する。タグ別の集計値と、付け替えた記事の全文検索インデックスも作り直す。
+    tag_activity は統合元の分を削除するだけなので、呼び出し側でタグトレンドを全件再集計すること。
+    コミットは呼び出し側で行う（dry_run の場合は何も書き換えない）。
+    """
+    started = time.monotonic()
+    aliases = aliases or get_tag_alias_map()
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT t.id, t.name, (SELECT count(*) FROM article_tags at WHERE at.tag_id = t.id) FROM tech_tags t"
+        )
+        tags = cursor.fetchall()
+        names = {tag_id: name for tag_id, name, _ in tags}
+        merges, renames = plan_tag_merges(tags, aliases)
+        planned = {
+            names[old_id]: renames.get(new_id, names[new_id]) for old_id, new_id in merges.items()
+        }
+        planned.update({names[tag_id]: name for tag_id, name in renames.items()})
+        if dry_run or not (merges or renames):
+            return len(merges), 0, planned
+
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS tag_merge_map (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)"
+        )
+        cursor.execute("DELETE FROM tag_merge_map")
+        cursor.executemany("INSERT INTO tag_merge_map (old_id, new_id) VALUES (?, ?)", list(merges.items()))
+
+        cursor.execute(
+            "SELECT DISTINCT article_id FROM article_tags "
+            "WHERE tag_id IN (SELECT old_id FROM tag_merge_map) "
+            f"OR tag_id IN ({', '.join('?' * len(renames))})",
+            list(renames),
+        )
+        article_ids = [article_id for (article_id,) in cursor.fetchall()]
+
+        # 関連付けを統合先に付け替える（既に統合先にも付いている記事・ユーザーは重複させない）
+        cursor.execute(
+            "INSERT OR IGNORE INTO article_tags (article_id, tag_id) "
+            "SELECT at.article_id, m.new_id FROM article_tags at JOIN tag_merge_map m ON m.old_id = at.tag_id"
+        )
+        cursor.execute("DELETE FROM article_tags WHERE tag_id IN (SELECT old_id FROM tag_merge_map)")
+        cursor.execute(
+            "INSERT INTO user_interests (user_id, tag_id) "
+            "SELECT DISTINCT ui.user_id, m.new_id FROM user_interests ui "
+            "JOIN tag_merge_map m ON m.old_id = ui.tag_id "
+            "WHERE NOT EXISTS (SELECT 1 FROM user_interests e WHERE e.user_id = ui.user_id AND e.tag_id = m.new_id)"
+        )
+        cursor.execute("DELETE FROM user_interests WHERE tag_id IN (SELECT old_id FROM tag_merge_map)")
+        cursor.execute(
+            "UPDATE tech_tags SET parent_id = (SELECT new_id FROM tag_merge_map WHERE old_id = tech_tags.parent_id) "
+            "WHERE parent_id IN (SELECT old_id FROM tag_merge_map)"
+        )
+        cursor.execute("DELETE FROM tag_activity WHERE tag_id IN (SELECT old_id FROM tag_merge_map)")
+        for table, column in TAG_ID_LIST_COLUMNS:
+            _remap_tag_id_lists(cursor, table, column, merges)
+
+        cursor.execute("DELETE FROM tech_tags WHERE id IN (SELECT old_id FROM tag_merge_map)")
+        cursor.executemany(
+            "UPDATE tech_tags SET name = ? WHERE id = ?", [(name, tag_id) for tag_id, name in renames.items()]
+        )
+        cursor.execute("DELETE FROM tag_merge_map")
+    finally:
+        cursor.close()
+
+    recompute_stats(session)
+    if has_search_index(session.get_bind()):
+        for start in range(0, len(article_ids), 10000):
+            index_articles(session, article_ids[start:start + 10000])
+
+    logger.info(
+        f"Merged {len(merges)} tags and renamed {len(renames)} tags on {len(article_ids)} articles "
+        f"in {time.monotonic() - started:.2f}s"
+    )
+    return len(merges), len(article_ids), planned
+
+
+def _remap_tag_id_lists(cursor, table, column, merges):
+    """JSONのタグIDリストの統合元IDを統合先IDに置き換える（重複は除き、順序は保つ）"""
+    cursor.execute(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")
+    updates = []
+    for row_id, value in cursor.fetchall():
+        tag_ids = json.loads(value)
+        if not isinstance(tag_ids, list) or not any(tag_id in merges for tag_id in tag_ids):
+            continue
+        remapped = list(dict.fromkeys(merges.get(tag_id, tag_id) for tag_id in tag_ids))
+        updates.append((json.dumps(remapped), row_id))
+    if updates:
+        cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
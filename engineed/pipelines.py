@@ -1,11 +1,193 @@
+from sqlalchemy import select, func, case, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
-from engineed.models.database import Article, TechTag, article_tags, create_database
+from twisted.internet import task
+from engineed.models.database import Article, TechTag, article_tags, get_shared_database
+from engineed.models.search import index_articles, has_search_index
+from engineed.models.stats import increment_stats
+from engineed.models.duplicates import BandSnapshot, link_duplicates
 from engineed.ai.keyword_extractor import TechKeywordExtractor
+from engineed.ai.async_summarizer import AsyncSummarizer
+from engineed.ai.feed_scorer import get_feed_scorer
+from engineed.ai.tag_trends import get_tag_trend_engine
+from engineed.ai.related_articles import get_related_articles_index
+from engineed.ai.summary_cache import get_summary_cache
+from engineed.ai.term_sketch import get_term_sketch
 from engineed.utils.text_processor import TextProcessor
+from engineed.utils.html_extractor import extract_article_text
+from engineed.utils.url_frontier import canonicalize_url, url_frontier_from_settings
+from engineed.utils.stage_executor import stage_executor_from_settings
+from engineed.utils.fingerprint import minhash_signature
+from engineed.utils.tag_aliases import get_tag_alias_map
+from scrapy.exceptions import DropItem
 from datetime import datetime
 import logging
 import hashlib
+import time
+
+class TagIdCache:
+    """タグ名→タグIDのプロセス内キャッシュ"""
+    
+    def __init__(self):
+        self.ids = {}
+        
+    def warm(self, session):
+        """tech_tags全体を読み込んでキャッシュを温める"""
+        self.ids.update(session.execute(select(TechTag.name, TechTag.id)).all())
+        
+    def clear(self):
+        self.ids.clear()
+        
+    def resolve(self, session, names, categorize):
+        """タグ名集合をIDに解決し、未知のタグは一括作成する"""
+        missing = [name for name in names if name not in self.ids]
+        if missing:
+            session.execute(
+                sqlite_insert(TechTag)
+                .values([{'name': name, 'category': categorize(name)} for name in missing])
+                .on_conflict_do_nothing(index_elements=[TechTag.name])
+            )
+            self.ids.update(
+                session.execute(
+                    select(TechTag.name, TechTag.id).where(TechTag.name.in_(missing))
+                ).all()
+            )
+        return {name: self.ids[name] for name in names}
+
+
+_tag_id_caches = {}
+
+def get_tag_id_cache(database_url):
+    """データベースURLごとに共有されるTagIdCacheを返す"""
+    if database_url not in _tag_id_caches:
+        _tag_id_caches[database_url] = TagIdCache()
+    return _tag_id_caches[database_url]
+
+def link_tags(session, tag_cache, tags_by_article):
+    """タグの作成・関連付け（記事ID→タグ名リスト）。新たに関連付けたタグ名のリストを返す"""
+    return [name for _, name in link_article_tags(session, tag_cache, tags_by_article)]
+
+def link_article_tags(session, tag_cache, tags_by_article):
+    """タグの作成・関連付け（記事ID→タグ名リスト）。新たに関連付けた (記事ID, タグ名) のリストを返す
+
+    タグ名は別名辞書で正規タグ名に解決してから保存する（"vuejs" → "vue.js" など）。
+    タグ数に関わらず、未知タグの一括INSERT＋ID取得と
+    article_tags への一括 INSERT OR IGNORE の定数回のクエリで済ませる。
+    """
+    aliases = get_tag_alias_map()
+    tags_by_article = {
+        article_id: aliases.resolve_all(names) for article_id, names in tags_by_article.items()
+    }
+    all_names = {name for names in tags_by_article.values() for name in names}
+    if not all_names:
+        return []
+    
+    tag_ids = tag_cache.resolve(session, all_names, categorize_tag)
+    
+    rows = [
+        {'article_id': article_id, 'tag_id': tag_ids[name]}
+        for article_id, names in tags_by_article.items()
+        for name in names
+    ]
+    # 実際に追加された関連付けだけが返るので、タグ別記事数の加算に使う
+    inserted = session.execute(
+        sqlite_insert(article_tags).values(rows).on_conflict_do_nothing()
+        .returning(article_tags.c.article_id, article_tags.c.tag_id)
+    ).all()
+    tag_names = {tag_id: name for name, tag_id in tag_ids.items()}
+    return [(article_id, tag_names[tag_id]) for article_id, tag_id in inserted]
+
+def categorize_tag(tag_name):
+    """タグのカテゴリ推定"""
+    # 簡易的なカテゴリ分類
+    languages = ['python', 'javascript', 'java', 'go', 'rust', 'typescript']
+    frameworks = ['react', 'vue', 'angular', 'django', 'flask', 'express']
+    tools = ['docker', 'kubernetes', 'git', 'jenkins', 'terraform']
+    
+    tag_lower = tag_name.lower()
+    
+    if any(lang in tag_lower for lang in languages):
+        return 'language'
+    elif any(fw in tag_lower for fw in frameworks):
+        return 'framework'
+    elif any(tool in tag_lower for tool in tools):
+        return 'tool'
+    else:
+        return 'concept'
+
+class CrawlCloseJobs:
+    """クロール終了時の処理（URLフロンティアの保存・タグトレンド・スコア・関連記事の更新）
+
+    通常は DatabasePipeline.close_spider がスパイダーごとに実行する。1プロセスで複数の
+    スパイダーを並行実行する場合（cli crawl --parallel）はスパイダーごとに実行すると
+    同じ処理が重複し同じファイルを奪い合うため、全スパイダーの終了後に1回だけ実行する。
+    """
+    
+    def __init__(self, feed_scorer=None, tag_trends=None, related_articles=None, url_frontier=None):
+        self.feed_scorer = feed_scorer
+        self.tag_trends = tag_trends
+        self.related_articles = related_articles
+        self.url_frontier = url_frontier
+        
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            feed_scorer=(
+                get_feed_scorer(settings.getfloat('FEED_SCORE_HALF_LIFE_HOURS', 48.0))
+                if settings.getbool('FEED_SCORE_ON_CLOSE', False) else None
+            ),
+            tag_trends=get_tag_trend_engine() if settings.getbool('TAG_TRENDS_ON_CLOSE', False) else None,
+            related_articles=(
+                get_related_articles_index(
+                    settings.get('RELATED_ARTICLES_DIR', 'data/related'),
+                    top_k=settings.getint('RELATED_ARTICLES_TOP_K', 10),
+                    dimensions=settings.getint('RELATED_ARTICLES_DIMENSIONS', 128),
+                )
+                if settings.getbool('RELATED_ARTICLES_ON_CLOSE', False) else None
+            ),
+            url_frontier=url_frontier_from_settings(settings),
+        )
+        
+    def run(self, SessionLocal, since, logger):
+        """since（クロール開始時刻）以降に保存・更新した記事を対象に各処理を実行"""
+        if self.url_frontier is not None:
+            self.url_frontier.save()
+            logger.info(f"URL frontier saved ({len(self.url_frontier)} URLs)")
+        # タグ人気度はスコアの入力になるため先に更新する
+        if self.tag_trends is not None:
+            self._run(SessionLocal, logger, 'Tag trend', self._update_tag_trends, since)
+        if self.feed_scorer is not None:
+            self._run(SessionLocal, logger, 'Feed scoring', self._rescore, since)
+        if self.related_articles is not None:
+            self._run(SessionLocal, logger, 'Related articles', self._update_related_articles, since)
+        
+    def _run(self, SessionLocal, logger, name, job, since):
+        session = SessionLocal()
+        try:
+            message = job(session, since)
+            session.commit()
+            logger.info(message)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"{name} error: {e}")
+        finally:
+            session.close()
+        
+    def _update_tag_trends(self, session, since):
+        """このクロールで保存・更新した記事の時間バケットだけタグトレンドを集計し直す"""
+        count = self.tag_trends.update(session, since=since)
+        return f"Updated trends for {count} tags"
+        
+    def _rescore(self, session, since):
+        """このクロールで保存・更新した記事（scraped_at が開始以降）のスコアを再計算"""
+        count = self.feed_scorer.score(session, since=since)
+        return f"Rescored {count} articles"
+        
+    def _update_related_articles(self, session, since):
+        """新しい記事を関連記事のベクトル行列に追加し、影響する関連記事を計算し直す"""
+        count = self.related_articles.update(session)
+        return f"Added {count} articles to the related-articles index"
 
 class ValidationPipeline:
     """データバリデーションパイプライン"""
@@ -29,88 +211,497 @@ class ValidationPipeline:
             raise
 
 class DuplicationFilterPipeline:
-    """重複除去パイプライン"""
+    """重複除去パイプライン
+
+    正規化URLで実行中の重複を除去する。URLフロンティアへの取得時刻の記録は、
+    保存に失敗した記事を次回以降スキップしないよう DatabasePipeline が保存後に行う。
+    """
     
     def __init__(self):
         self.seen_urls = set()
         
     def process_item(self, item, spider):
-        url = item.get('url')
+        url = canonicalize_url(item.get('url'))
         if url in self.seen_urls:
             spider.logger.info(f"Duplicate item found: {url}")
-            raise Exception("Duplicate item")
-        else:
-            self.seen_urls.add(url)
-            return item
+            raise DropItem("Duplicate item")
+        
+        self.seen_urls.add(url)
+        return item
+
+# データベースURL→[URL→本文ハッシュ, 使用中のスパイダー数]（同一プロセスのスパイダーで共有）
+_content_hashes = {}
+
+def acquire_content_hashes(database_url):
+    """取得済み記事のURL→本文ハッシュを返す（最初の利用者が読み込み、プロセス内で共有する）"""
+    entry = _content_hashes.get(database_url)
+    if entry is None:
+        engine, SessionLocal = get_shared_database(database_url)
+        session = SessionLocal()
+        try:
+            hashes = dict(
+                session.execute(
+                    select(Article.url, Article.content_hash).where(Article.content_hash.isnot(None))
+                ).all()
+            )
+        finally:
+            session.close()
+        entry = _content_hashes[database_url] = [hashes, 0]
+    entry[1] += 1
+    return entry[0]
+
+def release_content_hashes(database_url):
+    """acquire_content_hashes の利用を終える（利用者がいなくなったら破棄し、次回は読み直す）"""
+    entry = _content_hashes.get(database_url)
+    if entry is not None:
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _content_hashes[database_url]
+
+class ChangeDetectionPipeline:
+    """変更検知パイプライン
+
+    取得済みURLの本文ハッシュを事前に読み込み、ハッシュが一致する記事は
+    is_unchanged を立てて後段のテキスト処理・AI処理を省略させる
+    （DatabasePipelineは変動カウンタのみ更新する）。
+    ハッシュの対応表は同じプロセスで並行して動くスパイダー（crawl --parallel）で共有する。
+    """
+    
+    def __init__(self, database_url='sqlite:///data/articles.db'):
+        self.database_url = database_url
+        self.stats = None
+        self.known_hashes = {}
+        self.unchanged_count = 0
+        
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(database_url=crawler.settings.get('DATABASE_URL', 'sqlite:///data/articles.db'))
+        pipeline.stats = crawler.stats
+        return pipeline
+        
+    def open_spider(self, spider):
+        self.known_hashes = acquire_content_hashes(self.database_url)
+        
+    def close_spider(self, spider):
+        self.known_hashes = {}
+        release_content_hashes(self.database_url)
+        spider.logger.info(f"Change detection: {self.unchanged_count} unchanged articles took the fast path")
+        
+    def process_item(self, item, spider):
+        content_hash = self.content_hash(item)
+        item['content_hash'] = content_hash
+        
+        if self.known_hashes.get(item.get('url')) == content_hash:
+            item['is_unchanged'] = True
+            self.unchanged_count += 1
+            if self.stats is not None:
+                self.stats.inc_value('change_detection/unchanged')
+        return item
+    
+    @staticmethod
+    def content_hash(item):
+        """タイトルと本文（取得時点のもの）のハッシュ"""
+        source = f"{item.get('title') or ''}\0{item.get('content') or ''}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+# プロセスプールで実行するステージ関数（引数・戻り値はpickle可能な値のみ）
+_stage_worker = {}
+
+def init_stage_worker():
+    """ワーカープロセスの初期化（テキスト処理器と抽出器を1度だけ用意）"""
+    _stage_worker['text_processor'] = TextProcessor()
+    _stage_worker['keyword_extractor'] = TechKeywordExtractor()
+    _stage_worker['keyword_extractor'].keyword_manager.get_matcher()
+
+def clean_article_text(text_processor, title, content, content_extracted=False):
+    """本文のHTML除去・正規化とタイトルの正規化
+
+    スパイダーで抽出済みの本文（content_extracted）は再パースしない。
+    """
+    if content and not content_extracted:
+        content = extract_article_text(content)['normalized_text']
+    if title:
+        title = text_processor.normalize_text(title)
+    return title, content
+
+def enrich_article_text(keyword_extractor, title, content, existing_tags, code_block_count=None):
+    """キーワード抽出・難易度推定・チュートリアル判定（要約は除く）"""
+    text = f"{title} {content}"
+    
+    # 技術キーワード抽出し、既存タグとマージ（辞書に無い語は新語の候補として返す）
+    extracted_tags, candidate_terms = keyword_extractor.extract_keywords_with_candidates(text)
+    return {
+        'tags': list(set(existing_tags + extracted_tags)),
+        'difficulty_level': keyword_extractor.estimate_difficulty(text, code_block_count),
+        'is_tutorial': keyword_extractor.is_tutorial(text),
+        'candidate_terms': candidate_terms,
+    }
+
+def item_code_block_count(item):
+    """スパイダーがHTML抽出時に記録したコードブロック数（記録が無ければ None）"""
+    return len(item['code_blocks']) if item.get('code_blocks') is not None else None
+
+def _clean_article_text_in_worker(title, content, content_extracted):
+    return clean_article_text(_stage_worker['text_processor'], title, content, content_extracted)
+
+def _enrich_article_text_in_worker(title, content, existing_tags, code_block_count):
+    return enrich_article_text(
+        _stage_worker['keyword_extractor'], title, content, existing_tags, code_block_count
+    )
 
 class TextProcessingPipeline:
-    """テキスト処理パイプライン"""
+    """テキスト処理パイプライン（STAGE_EXECUTOR_ENABLED時はプロセスプールで実行）"""
     
-    def __init__(self):
+    def __init__(self, stage_executor=None):
         self.text_processor = TextProcessor()
+        self.stage_executor = stage_executor
+        
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(stage_executor=stage_executor_from_settings(crawler.settings, init_stage_worker))
         
     def process_item(self, item, spider):
-        # コンテンツのクリーニング
-        if item.get('content'):
-            item['content'] = self.text_processor.clean_html(item['content'])
-            item['content'] = self.text_processor.normalize_text(item['content'])
+        if item.get('is_unchanged'):
+            return item
         
-        # タイトルの正規化
+        # コンテンツのクリーニングとタイトルの正規化
+        args = (item.get('title'), item.get('content'), bool(item.get('content_extracted')))
+        if self.stage_executor is not None and not args[2]:
+            d = self.stage_executor.submit(_clean_article_text_in_worker, *args)
+            d.addCallback(self._apply_text, item)
+            return d
+        return self._apply_text(clean_article_text(self.text_processor, *args), item)
+    
+    def _apply_text(self, result, item):
+        title, content = result
+        if item.get('content'):
+            item['content'] = content
         if item.get('title'):
-            item['title'] = self.text_processor.normalize_text(item['title'])
+            item['title'] = title
+        return item
+
+class FingerprintPipeline:
+    """近似重複検出パイプライン
+
+    正規化済みの本文からMinHash署名を作り、保存済みの近似重複があれば
+    duplicate_of に代表記事IDを入れる（AI要約を省略させる）。
+    保存済みの代表記事のバケットと署名はクロール開始時に1回だけ読み込み、
+    アイテムごとにはDBを引かない。代表記事への紐付けはDatabasePipelineが保存時に行う。
+    """
+    
+    def __init__(self, database_url='sqlite:///data/articles.db', enabled=True, threshold=0.8):
+        self.database_url = database_url
+        self.enabled = enabled
+        self.threshold = threshold
+        self.stats = None
+        self.snapshot = None
+        
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            database_url=settings.get('DATABASE_URL', 'sqlite:///data/articles.db'),
+            enabled=settings.getbool('NEAR_DUPLICATE_ENABLED', False),
+            threshold=settings.getfloat('NEAR_DUPLICATE_THRESHOLD', 0.8),
+        )
+        pipeline.stats = crawler.stats
+        return pipeline
+        
+    def open_spider(self, spider):
+        if self.enabled:
+            engine, SessionLocal = get_shared_database(self.database_url)
+            session = SessionLocal()
+            try:
+                self.snapshot = BandSnapshot.load(session)
+            finally:
+                session.close()
+            spider.logger.info(f"Loaded {len(self.snapshot)} near-duplicate fingerprints")
+        
+    def process_item(self, item, spider):
+        if not self.enabled or item.get('is_unchanged'):
+            return item
+        
+        item['fingerprint'] = minhash_signature(item.get('content'))
+        if item['fingerprint'] is None:
+            return item
         
+        canonical_id = self.snapshot.find(item['fingerprint'], self.threshold)
+        if canonical_id is not None:
+            item['duplicate_of'] = canonical_id
+            spider.logger.info(f"Near-duplicate of article {canonical_id}: {item.get('url')}")
+            if self.stats is not None:
+                self.stats.inc_value('near_duplicate/found')
         return item
 
 class AIEnrichmentPipeline:
     """AI機能による記事エンリッチメント"""
     
-    def __init__(self):
-        self.keyword_extractor = TechKeywordExtractor()
+    def __init__(self, warmup_models=None, summary_async=False,
+                 summary_max_in_flight=4, summary_timeout=30.0, summary_cache=None,
+                 stage_executor=None, term_sketch=None):
+        self.keyword_extractor = TechKeywordExtractor(summary_cache=summary_cache)
+        self.warmup_models = warmup_models or []
+        self.stage_executor = stage_executor
+        self.term_sketch = term_sketch
+        self.summarizer = None
+        if summary_async:
+            self.summarizer = AsyncSummarizer(
+                self.keyword_extractor,
+                max_in_flight=summary_max_in_flight,
+                timeout=summary_timeout,
+            )
+        
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        summary_cache = None
+        if settings.getbool('SUMMARY_CACHE_ENABLED', False):
+            summary_cache = get_summary_cache(
+                settings.get('SUMMARY_CACHE_PATH', 'data/summary_cache.db'),
+                max_entries=settings.getint('SUMMARY_CACHE_MAX_ENTRIES', 50000),
+                max_age_days=settings.getint('SUMMARY_CACHE_MAX_AGE_DAYS', 30),
+            )
+        term_sketch = None
+        if settings.getbool('TERM_SKETCH_ENABLED', False):
+            term_sketch = get_term_sketch(
+                settings.get('TERM_SKETCH_PATH', 'data/term_sketch.npz'),
+                width=settings.getint('TERM_SKETCH_WIDTH', 65536),
+                depth=settings.getint('TERM_SKETCH_DEPTH', 4),
+                capacity=settings.getint('TERM_SKETCH_TOP_K', 2000),
+                half_life_days=settings.getfloat('TERM_SKETCH_HALF_LIFE_DAYS', 30.0),
+            )
+        return cls(
+            warmup_models=settings.getlist('AI_WARMUP_MODELS'),
+            summary_async=settings.getbool('AI_SUMMARY_ASYNC', False),
+            summary_max_in_flight=settings.getint('AI_SUMMARY_MAX_IN_FLIGHT', 4),
+            summary_timeout=settings.getfloat('AI_SUMMARY_TIMEOUT', 30.0),
+            summary_cache=summary_cache,
+            stage_executor=stage_executor_from_settings(settings, init_stage_worker),
+            term_sketch=term_sketch,
+        )
+        
+    def open_spider(self, spider):
+        # 指定モデルはクロール開始前にロードしておく
+        if self.warmup_models:
+            self.keyword_extractor.model_registry.warm_up(self.warmup_models)
+        if self.summarizer is not None:
+            self.summarizer.start()
+        
+    def close_spider(self, spider):
+        if self.summarizer is not None:
+            # 実行中の要約を待つ間もリアクターを止めない（Deferredを返してScrapyに待たせる）
+            d = self.summarizer.stop()
+            d.addCallback(lambda _: self._finish(spider))
+            return d
+        self._finish(spider)
+        
+    def _finish(self, spider):
+        """終了時の集計のログ出力と状態の保存"""
+        if self.summarizer is not None:
+            spider.logger.info(f"Summary fallbacks: {self.summarizer.fallback_count}")
+        if self.keyword_extractor.summary_cache is not None:
+            self.keyword_extractor.summary_cache.flush()
+            spider.logger.info(f"Summary cache: {self.keyword_extractor.summary_cache.stats()}")
+        for name, stats in self.keyword_extractor.model_registry.report().items():
+            spider.logger.info(
+                f"Model '{name}': loaded={stats['loaded']} "
+                f"load_time={stats['load_seconds']}s rss=+{stats['rss_delta_mb']}MB"
+            )
+        if self.term_sketch is not None:
+            self.term_sketch.save()
+            spider.logger.info(f"Term sketch: {len(self.term_sketch.estimates)} candidate terms tracked")
         
     def process_item(self, item, spider):
+        if item.get('is_unchanged'):
+            return item
+        
         content = item.get('content', '')
         title = item.get('title', '')
-        text = f"{title} {content}"
-        
-        # 技術キーワード抽出
-        extracted_tags = self.keyword_extractor.extract_keywords(text)
-        
-        # 既存タグとマージ
         existing_tags = item.get('tags', [])
-        all_tags = list(set(existing_tags + extracted_tags))
-        item['tags'] = all_tags
+        code_block_count = item_code_block_count(item)
         
-        # 難易度推定
-        item['difficulty_level'] = self.keyword_extractor.estimate_difficulty(text)
+        # キーワード抽出・難易度推定・チュートリアル判定
+        if self.stage_executor is not None:
+            d = self.stage_executor.submit(
+                _enrich_article_text_in_worker, title, content, existing_tags, code_block_count
+            )
+            d.addCallback(self._apply_enrichment, item)
+            d.addCallback(self._summarize)
+            return d
+        enrichment = enrich_article_text(
+            self.keyword_extractor, title, content, existing_tags, code_block_count
+        )
+        return self._summarize(self._apply_enrichment(enrichment, item))
+    
+    def _apply_enrichment(self, enrichment, item):
+        # 新語の候補はアイテムに載せず、クロール全体のカウンタに数える
+        candidate_terms = enrichment.pop('candidate_terms', None)
+        if self.term_sketch is not None and candidate_terms:
+            self.term_sketch.add_document(candidate_terms)
+        for key, value in enrichment.items():
+            item[key] = value
+        return item
+    
+    def _summarize(self, item):
+        content = item.get('content', '')
         
-        # チュートリアル判定
-        item['is_tutorial'] = self.keyword_extractor.is_tutorial(text)
+        # 近似重複の記事は代表記事の要約があるため要約しない
+        if item.get('duplicate_of'):
+            return item
         
         # 要約生成（オプション）
         if len(content) > 1000:
-            item['summary'] = self.keyword_extractor.generate_summary(content)
+            # 本文が変わっていなければキャッシュ済みの要約を使う
+            summary_key = self.keyword_extractor.summary_key(content)
+            cached = self.keyword_extractor.cached_summary(summary_key)
+            if cached is not None:
+                return self._set_summary((cached, summary_key), item)
+            
+            # API呼び出しはスレッドプールで実行し、完了までクロールを止めない
+            if self.summarizer is not None and self.keyword_extractor.openai_client is not None:
+                d = self.summarizer.summarize(content)
+                d.addCallback(self._set_summary, item)
+                return d
+            return self._set_summary(self.keyword_extractor.generate_summary_with_key(content), item)
         
         return item
+    
+    def _set_summary(self, result, item):
+        item['summary'], item['summary_hash'] = result
+        return item
 
 class DatabasePipeline:
-    """データベース保存パイプライン"""
+    """データベース保存パイプライン
+
+    batch_size が 2 以上の場合はバッファリングモードで動作し、
+    batch_size 件または flush_interval 秒ごとにまとめて UPSERT・コミットする。
+    バッファはコミットできた記事だけを取り除く。一括書き込みが失敗した場合は1件ずつ書き直し、
+    それでも失敗した記事はバッファに残して次の書き出しで再試行する（write_retries 回で破棄）。
+    """
     
-    def __init__(self, database_url='sqlite:///data/articles.db'):
+    # UPSERT時に更新する列（_update_article と同じ対象）
+    UPSERT_UPDATE_COLUMNS = (
+        'content', 'content_hash', 'code_block_count', 'view_count', 'like_count', 'comment_count',
+    )
+    
+    def __init__(self, database_url='sqlite:///data/articles.db', batch_size=1, flush_interval=5.0,
+                 search_index=True, feed_scorer=None, tag_trends=None, duplicate_threshold=None,
+                 related_articles=None, url_frontier=None, close_jobs=True, write_retries=3):
         self.database_url = database_url
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.write_retries = max(1, int(write_retries))
+        self.search_index = search_index
+        self.feed_scorer = feed_scorer
+        self.tag_trends = tag_trends
+        self.duplicate_threshold = duplicate_threshold
+        self.related_articles = related_articles
+        self.url_frontier = url_frontier
+        # False の場合、終了時の集計処理は呼び出し側（cli crawl --parallel）が全スパイダーの終了後に行う
+        self.close_jobs = close_jobs
+        self.opened_at = None
+        self.stats = None
+        self.buffer = {}
+        self.write_failures = {}  # URL→書き込みに失敗した回数
+        self.last_flush = time.monotonic()
+        self.flush_loop = None
+        self.rows_written = 0
+        self.write_seconds = 0.0
+        
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        jobs = CrawlCloseJobs.from_settings(settings)
+        pipeline = cls(
+            database_url=settings.get('DATABASE_URL', 'sqlite:///data/articles.db'),
+            batch_size=settings.getint('DATABASE_BATCH_SIZE', 1),
+            flush_interval=settings.getfloat('DATABASE_FLUSH_INTERVAL', 5.0),
+            search_index=settings.getbool('SEARCH_INDEX_ENABLED', True),
+            feed_scorer=jobs.feed_scorer,
+            tag_trends=jobs.tag_trends,
+            duplicate_threshold=(
+                settings.getfloat('NEAR_DUPLICATE_THRESHOLD', 0.8)
+                if settings.getbool('NEAR_DUPLICATE_ENABLED', False) else None
+            ),
+            related_articles=jobs.related_articles,
+            url_frontier=jobs.url_frontier,
+            close_jobs=settings.getbool('CRAWL_CLOSE_JOBS_PER_SPIDER', True),
+            write_retries=settings.getint('DATABASE_WRITE_RETRIES', 3),
+        )
+        pipeline.stats = crawler.stats
+        return pipeline
+    
+    @property
+    def batch_mode(self):
+        return self.batch_size > 1
         
     def open_spider(self, spider):
-        self.engine, self.SessionLocal = create_database(self.database_url)
+        # エンジンは同一プロセス内の全スパイダーで共有する
+        self.engine, self.SessionLocal = get_shared_database(self.database_url)
+        self.opened_at = datetime.utcnow()
+        # FTS5が使えない環境では全文検索インデックスの更新を行わない
+        self.search_index = self.search_index and has_search_index(self.engine)
+        
+        # タグ名→IDキャッシュをtech_tagsから温めておく
+        self.tag_cache = get_tag_id_cache(self.database_url)
+        session = self.SessionLocal()
+        try:
+            self.tag_cache.warm(session)
+        finally:
+            session.close()
+        self.last_flush = time.monotonic()
+        
+        # アイテムが途切れても flush_interval 秒ごとにバッファを書き出す
+        if self.batch_mode and self.flush_interval > 0:
+            self.flush_loop = task.LoopingCall(self._flush_if_due, spider)
+            self.flush_loop.start(self.flush_interval, now=False)
         
     def close_spider(self, spider):
-        self.engine.dispose()
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        # 終了時は失敗した記事を再試行回数まで書き直す（それでも失敗した記事は破棄される）
+        for _ in range(self.write_retries):
+            self.flush_buffer(spider)
+            if not self.buffer:
+                break
+        if self.close_jobs:
+            CrawlCloseJobs(
+                feed_scorer=self.feed_scorer,
+                tag_trends=self.tag_trends,
+                related_articles=self.related_articles,
+                url_frontier=self.url_frontier,
+            ).run(self.SessionLocal, self.opened_at, spider.logger)
+        
+        if self.rows_written:
+            rate = self.rows_written / self.write_seconds if self.write_seconds else 0.0
+            spider.logger.info(
+                f"DatabasePipeline wrote {self.rows_written} rows in "
+                f"{self.write_seconds:.2f}s ({rate:.1f} rows/sec)"
+            )
         
     def process_item(self, item, spider):
+        if self.batch_mode:
+            # 同一バッチ内の同一URLは後勝ち（ON CONFLICT は同じ行を二度更新できない）
+            self.buffer[item['url']] = dict(item)
+            self.write_failures.pop(item['url'], None)
+            if len(self.buffer) >= self.batch_size:
+                self.flush_buffer(spider)
+            else:
+                self._flush_if_due(spider)
+            return item
+        
+        started = time.monotonic()
         session = self.SessionLocal()
         try:
             # 既存記事チェック
-            existing_article = session.query(Article).filter_by(url=item['url']).first()
+            existing_article = None
+            if not item.get('is_unchanged'):
+                existing_article = session.query(Article).filter_by(url=item['url']).first()
             
-            if existing_article:
+            if item.get('is_unchanged'):
+                # 本文に変化なし：カウンタのみ更新
+                self._update_counters([item], session)
+            elif existing_article:
                 # 更新
                 self._update_article(existing_article, item, session)
                 spider.logger.info(f"Updated article: {item['title']}")
@@ -120,22 +711,227 @@ class DatabasePipeline:
                 spider.logger.info(f"Created new article: {item['title']}")
                 
             session.commit()
+            self._record_write(1, time.monotonic() - started)
+            self._mark_stored([item])
             return item
             
         except Exception as e:
             session.rollback()
+            self.tag_cache.clear()
             spider.logger.error(f"Database error: {e}")
             raise
         finally:
             session.close()
     
+    def _flush_if_due(self, spider):
+        # LoopingCall から呼ばれるため、例外で定期書き出しが止まらないようここで記録する
+        try:
+            if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush_buffer(spider)
+        except Exception:
+            spider.logger.exception("Periodic flush failed")
+    
+    def flush_buffer(self, spider):
+        """バッファ内の記事を一括UPSERTして1回だけコミット（コミットできた記事だけバッファから除く）"""
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        
+        items = list(self.buffer.values())
+        started = time.monotonic()
+        try:
+            existing_count = self._write_items(items)
+        except Exception as e:
+            spider.logger.error(f"Database batch error ({len(items)} items), retrying one by one: {e}")
+            self._write_items_individually(items, spider)
+            return
+        
+        elapsed = time.monotonic() - started
+        self._remove_from_buffer(items)
+        self._record_write(len(items), elapsed)
+        self._mark_stored(items)
+        unchanged = sum(1 for item in items if item.get('is_unchanged'))
+        created = len(items) - unchanged - existing_count
+        spider.logger.info(
+            f"Flushed {len(items)} articles ({created} created, {existing_count} updated, "
+            f"{unchanged} counters only) in {elapsed:.3f}s"
+        )
+    
+    def _write_items(self, items):
+        """記事をまとめて書き込んでコミットし、既存だった記事数を返す（失敗時はロールバックして例外を送出）"""
+        unchanged = [item for item in items if item.get('is_unchanged')]
+        changed = [item for item in items if not item.get('is_unchanged')]
+        session = self.SessionLocal()
+        try:
+            existing_count = self._upsert_articles(changed, session) if changed else 0
+            if unchanged:
+                self._update_counters(unchanged, session)
+            session.commit()
+            return existing_count
+        except Exception:
+            session.rollback()
+            self.tag_cache.clear()
+            raise
+        finally:
+            session.close()
+    
+    def _write_items_individually(self, items, spider):
+        """一括書き込みに失敗した記事を1件ずつ書き込む（失敗した記事はバッファに残す）"""
+        for item in items:
+            started = time.monotonic()
+            try:
+                self._write_items([item])
+            except Exception as e:
+                failures = self.write_failures.get(item['url'], 0) + 1
+                if failures >= self.write_retries:
+                    spider.logger.error(f"Database error for {item['url']}: {e}")
+                    self._drop_items([item], spider)
+                    self._remove_from_buffer([item])
+                else:
+                    self.write_failures[item['url']] = failures
+                    spider.logger.warning(
+                        f"Database error for {item['url']} (attempt {failures}/{self.write_retries}): {e}"
+                    )
+                continue
+            self._remove_from_buffer([item])
+            self._record_write(1, time.monotonic() - started)
+            self._mark_stored([item])
+    
+    def _remove_from_buffer(self, items):
+        """書き込み済み（または破棄した）記事をバッファから除く（その後に届いた同じURLの記事は残す）"""
+        for item in items:
+            if self.buffer.get(item['url']) is item:
+                del self.buffer[item['url']]
+            self.write_failures.pop(item['url'], None)
+    
+    def _drop_items(self, items, spider):
+        """書き込めなかった記事を破棄として記録する"""
+        for item in items:
+            spider.logger.error(f"Dropped article after failed database writes: {item['url']}")
+        if self.stats is not None:
+            self.stats.inc_value('database/dropped_items', len(items))
+    
+    def _mark_stored(self, items):
+        """保存（コミット）できた記事のURL（リダイレクト前のURLを含む）をURLフロンティアに取得済みとして記録"""
+        if self.url_frontier is not None:
+            for item in items:
+                for url in dict.fromkeys([*item.get('request_urls', []), item['url']]):
+                    self.url_frontier.mark_seen(url)
+    
+    def _upsert_articles(self, items, session):
+        """記事を一括UPSERTし、既存だった記事数を返す"""
+        urls = [item['url'] for item in items]
+        
+        # 既存URLをバッチ単位で1クエリ解決
+        existing_urls = set(
+            session.scalars(select(Article.url).where(Article.url.in_(urls)))
+        )
+        
+        now = datetime.utcnow()
+        rows = [self._article_row(item, now) for item in items]
+        stmt = sqlite_insert(Article).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Article.url],
+            set_={
+                **{
+                    column: func.coalesce(getattr(stmt.excluded, column), getattr(Article, column))
+                    for column in self.UPSERT_UPDATE_COLUMNS
+                },
+                # 要約元の本文ハッシュが変わらない場合は要約を書き換えない
+                'summary': case(
+                    (stmt.excluded.summary_hash == Article.summary_hash, Article.summary),
+                    else_=func.coalesce(stmt.excluded.summary, Article.summary),
+                ),
+                'summary_hash': func.coalesce(stmt.excluded.summary_hash, Article.summary_hash),
+                'scraped_at': stmt.excluded.scraped_at,
+            },
+        )
+        session.execute(stmt)
+        
+        # タグ処理（バッチ全体で一括）
+        article_ids = dict(
+            session.execute(select(Article.url, Article.id).where(Article.url.in_(urls))).all()
+        )
+        new_tag_names = self._process_tags(
+            {article_ids[item['url']]: item.get('tags', []) for item in items}, session
+        )
+        self._index_articles(article_ids.values(), session)
+        self._link_duplicates({article_ids[item['url']]: item for item in items}, session)
+        increment_stats(
+            session, [item for item in items if item['url'] not in existing_urls], new_tag_names, now
+        )
+        return len(existing_urls)
+    
+    def _update_counters(self, items, session):
+        """本文が変わっていない記事の変動カウンタだけを一括更新"""
+        articles = Article.__table__
+        stmt = (
+            articles.update()
+            .where(articles.c.url == bindparam('b_url'))
+            .values(
+                view_count=bindparam('b_view_count'),
+                like_count=bindparam('b_like_count'),
+                comment_count=bindparam('b_comment_count'),
+                scraped_at=bindparam('b_scraped_at'),
+            )
+        )
+        now = datetime.utcnow()
+        increment_stats(session, now=now)  # 最終スクレイピング時刻のみ更新
+        session.execute(stmt, [
+            {
+                'b_url': item['url'],
+                'b_view_count': item.get('view_count', 0),
+                'b_like_count': item.get('like_count', 0),
+                'b_comment_count': item.get('comment_count', 0),
+                'b_scraped_at': now,
+            }
+            for item in items
+        ])
+    
+    def _record_write(self, count, seconds):
+        self.rows_written += count
+        self.write_seconds += seconds
+        if self.stats is not None:
+            self.stats.inc_value('database/rows_written', count)
+            if self.write_seconds:
+                self.stats.set_value(
+                    'database/rows_per_sec', round(self.rows_written / self.write_seconds, 1)
+                )
+    
+    def _article_row(self, item, scraped_at):
+        """一括INSERT用の行データ（全行で同じ列集合にそろえる）"""
+        return {
+            'title': item['title'],
+            'url': item['url'],
+            'content': item.get('content'),
+            'summary': item.get('summary'),
+            'summary_hash': item.get('summary_hash'),
+            'content_hash': item.get('content_hash'),
+            'author': item.get('author'),
+            'source_site': item['source_site'],
+            'published_at': item.get('published_at'),
+            'view_count': item.get('view_count', 0),
+            'like_count': item.get('like_count', 0),
+            'comment_count': item.get('comment_count', 0),
+            'difficulty_level': item.get('difficulty_level', 1),
+            'code_block_count': item_code_block_count(item),
+            'reading_time': item.get('reading_time'),
+            'language': item.get('language', 'ja'),
+            'is_tutorial': item.get('is_tutorial', False),
+            'scraped_at': scraped_at,
+            'first_seen_at': scraped_at,  # UPSERTの更新対象外なので初回の値が残る
+        }
+    
     def _create_article(self, item, session):
         # 記事作成
+        now = datetime.utcnow()
         article = Article(
             title=item['title'],
             url=item['url'],
             content=item.get('content'),
             summary=item.get('summary'),
+            summary_hash=item.get('summary_hash'),
+            content_hash=item.get('content_hash'),
             author=item.get('author'),
             source_site=item['source_site'],
             published_at=item.get('published_at'),
@@ -143,61 +939,67 @@ class DatabasePipeline:
             like_count=item.get('like_count', 0),
             comment_count=item.get('comment_count', 0),
             difficulty_level=item.get('difficulty_level', 1),
+            code_block_count=item_code_block_count(item),
             reading_time=item.get('reading_time'),
             language=item.get('language', 'ja'),
             is_tutorial=item.get('is_tutorial', False),
-            scraped_at=datetime.utcnow()
+            scraped_at=now,
+            first_seen_at=now
         )
         
         session.add(article)
         session.flush()  # IDを取得
         
         # タグ処理
-        self._process_tags(article, item.get('tags', []), session)
+        new_tag_names = self._process_tags({article.id: item.get('tags', [])}, session)
+        self._index_articles([article.id], session)
+        self._link_duplicates({article.id: item}, session)
+        increment_stats(session, [item], new_tag_names)
         
     def _update_article(self, article, item, session):
         # 既存記事を更新
         article.content = item.get('content', article.content)
-        article.summary = item.get('summary', article.summary)
+        article.content_hash = item.get('content_hash', article.content_hash)
+        if item_code_block_count(item) is not None:
+            article.code_block_count = item_code_block_count(item)
+        # 要約元の本文ハッシュが変わらない場合は要約を書き換えない
+        summary_hash = item.get('summary_hash')
+        if summary_hash is None or summary_hash != article.summary_hash:
+            article.summary = item.get('summary', article.summary)
+            article.summary_hash = summary_hash or article.summary_hash
         article.view_count = item.get('view_count', article.view_count)
         article.like_count = item.get('like_count', article.like_count)
         article.comment_count = item.get('comment_count', article.comment_count)
         article.scraped_at = datetime.utcnow()
         
         # タグ更新
-        self._process_tags(article, item.get('tags', []), session)
-        
-    def _process_tags(self, article, tag_names, session):
-        """タグの作成・関連付け"""
-        for tag_name in tag_names:
-            # 既存タグ検索または作成
-            tag = session.query(TechTag).filter_by(name=tag_name).first()
-            if not tag:
-                tag = TechTag(
-                    name=tag_name,
-                    category=self._categorize_tag(tag_name)
-                )
-                session.add(tag)
-                session.flush()
-            
-            # 記事とタグの関連付け
-            if tag not in article.tags:
-                article.tags.append(tag)
+        new_tag_names = self._process_tags({article.id: item.get('tags', [])}, session)
+        session.flush()  # 全文検索インデックスは保存済みの行から作るため先に反映
+        self._index_articles([article.id], session)
+        self._link_duplicates({article.id: item}, session)
+        increment_stats(session, [], new_tag_names)
+    
+    def _index_articles(self, article_ids, session):
+        """全文検索インデックスを同じトランザクション内で更新"""
+        if self.search_index:
+            index_articles(session, article_ids)
+        
+    def _link_duplicates(self, items_by_article, session):
+        """署名を保存し、近似重複を代表記事に同じトランザクション内で紐付ける"""
+        if self.duplicate_threshold is None:
+            return
+        fingerprints = {
+            article_id: item['fingerprint']
+            for article_id, item in items_by_article.items() if 'fingerprint' in item
+        }
+        linked = link_duplicates(session, fingerprints, self.duplicate_threshold)
+        if linked and self.stats is not None:
+            self.stats.inc_value('near_duplicate/linked', len(linked))
+        
+    def _process_tags(self, tags_by_article, session):
+        """タグの作成・関連付け（記事ID→タグ名リスト）。新たに関連付けたタグ名のリストを返す"""
+        return link_tags(session, self.tag_cache, tags_by_article)
     
     def _categorize_tag(self, tag_name):
         """タグのカテゴリ推定"""
-        # 簡易的なカテゴリ分類
-        languages = ['python', 'javascript', 'java', 'go', 'rust', 'typescript']
-        frameworks = ['react', 'vue', 'angular', 'django', 'flask', 'express']
-        tools = ['docker', 'kubernetes', 'git', 'jenkins', 'terraform']
-        
-        tag_lower = tag_name.lower()
-        
-        if any(lang in tag_lower for lang in languages):
-            return 'language'
-        elif any(fw in tag_lower for fw in frameworks):
-            return 'framework'
-        elif any(tool in tag_lower for tool in tools):
-            return 'tool'
-        else:
-            return 'concept'
\ No newline at end of file
+        return categorize_tag(tag_name)
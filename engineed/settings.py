@@ -10,7 +10,9 @@ ROBOTSTXT_OBEY = True
 ITEM_PIPELINES = {
     'engineed.pipelines.ValidationPipeline': 100,
     'engineed.pipelines.DuplicationFilterPipeline': 200,
+    'engineed.pipelines.ChangeDetectionPipeline': 250,
     'engineed.pipelines.TextProcessingPipeline': 300,
+    'engineed.pipelines.FingerprintPipeline': 350,
     'engineed.pipelines.AIEnrichmentPipeline': 400,
     'engineed.pipelines.DatabasePipeline': 500,
 }
@@ -46,10 +48,92 @@ HTTPCACHE_DIR = 'httpcache'
 
 # データベース設定
 DATABASE_URL = 'sqlite:///data/articles.db'
+DATABASE_BATCH_SIZE = 100  # 1の場合は1件ずつコミット
+DATABASE_FLUSH_INTERVAL = 5.0  # バッファを書き出す最大間隔（秒）
+DATABASE_WRITE_RETRIES = 3  # 書き込みに失敗した記事を破棄するまでの試行回数（バッファリングモード）
+DATABASE_POOL_SIZE = 8  # プロセス内で共有する接続プールのサイズ（WEB_DB_WORKERS以上にする）
+DATABASE_MAX_OVERFLOW = 4
+
+# SQLiteの接続ごとに設定するプラグマ
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # 書き込み中も読み込みをブロックしない
+    'synchronous': 'NORMAL',  # WALではNORMALでも破損しない（電源断時に直近のコミットのみ失われうる）
+    'mmap_size': 256 * 1024 * 1024,  # 256MBまでメモリマップで読む
+    'cache_size': -64000,  # ページキャッシュ 64MB（負数はKiB指定）
+    'busy_timeout': 5000,  # ロック待ちの上限（ミリ秒）
+}
+
+# Webアプリのデータベースアクセス（イベントループを塞がないようスレッドプールで実行）
+WEB_DB_WORKERS = 8  # クエリを実行するスレッド数
+
+# クロール終了時の処理（URLフロンティアの保存・タグトレンド・スコア・関連記事）をスパイダーごとに行う
+# cli crawl --parallel は False にして全スパイダーの終了後に1回だけ実行する
+CRAWL_CLOSE_JOBS_PER_SPIDER = True
+
+# タグの人気度・トレンド（クロール終了時に今回の記事が属する時間帯だけ再集計）
+TAG_TRENDS_ON_CLOSE = True
+
+# tech_feed_score（クロール終了時に今回保存・更新した記事を再計算）
+FEED_SCORE_ON_CLOSE = True
+FEED_SCORE_HALF_LIFE_HOURS = 48.0  # 時間減衰の半減期
+
+# パーソナルフィード（/api/users/{id}/feed）
+PERSONAL_FEED_WINDOW_DAYS = 14  # 候補にする記事の期間（日）
+PERSONAL_FEED_POSTINGS_TTL = 300.0  # タグ別ポスティングリストを作り直す間隔（秒）
+PERSONAL_FEED_PROFILE_TTL = 600.0  # 興味ベクトルのキャッシュ期間（秒、既読・興味タグの変更時は即破棄）
+PERSONAL_FEED_MAX_PROFILES = 10000  # キャッシュするユーザー数の上限
+
+# 近似重複検出（本文のMinHash署名をLSHで引き、転載・別URLの同一記事を代表記事に紐付ける）
+NEAR_DUPLICATE_ENABLED = True
+NEAR_DUPLICATE_THRESHOLD = 0.8  # 署名の一致率（Jaccard係数の推定値）の下限
+
+# 関連記事（TF-IDF＋SVDの記事ベクトルから上位k件を事前計算）
+RELATED_ARTICLES_ON_CLOSE = True  # クロール終了時に新しい記事を追加（初回は全記事から学習）
+RELATED_ARTICLES_DIR = 'data/related'  # 学習済みモデルとベクトル行列（memmap）の置き場所
+RELATED_ARTICLES_TOP_K = 10
+RELATED_ARTICLES_DIMENSIONS = 128  # SVDの次元数
+
+# 保存済み記事のエンリッチメントのやり直し（cli reenrich）
+REENRICH_CHUNK_SIZE = 500  # 1回に読み出して書き戻す記事数
+REENRICH_WORKERS = 0  # 0の場合はCPUコア数
+REENRICH_CHECKPOINT_PATH = 'data/reenrich_checkpoint.json'  # 中断時の再開位置
+
+# 新語の発見（キーワード辞書に無いCamelCase・略語などの出現記事数を固定メモリで数える）
+TERM_SKETCH_ENABLED = True
+TERM_SKETCH_PATH = 'data/term_sketch.npz'  # クロールをまたいで引き継ぐカウンタの保存先
+TERM_SKETCH_WIDTH = 65536  # Count-Min sketch の1行あたりのカウンタ数
+TERM_SKETCH_DEPTH = 4  # Count-Min sketch の行数（ハッシュ関数の数）
+TERM_SKETCH_TOP_K = 2000  # 保持する上位候補の数
+TERM_SKETCH_HALF_LIFE_DAYS = 30.0  # 出現回数の減衰の半減期（日）
+EMERGING_TERM_MIN_COUNT = 5.0  # cli emerging-terms で表示する推定出現記事数の下限
+
+# 全文検索インデックス（FTS5）を記事保存と同じトランザクションで更新する
+SEARCH_INDEX_ENABLED = True
 
 # AI/ML設定
 OPENAI_API_KEY = ''  # 環境変数から取得
 HUGGINGFACE_API_KEY = ''
+AI_WARMUP_MODELS = []  # クロール開始時に事前ロードするモデル（'openai', 'spacy_ja'）
+AI_SUMMARY_ASYNC = True  # 要約APIをリアクター外のスレッドプールで実行
+AI_SUMMARY_MAX_IN_FLIGHT = 4  # 同時実行する要約リクエスト数の上限
+AI_SUMMARY_TIMEOUT = 30.0  # 要約リクエスト1件あたりのタイムアウト（秒）
+
+# 要約キャッシュ（本文ハッシュ→要約）
+SUMMARY_CACHE_ENABLED = True
+SUMMARY_CACHE_PATH = 'data/summary_cache.db'
+SUMMARY_CACHE_MAX_ENTRIES = 50000
+SUMMARY_CACHE_MAX_AGE_DAYS = 30
+
+# URLフロンティア（クロール間・スパイダー間で共有する取得済みURL）
+URL_FRONTIER_ENABLED = True
+URL_FRONTIER_PATH = 'data/url_frontier.bin'
+URL_FRONTIER_REVISIT_SECONDS = 7 * 86400  # 既定の再訪間隔（秒）
+URL_FRONTIER_REVISIT_RULES = []  # (URL正規表現, 再訪間隔秒) のリスト
+
+# CPU負荷の高いステージ（HTMLクリーニング・キーワード抽出）をプロセスプールで実行
+STAGE_EXECUTOR_ENABLED = False
+STAGE_EXECUTOR_WORKERS = 0  # 0の場合はCPUコア数
+STAGE_EXECUTOR_MAX_QUEUE = 64  # 同時に投入するタスク数の上限（背圧）
 
 # カスタム設定
 TECH_KEYWORDS_FILE = 'data/tech_keywords.json'
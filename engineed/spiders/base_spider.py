@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 from engineed.items import ArticleItem
 from engineed.utils.text_processor import TextProcessor
+from engineed.utils.html_extractor import extract_article_text
+from engineed.utils.tech_keywords import get_keyword_manager
+from engineed.utils.url_frontier import url_frontier_from_settings
 
 
 class BaseTechSpider(scrapy.Spider):
@@ -19,10 +22,29 @@ class BaseTechSpider(scrapy.Spider):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.text_processor = TextProcessor()
+        self.keyword_manager = get_keyword_manager()
         self.max_pages = int(kwargs.get('max_pages', 5))  # デフォルト5ページまで
         self.days_back = int(kwargs.get('days_back', 7))  # デフォルト7日前まで
         self.min_content_length = 200
         
+    @property
+    def url_frontier(self):
+        """クロール間で共有する取得済みURLストア（クローラー未接続・無効時は None）"""
+        settings = getattr(self, 'settings', None)
+        if settings is None:
+            return None
+        return url_frontier_from_settings(settings)
+    
+    def should_fetch_article(self, url):
+        """最近取得済みの記事でなければ True（リクエスト前に判定）"""
+        frontier = self.url_frontier
+        if frontier is None or frontier.should_fetch(url):
+            return True
+        
+        self.logger.debug(f'Skipping recently fetched article: {url}')
+        self.crawler.stats.inc_value('url_frontier/skipped')
+        return False
+    
     def parse_article_url(self, url):
         """記事URLの正規化"""
         return urljoin(self.start_urls[0], url)
@@ -45,39 +67,15 @@ class BaseTechSpider(scrapy.Spider):
         if not text:
             return []
         
-        # 技術キーワードのマッチング
-        tech_keywords = [
-            'python', 'javascript', 'react', 'vue', 'angular', 'node.js',
-            'typescript', 'go', 'rust', 'java', 'c++', 'c#', 'php',
-            'docker', 'kubernetes', 'aws', 'gcp', 'azure', 'terraform',
-            'machine learning', '機械学習', 'ai', 'deep learning', 'データサイエンス',
-            'web開発', 'フロントエンド', 'バックエンド', 'インフラ', 'devops',
-            'アジャイル', 'スクラム', 'git', 'github', 'ci/cd'
-        ]
-        
-        found_tags = []
-        text_lower = text.lower()
-        
-        for keyword in tech_keywords:
-            if keyword in text_lower:
-                found_tags.append(keyword)
-        
-        return list(set(found_tags))  # 重複除去
+        # 技術キーワードのマッチング（TechKeywordExtractorと同じマッチャーを共有）
+        return list(self.keyword_manager.get_matcher().count(text))
     
     def clean_content(self, content):
-        """コンテンツのクリーニング"""
-        if not content:
+        """コンテンツのクリーニング（Selector・HTML文字列のどちらも可）"""
+        if content is None or (isinstance(content, str) and not content):
             return ''
         
-        # HTMLタグの除去
-        content = re.sub(r'<script[^>]*>.*?</script>', '', content, flags=re.DOTALL)
-        content = re.sub(r'<style[^>]*>.*?</style>', '', content, flags=re.DOTALL)
-        content = re.sub(r'<[^>]+>', '', content)
-        
-        # 余分な空白の除去
-        content = re.sub(r'\s+', ' ', content).strip()
-        
-        return content
+        return extract_article_text(content)['normalized_text']
     
     def is_valid_article(self, item):
         """記事の有効性をチェック"""
@@ -101,6 +99,10 @@ class BaseTechSpider(scrapy.Spider):
         
         # 共通フィールドの設定
         item['url'] = response.url
+        # 記事一覧では元のURLで取得済みか判定するため、リダイレクトされた場合は元のURLも記録する
+        request = getattr(response, 'request', None)
+        if request is not None:
+            item['request_urls'] = list(request.meta.get('redirect_urls', [])) + [request.url]
         item['source_site'] = self.name
         item['scraped_at'] = datetime.now().isoformat()
         item['language'] = 'ja'
@@ -109,9 +111,13 @@ class BaseTechSpider(scrapy.Spider):
         for key, value in kwargs.items():
             item[key] = value
         
-        # コンテンツのクリーニング
-        if item.get('content'):
-            item['content'] = self.clean_content(item['content'])
+        # コンテンツの抽出（Selectorの要素ツリーから1パスでテキスト・コードブロックを取得）
+        content = item.get('content')
+        if content is not None and (not isinstance(content, str) or content):
+            extracted = extract_article_text(content)
+            item['content'] = extracted['normalized_text']
+            item['code_blocks'] = extracted['code_blocks']
+            item['content_extracted'] = True
             item['reading_time'] = self.extract_reading_time(item['content'])
         
         # テキストからのタグ抽出
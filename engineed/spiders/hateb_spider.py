@@ -72,7 +72,7 @@ class HatebSpider(BaseTechSpider):
         
         # 各記事ページにリクエスト
         for link in filtered_links[:15]:  # 最初の15件に制限
-            if self.should_follow_external_link(link):
+            if self.should_follow_external_link(link) and self.should_fetch_article(link):
                 yield scrapy.Request(
                     url=link,
                     callback=self.parse_external_article,
@@ -152,7 +152,7 @@ class HatebSpider(BaseTechSpider):
                 break
         
         # 基本的な記事情報を抽出
-        content = response.css('.markdown-body').get() or response.css('article').get()
+        content = response.css('.markdown-body') or response.css('article')
         tags = [tag.strip() for tag in response.css('a[href*="/tags/"]::text').getall()]
         
         return self.create_hateb_item(response, title, author, content, tags)
@@ -161,7 +161,7 @@ class HatebSpider(BaseTechSpider):
         """Zenn記事の専用パーサー"""
         title = response.css('h1::text').get()
         author = response.css('a[href*="/users/"]::text').get()
-        content = response.css('.zenn-markdown').get() or response.css('.ArticleBody_content').get()
+        content = response.css('.zenn-markdown') or response.css('.ArticleBody_content')
         tags = [tag.strip() for tag in response.css('a[href*="/topics/"]::text').getall()]
         
         return self.create_hateb_item(response, title, author, content, tags)
@@ -170,7 +170,7 @@ class HatebSpider(BaseTechSpider):
         """note記事の専用パーサー"""
         title = response.css('h1::text').get()
         author = response.css('.note-user-name::text').get()
-        content = response.css('.note-body').get()
+        content = response.css('.note-body')
         tags = [tag.strip() for tag in response.css('.tag::text').getall()]
         
         return self.create_hateb_item(response, title, author, content, tags)
@@ -190,7 +190,7 @@ class HatebSpider(BaseTechSpider):
                 break
         
         author = response.css('.author a::text').get()
-        content = response.css('.markdown-body').get() or response.css('article').get()
+        content = response.css('.markdown-body') or response.css('article')
         
         # GitHubのトピックをタグとして使用
         tags = [tag.strip() for tag in response.css('.topic-tag::text').getall()]
@@ -228,7 +228,7 @@ class HatebSpider(BaseTechSpider):
             if author:
                 break
         
-        # コンテンツの抽出
+        # コンテンツの抽出（Selectorのまま渡す）
         content_selectors = [
             'article',
             '.content',
@@ -239,7 +239,7 @@ class HatebSpider(BaseTechSpider):
         
         content = None
         for selector in content_selectors:
-            content = response.css(selector).get()
+            content = response.css(selector)
             if content:
                 break
         
@@ -73,7 +73,7 @@ class QiitaSpider(BaseTechSpider):
         # 各記事ページにリクエスト
         for link in article_links[:10]:  # 最初の10件に制限
             article_url = urljoin(response.url, link)
-            if self.should_follow_link(article_url) and '/items/' in article_url:
+            if self.should_follow_link(article_url) and '/items/' in article_url and self.should_fetch_article(article_url):
                 yield scrapy.Request(
                     url=article_url,
                     callback=self.parse_article,
@@ -164,16 +164,17 @@ class QiitaSpider(BaseTechSpider):
                 '.post-content',
             ]
             
-            content = ''
+            # 本文はSelectorのまま渡し、文字列への再シリアライズを避ける
+            content = None
             for selector in content_selectors:
                 content_elements = response.css(selector)
                 if content_elements:
-                    content = content_elements.get()
+                    content = content_elements[0]
                     break
             
             # contentが見つからない場合は本文全体から抽出
             if not content:
-                content = response.css('body').get()
+                content = response.css('body')
                 self.logger.warning(f'Using body content for {response.url}')
             
             if not content:
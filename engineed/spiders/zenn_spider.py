@@ -71,7 +71,7 @@ class ZennSpider(BaseTechSpider):
         # 各記事ページにリクエスト
         for link in article_links[:12]:  # 最初の12件に制限
             article_url = urljoin(response.url, link)
-            if self.should_follow_link(article_url):
+            if self.should_follow_link(article_url) and self.should_fetch_article(article_url):
                 yield scrapy.Request(
                     url=article_url,
                     callback=self.parse_article,
@@ -163,15 +163,16 @@ class ZennSpider(BaseTechSpider):
                 'article .content',
             ]
             
-            content = ''
+            # 本文はSelectorのまま渡し、文字列への再シリアライズを避ける
+            content = None
             for selector in content_selectors:
                 content_elements = response.css(selector)
                 if content_elements:
-                    content = content_elements.get()
+                    content = content_elements[0]
                     break
             
             if not content:
-                content = response.css('main').get()
+                content = response.css('main')
                 self.logger.warning(f'Using main content for {response.url}')
             
             if not content:
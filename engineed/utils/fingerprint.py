@@ -0,0 +1,80 @@
+import re
+import unicodedata
+import numpy as np
+
+# MinHashの次元数と、LSHのバンド分割（BANDS × ROWS = NUM_PERM）
+# 16バンド×4行では Jaccard 0.8 の組が候補になる確率は約99.98%、0.3 では約12%
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# 文字単位のシングル長（日本語は分かち書きしないため文字n-gramを使う）
+SHINGLE_LENGTH = 5
+
+# これより短い本文はタイトルの一致だけで重複と判定しかねないため署名を作らない
+MIN_TEXT_LENGTH = 200
+
+# 署名はプロセス・実行をまたいで比較するため、ハッシュ関数の係数は固定シードで作る
+_rng = np.random.default_rng(0x5EED)
+_HASH_A = _rng.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _rng.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+_SHINGLE_BASE = np.uint64(1099511628211)
+_BAND_MULTIPLIERS = _rng.integers(1, 2 ** 63, size=ROWS, dtype=np.uint64) | np.uint64(1)
+
+_IGNORED_CHARS = re.compile(r'[\W_]+')
+
+
+def normalize_for_fingerprint(content):
+    """署名用の正規化（NFKC・小文字化し、空白・記号を除く）"""
+    text = unicodedata.normalize('NFKC', content or '').lower()
+    return _IGNORED_CHARS.sub('', text)
+
+
+def shingle_hashes(text, length=SHINGLE_LENGTH):
+    """文字n-gramの64bitハッシュ（重複なし）"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < length:
+        length = len(codes)
+    # 長さ length の窓ごとの多項式ハッシュ（uint64の桁あふれで mod 2^64）
+    window = len(codes) - length + 1
+    hashes = np.zeros(window, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for offset in range(length):
+            hashes = hashes * _SHINGLE_BASE + codes[offset:offset + window]
+    return np.unique(hashes)
+
+
+def minhash_signature(content):
+    """本文のMinHash署名（uint32 × NUM_PERM のbytes）。本文が短すぎる場合は None
+
+    タイトルは転載時に書き換えられやすいため含めない。
+    """
+    text = normalize_for_fingerprint(content)
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+    hashes = shingle_hashes(text)
+    # 乗算シフト法による NUM_PERM 個のハッシュ関数で各シングルを写し、最小値を取る
+    with np.errstate(over='ignore'):
+        mapped = (_HASH_A[:, None] * hashes[None, :] + _HASH_B[:, None]) >> np.uint64(32)
+    return mapped.min(axis=1).astype('<u4').tobytes()
+
+
+def signature_array(signature):
+    return np.frombuffer(signature, dtype='<u4')
+
+
+def band_keys(signature):
+    """LSHのバンドごとのバケットキー（SQLiteのINTEGERに収まる符号付き64bit整数のリスト）
+
+    バンド番号もキーに混ぜるため、1列のインデックスで全バンドを引ける。
+    """
+    rows = signature_array(signature).astype(np.uint64).reshape(BANDS, ROWS)
+    with np.errstate(over='ignore'):
+        keys = (rows * _BAND_MULTIPLIERS).sum(axis=1, dtype=np.uint64)
+        keys = keys * _SHINGLE_BASE + np.arange(BANDS, dtype=np.uint64)
+    return keys.view(np.int64).tolist()
+
+
+def estimate_similarity(signature, others):
+    """署名同士の一致率（Jaccard係数の推定値）。others は署名の2次元配列"""
+    return (signature_array(signature)[None, :] == others).mean(axis=1)
@@ -0,0 +1,126 @@
+import re
+import unicodedata
+import lxml.html
+from lxml import etree
+
+
+class HtmlExtractor:
+    """lxmlによる記事本文の1パス抽出
+
+    parselのSelector（またはlxml要素・HTML文字列）を受け取り、要素ツリーを
+    1回走査するだけで、クリーンなテキスト・NFKC正規化済みテキスト・
+    コードブロック（<pre>）の位置・文字数をまとめて求める。
+    """
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'button'}
+    BLOCK_TAGS = {
+        'p', 'div', 'br', 'li', 'ul', 'ol', 'pre', 'blockquote', 'table', 'tr', 'td', 'th',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'header', 'footer', 'hr',
+    }
+    CODE_TAGS = {'pre'}
+
+    def extract(self, node):
+        """テキスト・正規化テキスト・コードブロック位置・文字数を返す"""
+        root = self._to_element(node)
+        raw = _TextBuilder()
+        normalized = _TextBuilder(normalize=True)
+        code_blocks = []
+
+        if root is not None:
+            # 選択された要素自身の後続テキスト（tail）は本文に含めない
+            self._walk(root, raw, normalized, code_blocks, include_tail=False)
+
+        normalized_text = normalized.text()
+        return {
+            'text': raw.text(),
+            'normalized_text': normalized_text,
+            'code_blocks': [
+                (start, min(end, len(normalized_text)))
+                for start, end in code_blocks if end > start
+            ],
+            'char_count': len(normalized_text),
+        }
+
+    def _to_element(self, node):
+        """Selector/SelectorList/lxml要素/HTML文字列をlxml要素に変換（文字列の場合のみパース）"""
+        if node is None:
+            return None
+        if isinstance(node, list):  # parselのSelectorList
+            node = node[0] if node else None
+            if node is None:
+                return None
+        if hasattr(node, 'root'):  # parselのSelector
+            node = node.root
+        if isinstance(node, str):
+            if not node.strip():
+                return None
+            try:
+                return lxml.html.fromstring(node)
+            except (etree.ParserError, ValueError):
+                return None
+        return node
+
+    def _walk(self, element, raw, normalized, code_blocks, include_tail=True):
+        tag = element.tag if isinstance(element.tag, str) else None
+        tag = tag.lower() if tag else None
+
+        # コメント等・スクリプト類は中身を飛ばし、後続テキスト（tail）のみ拾う
+        if tag is not None and tag not in self.SKIP_TAGS:
+            is_block = tag in self.BLOCK_TAGS
+            if is_block:
+                raw.separate()
+                normalized.separate()
+
+            start = normalized.length
+            if element.text:
+                raw.add(element.text)
+                normalized.add(element.text)
+            for child in element:
+                self._walk(child, raw, normalized, code_blocks)
+
+            if tag in self.CODE_TAGS:
+                code_blocks.append((start, normalized.length))
+            if is_block:
+                raw.separate()
+                normalized.separate()
+
+        if include_tail and element.tail:
+            raw.add(element.tail)
+            normalized.add(element.tail)
+
+
+class _TextBuilder:
+    """空白を畳み込みながらテキスト片を連結する"""
+
+    WHITESPACE = re.compile(r'\s+')
+
+    def __init__(self, normalize=False):
+        self.normalize = normalize
+        self.parts = []
+        self.length = 0
+        self.ends_with_space = True  # 先頭の空白は捨てる
+
+    def add(self, text):
+        if self.normalize:
+            text = unicodedata.normalize('NFKC', text)
+        text = self.WHITESPACE.sub(' ', text)
+        if self.ends_with_space and text.startswith(' '):
+            text = text[1:]
+        if text:
+            self.parts.append(text)
+            self.length += len(text)
+            self.ends_with_space = text.endswith(' ')
+
+    def separate(self):
+        """ブロック要素の境界に空白を1つ入れる"""
+        self.add(' ')
+
+    def text(self):
+        return ''.join(self.parts).strip()
+
+
+_extractor = HtmlExtractor()
+
+def extract_article_text(node):
+    """共有のHtmlExtractorで本文を抽出"""
+    return _extractor.extract(node)
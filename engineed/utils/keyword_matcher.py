@@ -0,0 +1,100 @@
+from collections import Counter, deque
+
+
+class KeywordMatcher:
+    """Aho-Corasick法による複数キーワードの一括マッチング
+
+    テキストを1回走査するだけで全キーワードの出現位置を求める。
+    英数字で始まる（終わる）キーワードは単語境界でのみマッチさせるため、
+    "go" が "google" の中でマッチすることはない。日本語のキーワードは
+    分かち書きされないため境界チェックを行わない。
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({kw.lower() for kw in keywords if kw})
+        self.keyword_set = set(self.keywords)
+        self._build()
+
+    def _build(self):
+        """トライとfailureリンクを構築"""
+        goto = [{}]
+        fail = [0]
+        output = [[]]
+
+        for keyword in self.keywords:
+            node = 0
+            for ch in keyword:
+                next_node = goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][ch] = next_node
+                    goto.append({})
+                    fail.append(0)
+                    output.append([])
+                node = next_node
+            output[node].append(keyword)
+
+        # 幅優先でfailureリンクを張り、出力を伝播させる
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, next_node in goto[node].items():
+                queue.append(next_node)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[next_node] = goto[state].get(ch, 0)
+                output[next_node] = output[next_node] + output[fail[next_node]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        self._boundaries = {
+            kw: (_is_word_char(kw[0]), _is_word_char(kw[-1])) for kw in self.keywords
+        }
+
+    def find_all(self, text):
+        """(開始位置, 終了位置, キーワード) のリストを返す（位置は小文字化後のテキスト基準）"""
+        if not text:
+            return []
+
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        node = 0
+
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            for keyword in output[node]:
+                start = i - len(keyword) + 1
+                if self._on_boundary(text, start, i + 1, keyword):
+                    matches.append((start, i + 1, keyword))
+
+        return matches
+
+    def count(self, text):
+        """キーワードごとの出現回数"""
+        return Counter(keyword for _, _, keyword in self.find_all(text))
+
+    def positions(self, text):
+        """キーワードごとの出現開始位置リスト"""
+        result = {}
+        for start, _, keyword in self.find_all(text):
+            result.setdefault(keyword, []).append(start)
+        return result
+
+    def _on_boundary(self, text, start, end, keyword):
+        check_left, check_right = self._boundaries[keyword]
+        if check_left and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if check_right and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+
+def _is_word_char(ch):
+    """単語境界の判定対象となる英数字か"""
+    return ch.isascii() and (ch.isalnum() or ch == '_')
@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from twisted.internet import defer
+
+
+class StageExecutor:
+    """CPU負荷の高い純粋関数をプロセスプールで実行し、結果をDeferredで返す
+
+    同時に投入できるタスク数を max_queue で制限し、超過分はDeferredSemaphoreで
+    待たせることでパイプライン（ひいてはダウンロード）に背圧をかける。
+    """
+
+    def __init__(self, max_workers=None, max_queue=64, initializer=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # リアクターやスレッドを抱えたプロセスをforkしないようspawnで起動する
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=initializer,
+        )
+        self.semaphore = defer.DeferredSemaphore(max_queue)
+
+    def submit(self, fn, *args):
+        """fn(*args) をワーカープロセスで実行するDeferredを返す"""
+        return self.semaphore.run(self._submit, fn, *args)
+
+    def _submit(self, fn, *args):
+        from twisted.internet import reactor
+
+        d = defer.Deferred()
+        future = self.pool.submit(fn, *args)
+        future.add_done_callback(lambda f: reactor.callFromThread(_fire, d, f))
+        return d
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _fire(d, future):
+    """concurrent.futures.Future の結果をDeferredに渡す（リアクタースレッドで実行）"""
+    if future.cancelled():
+        d.cancel()
+    elif future.exception() is not None:
+        d.errback(future.exception())
+    else:
+        d.callback(future.result())
+
+
+_executor = None
+
+def get_stage_executor(max_workers=None, max_queue=64, initializer=None):
+    """プロセス内で共有されるStageExecutorを取得（リアクター停止時にシャットダウン）"""
+    global _executor
+    if _executor is None:
+        from twisted.internet import reactor
+
+        _executor = StageExecutor(max_workers=max_workers, max_queue=max_queue, initializer=initializer)
+        reactor.addSystemEventTrigger('before', 'shutdown', _executor.shutdown)
+    return _executor
+
+
+def stage_executor_from_settings(settings, initializer=None):
+    """Scrapy設定からStageExecutorを取得（無効時は None）"""
+    if not settings.getbool('STAGE_EXECUTOR_ENABLED', False):
+        return None
+    return get_stage_executor(
+        max_workers=settings.getint('STAGE_EXECUTOR_WORKERS', 0) or None,
+        max_queue=settings.getint('STAGE_EXECUTOR_MAX_QUEUE', 64),
+        initializer=initializer,
+    )
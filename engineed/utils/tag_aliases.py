@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import unicodedata
+from engineed.utils.tech_keywords import get_keyword_manager
+
+# 表記ゆれの比較で無視する文字（"vue.js" / "vue-js" / "vuejs"、"react native" / "react-native"）
+_IGNORED_CHARS = re.compile(r'[\s._\-]+')
+_SPACES = re.compile(r'\s+')
+_LEADING = re.compile(r'^[#\s]+')
+
+# 解決結果のキャッシュの上限（タグ名の種類は有限だが、異常な入力で膨らまないようにする）
+MAX_RESOLVED = 100000
+
+
+def normalize_tag(name):
+    """タグ名の正規化（NFKC・小文字化・前後の空白と先頭の#を除き、空白を1つにまとめる）"""
+    name = _LEADING.sub('', unicodedata.normalize('NFKC', name or '').lower()).strip()
+    return _SPACES.sub(' ', name)
+
+
+def alias_key(name):
+    """表記ゆれを同一視するための比較キー（正規化したタグ名から空白・.・_・- を除く）"""
+    return _IGNORED_CHARS.sub('', name)
+
+
+class TagAliasMap:
+    """タグ名→正規タグ名の辞書（1回の正規化と dict の参照だけで解決する）
+
+    別名ファイル（正規タグ名→別名リストのJSON）の対応に加え、キーワード辞書の語は
+    比較キー（"vuejs"、"react-native" など）でも引けるようにする。".js" を除いた名前は
+    "next"・"express"・"node" のように一般語と紛れるため自動ではまとめず、"vue" のように
+    紛れないものだけ別名ファイルに書く。どれにも当たらないタグは正規化した名前のまま使う。
+    """
+
+    def __init__(self, aliases_file='data/tag_aliases.json', keyword_manager=None):
+        self.aliases_file = aliases_file
+        self.keyword_manager = keyword_manager or get_keyword_manager()
+        self.aliases = self._load_aliases()
+        self._matcher = None
+        self._canonical = {}
+        self._resolved = {}
+
+    def _load_aliases(self):
+        """別名ファイルを読み込み"""
+        if os.path.exists(self.aliases_file):
+            with open(self.aliases_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        else:
+            return self._create_default_aliases()
+
+    def _create_default_aliases(self):
+        """デフォルトの別名を作成"""
+        aliases = {
+            "javascript": ["js", "ecmascript"],
+            "typescript": ["ts"],
+            "python": ["python3"],
+            "go": ["golang"],
+            "kubernetes": ["k8s"],
+            "postgresql": ["postgres"],
+            "react": ["reactjs", "react.js"],
+            "vue.js": ["vue"],
+            "nuxt.js": ["nuxt"],
+            "aws": ["amazon web services"],
+            "gcp": ["google cloud platform"],
+            "ai": ["人工知能", "artificial intelligence"],
+            "machine learning": ["機械学習", "ml"],
+            "deep learning": ["深層学習", "ディープラーニング"],
+            "neural network": ["ニューラルネットワーク"],
+            "generative ai": ["生成ai"],
+            "llm": ["大規模言語モデル"],
+            "microservices": ["マイクロサービス"],
+            "serverless": ["サーバーレス"],
+            "design patterns": ["デザインパターン"],
+            "agile": ["アジャイル"],
+            "scrum": ["スクラム"],
+        }
+
+        # ファイルに保存
+        os.makedirs(os.path.dirname(self.aliases_file), exist_ok=True)
+        with open(self.aliases_file, 'w', encoding='utf-8') as f:
+            json.dump(aliases, f, ensure_ascii=False, indent=2)
+
+        return aliases
+
+    def _build(self, matcher):
+        """キーワード辞書と別名ファイルから 表記→正規タグ名 の辞書を作る（別名ファイルを優先）"""
+        canonical = {}
+        for keyword in matcher.keywords:
+            canonical.setdefault(alias_key(keyword), keyword)
+        # キーワード自身は比較キーの衝突に関わらず自分に解決する
+        canonical.update({keyword: keyword for keyword in matcher.keywords})
+        for target, names in self.aliases.items():
+            target = normalize_tag(target)
+            for name in [target] + list(names):
+                name = normalize_tag(name)
+                canonical[name] = target
+                canonical[alias_key(name)] = target
+        # 別名の連鎖（a → b → c）は最終的な正規タグ名に直接解決させる
+        for name, target in canonical.items():
+            seen = {name}
+            while canonical.get(target, target) != target and target not in seen:
+                seen.add(target)
+                target = canonical[target]
+            canonical[name] = target
+        self._canonical = canonical
+        self._resolved = {}
+        self._matcher = matcher
+
+    def resolve(self, name):
+        """タグ名を正規タグ名に解決する（空のタグ名は空文字列）"""
+        matcher = self.keyword_manager.get_matcher()
+        if matcher is not self._matcher:
+            # キーワードが追加された場合は辞書を作り直す
+            self._build(matcher)
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            normalized = normalize_tag(name)
+            resolved = self._canonical.get(normalized) or self._canonical.get(alias_key(normalized)) or normalized
+            if len(self._resolved) >= MAX_RESOLVED:
+                self._resolved.clear()
+            self._resolved[name] = resolved
+        return resolved
+
+    def resolve_all(self, names):
+        """タグ名リストを正規タグ名のリストにする（重複と空のタグ名を除き、順序は保つ）"""
+        return list(dict.fromkeys(tag for tag in map(self.resolve, names) if tag))
+
+
+_alias_maps = {}
+
+def get_tag_alias_map(aliases_file='data/tag_aliases.json'):
+    """プロセス内で共有されるTagAliasMapを取得"""
+    if aliases_file not in _alias_maps:
+        _alias_maps[aliases_file] = TagAliasMap(aliases_file)
+    return _alias_maps[aliases_file]
@@ -1,12 +1,20 @@
 import json
 import os
+from engineed.utils.keyword_matcher import KeywordMatcher
 
 class TechKeywordManager:
     """技術キーワード管理"""
     
     def __init__(self, keywords_file='data/tech_keywords.json'):
         self.keywords_file = keywords_file
-        self.keywords = self._load_keywords()
+        self._file_keywords = self._load_keywords()
+        # 後から追加されたデフォルトのカテゴリ（"japanese" など）はメモリ上でだけ補う
+        # （ファイルは書き換えないため、保存時もファイルにあったカテゴリだけを書く）
+        self.keywords = {
+            **{category: list(terms) for category, terms in self._default_keywords().items()},
+            **self._file_keywords,
+        }
+        self._matcher = None
     
     def _load_keywords(self):
         """キーワードファイルを読み込み"""
@@ -18,7 +26,16 @@ class TechKeywordManager:
     
     def _create_default_keywords(self):
         """デフォルトキーワードを作成"""
-        keywords = {
+        keywords = self._default_keywords()
+        
+        # ファイルに保存
+        self._write_keywords(keywords)
+        
+        return keywords
+    
+    def _default_keywords(self):
+        """デフォルトキーワード（カテゴリ→キーワードリスト）"""
+        return {
             "languages": [
                 "Python", "JavaScript", "TypeScript", "Java", "Go", "Rust", 
                 "C++", "C#", "PHP", "Ruby", "Swift", "Kotlin", "Dart",
@@ -58,15 +75,18 @@ class TechKeywordManager:
                 "WebGPU", "Deno", "Bun", "Tauri", "SvelteKit", "Remix",
                 "Astro", "Vite", "esbuild", "Turbopack", "pnpm", "Yarn",
                 "Edge Computing", "Web3", "Blockchain", "NFT", "DeFi"
+            ],
+            "japanese": [
+                "機械学習", "深層学習", "データサイエンス", "Web開発",
+                "フロントエンド", "バックエンド", "インフラ", "アジャイル", "スクラム"
             ]
         }
-        
-        # ファイルに保存
-        os.makedirs(os.path.dirname(self.keywords_file), exist_ok=True)
+    
+    def _write_keywords(self, keywords):
+        if os.path.dirname(self.keywords_file):
+            os.makedirs(os.path.dirname(self.keywords_file), exist_ok=True)
         with open(self.keywords_file, 'w', encoding='utf-8') as f:
             json.dump(keywords, f, ensure_ascii=False, indent=2)
-        
-        return keywords
     
     def get_all_keywords(self):
         """全キーワードを取得"""
@@ -75,6 +95,12 @@ class TechKeywordManager:
             all_keywords.extend(keywords)
         return all_keywords
     
+    def get_matcher(self):
+        """全キーワードのマッチャーを取得（キーワード集合が変わった時のみ再構築）"""
+        if self._matcher is None:
+            self._matcher = KeywordMatcher(self.get_all_keywords())
+        return self._matcher
+    
     def get_keywords_by_category(self, category):
         """カテゴリ別キーワードを取得"""
         return self.keywords.get(category, [])
@@ -86,9 +112,19 @@ class TechKeywordManager:
         
         if keyword not in self.keywords[category]:
             self.keywords[category].append(keyword)
+            self._matcher = None
+            self._file_keywords[category] = self.keywords[category]
             self._save_keywords()
     
     def _save_keywords(self):
-        """キーワードをファイルに保存"""
-        with open(self.keywords_file, 'w', encoding='utf-8') as f:
-            json.dump(self.keywords, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        """キーワードをファイルに保存（メモリ上で補ったデフォルトのカテゴリは、キーワードを追加したもの以外書かない）"""
+        self._write_keywords(self._file_keywords)
+
+
+_managers = {}
+
+def get_keyword_manager(keywords_file='data/tech_keywords.json'):
+    """プロセス内で共有されるTechKeywordManagerを取得"""
+    if keywords_file not in _managers:
+        _managers[keywords_file] = TechKeywordManager(keywords_file)
+    return _managers[keywords_file]
\ No newline at end of file
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import re
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import numpy as np
+
+# 1レコード = URLハッシュ(64bit) + 最終取得時刻(UNIX秒)
+RECORD_DTYPE = np.dtype([('url_hash', '<u8'), ('last_seen', '<u4')])
+
+# 正規化時に除去するトラッキング用クエリパラメータ
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|ref_src)$', re.IGNORECASE)
+
+
+def canonicalize_url(url):
+    """URLの正規化（スキーム・ホストの小文字化、フラグメント・トラッキング引数・末尾スラッシュの除去）"""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(key)
+    )
+    return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(query), ''))
+
+
+def url_hash(url):
+    """正規化済みURLの64bitハッシュ"""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class URLFrontier:
+    """クロール間・スパイダー間で共有する取得済みURLストア
+
+    URLハッシュでソートした固定長レコードの配列をディスクに置き、
+    memmapで読み込んで二分探索する。実行中に取得したURLはメモリ上に
+    保持し、save() で既存ファイルとマージして書き戻す。
+    """
+
+    def __init__(self, path='data/url_frontier.bin', revisit_seconds=7 * 86400, revisit_rules=()):
+        self.path = path
+        self.revisit_seconds = revisit_seconds
+        # (URL正規表現, 再訪間隔秒) のリスト。最初にマッチしたものを使う
+        self.revisit_rules = [(re.compile(pattern), seconds) for pattern, seconds in revisit_rules]
+        self.pending = {}
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= RECORD_DTYPE.itemsize:
+            self.records = np.memmap(self.path, dtype=RECORD_DTYPE, mode='r')
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self.hashes = self.records['url_hash']
+
+    def __len__(self):
+        """記録済みのURL数（保存済みのレコードと重複する未保存分は数えない）"""
+        if not self.pending or not len(self.hashes):
+            return len(self.records) + len(self.pending)
+        pending = np.fromiter(self.pending, dtype=np.uint64, count=len(self.pending))
+        index = np.minimum(np.searchsorted(self.hashes, pending), len(self.hashes) - 1)
+        known = int(np.count_nonzero(self.hashes[index] == pending))
+        return len(self.records) + len(pending) - known
+
+    def last_seen(self, url):
+        """最終取得時刻（UNIX秒、未取得なら None）"""
+        key = url_hash(canonicalize_url(url))
+        if key in self.pending:
+            return self.pending[key]
+
+        index = int(np.searchsorted(self.hashes, np.uint64(key)))
+        if index < len(self.hashes) and int(self.hashes[index]) == key:
+            return int(self.records['last_seen'][index])
+        return None
+
+    def revisit_interval(self, url):
+        """URLごとの再訪間隔（秒）"""
+        for pattern, seconds in self.revisit_rules:
+            if pattern.search(url):
+                return seconds
+        return self.revisit_seconds
+
+    def should_fetch(self, url, now=None):
+        """未取得、または再訪間隔を過ぎていれば True"""
+        last_seen = self.last_seen(url)
+        if last_seen is None:
+            return True
+        now = int(now if now is not None else time.time())
+        return now - last_seen >= self.revisit_interval(url)
+
+    def mark_seen(self, url, now=None):
+        """取得済みとして記録"""
+        key = url_hash(canonicalize_url(url))
+        self.pending[key] = int(now if now is not None else time.time())
+
+    def save(self):
+        """メモリ上の記録をディスク上の最新ファイルとマージして書き戻す"""
+        if not self.pending:
+            return
+
+        # 他プロセスが書き込んでいる可能性があるため読み直してからマージ
+        self._load()
+        new_records = np.fromiter(self.pending.items(), dtype=RECORD_DTYPE, count=len(self.pending))
+        merged = np.concatenate([np.asarray(self.records), new_records])
+
+        # ハッシュ→最終取得時刻の順にソートし、同一ハッシュは最新のものを残す
+        merged = merged[np.lexsort((merged['last_seen'], merged['url_hash']))]
+        keep = np.ones(len(merged), dtype=bool)
+        keep[:-1] = merged['url_hash'][1:] != merged['url_hash'][:-1]
+        merged = merged[keep]
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        merged.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+
+        self.pending = {}
+        self._load()
+
+
+_frontiers = {}
+
+def get_url_frontier(path='data/url_frontier.bin', revisit_seconds=7 * 86400, revisit_rules=()):
+    """プロセス内で共有されるURLFrontierを取得"""
+    if path not in _frontiers:
+        _frontiers[path] = URLFrontier(path, revisit_seconds=revisit_seconds, revisit_rules=revisit_rules)
+    return _frontiers[path]
+
+
+def url_frontier_from_settings(settings):
+    """Scrapy設定からURLFrontierを取得（無効時は None）"""
+    if not settings.getbool('URL_FRONTIER_ENABLED', False):
+        return None
+    return get_url_frontier(
+        settings.get('URL_FRONTIER_PATH', 'data/url_frontier.bin'),
+        revisit_seconds=settings.getint('URL_FRONTIER_REVISIT_SECONDS', 7 * 86400),
+        revisit_rules=settings.getlist('URL_FRONTIER_REVISIT_RULES'),
+    )
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""DatabasePipeline のバッチ書き込み（一括UPSERT・失敗時の再試行と破棄）のテスト"""
+
+import sys
+import os
+import logging
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engineed.models.database import Article
+from engineed.pipelines import DatabasePipeline
+
+class DummySpider:
+    name = 'test'
+    logger = logging.getLogger('test_database_pipeline')
+
+class DummyStats:
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+def make_item(n):
+    return {
+        'url': f'https://example.com/articles/{n}',
+        'title': f'記事 {n}',
+        'content': f'テスト記事の本文です。{n} ' * 20,
+        'source_site': 'example',
+        'tags': ['python', 'テスト'],
+    }
+
+def open_pipeline(tmpdir, batch_size=3):
+    pipeline = DatabasePipeline(
+        database_url=f"sqlite:///{os.path.join(tmpdir, 'articles.db')}",
+        batch_size=batch_size,
+        flush_interval=3600,  # テスト中に時間経過では書き出さない
+        search_index=False,
+        close_jobs=False,
+        write_retries=3,
+    )
+    pipeline.stats = DummyStats()
+    pipeline.open_spider(DummySpider())
+    return pipeline
+
+def stored_urls(pipeline):
+    session = pipeline.SessionLocal()
+    try:
+        return {url for (url,) in session.query(Article.url)}
+    finally:
+        session.close()
+
+def fail_for(pipeline, bad_urls):
+    """bad_urls を含むバッチの書き込みを失敗させる"""
+    upsert = pipeline._upsert_articles
+
+    def failing_upsert(items, session):
+        upsert(items, session)
+        if any(item['url'] in bad_urls for item in items):
+            raise RuntimeError('simulated database error')
+        return 0
+    pipeline._upsert_articles = failing_upsert
+
+def test_batch_flush():
+    """batch_size 件たまったら一括で書き込み、バッファを空にする"""
+    print("Testing batch flush...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pipeline = open_pipeline(tmpdir)
+        spider = DummySpider()
+        for n in range(2):
+            pipeline.process_item(make_item(n), spider)
+        assert len(pipeline.buffer) == 2
+        assert stored_urls(pipeline) == set()
+
+        pipeline.process_item(make_item(2), spider)
+        assert pipeline.buffer == {}
+        assert stored_urls(pipeline) == {make_item(n)['url'] for n in range(3)}
+
+        # 同じURLは更新になる
+        item = make_item(0)
+        item['content'] = '更新した本文です。' * 20
+        pipeline.process_item(item, spider)
+        pipeline.close_spider(spider)
+        assert pipeline.buffer == {}
+        assert len(stored_urls(pipeline)) == 3
+    print("Batch flush: OK")
+
+def test_failed_batch_keeps_buffer():
+    """コミットできなかった記事はバッファから消えない"""
+    print("\nTesting failed batch rollback...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pipeline = open_pipeline(tmpdir, batch_size=10)
+        spider = DummySpider()
+        items = [make_item(n) for n in range(3)]
+        for item in items:
+            pipeline.process_item(item, spider)
+        fail_for(pipeline, {item['url'] for item in items})
+
+        pipeline.flush_buffer(spider)
+        # 一括・1件ずつのどちらもロールバックされ、全件がバッファに残る
+        assert stored_urls(pipeline) == set()
+        assert set(pipeline.buffer) == {item['url'] for item in items}
+        assert all(count == 1 for count in pipeline.write_failures.values())
+    print("Failed batch rollback: OK")
+
+def test_failed_item_retried_then_dropped():
+    """失敗した記事だけを残して再試行し、write_retries 回失敗したら破棄する"""
+    print("\nTesting retry and drop of failed items...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pipeline = open_pipeline(tmpdir, batch_size=10)
+        spider = DummySpider()
+        items = [make_item(n) for n in range(3)]
+        bad_url = items[1]['url']
+        for item in items:
+            pipeline.process_item(item, spider)
+        fail_for(pipeline, {bad_url})
+
+        pipeline.flush_buffer(spider)
+        # 失敗した記事以外は1件ずつ書き直されている
+        assert stored_urls(pipeline) == {items[0]['url'], items[2]['url']}
+        assert list(pipeline.buffer) == [bad_url]
+        assert pipeline.write_failures == {bad_url: 1}
+
+        pipeline.flush_buffer(spider)
+        assert pipeline.write_failures == {bad_url: 2}
+
+        # 終了時に残りの再試行を行い、それでも失敗した記事は破棄する
+        pipeline.close_spider(spider)
+        assert pipeline.buffer == {}
+        assert pipeline.write_failures == {}
+        assert pipeline.stats.values.get('database/dropped_items') == 1
+        assert bad_url not in stored_urls(pipeline)
+    print("Retry and drop of failed items: OK")
+
+def test_new_item_resets_failures():
+    """失敗中の記事と同じURLの新しい記事が届いたら、失敗回数を数え直す"""
+    print("\nTesting failure count reset...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pipeline = open_pipeline(tmpdir, batch_size=10)
+        spider = DummySpider()
+        item = make_item(0)
+        pipeline.process_item(item, spider)
+        fail_for(pipeline, {item['url']})
+        pipeline.flush_buffer(spider)
+        assert pipeline.write_failures == {item['url']: 1}
+
+        pipeline.process_item(make_item(0), spider)
+        assert pipeline.write_failures == {}
+        assert len(pipeline.buffer) == 1
+    print("Failure count reset: OK")
+
+if __name__ == '__main__':
+    print("=== DatabasePipeline batch tests ===")
+    test_batch_flush()
+    test_failed_batch_keeps_buffer()
+    test_failed_item_retried_then_dropped()
+    test_new_item_resets_failures()
+    print("\nAll tests passed!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""記事一覧のキーセットページネーション（カーソルと article_page）のテスト"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engineed.models.database import Article, TechTag, get_shared_database
+from engineed.models.queries import encode_cursor, decode_cursor, article_page
+
+BASE_TIME = datetime(2025, 1, 1)
+
+def create_articles(session):
+    """同じ並び順の値・NULLのスコア・近似重複・タグ付きの記事を混ぜて作る"""
+    python = TechTag(name='python')
+    session.add(python)
+    articles = []
+    for n in range(30):
+        article = Article(
+            title=f'記事 {n}',
+            url=f'https://example.com/articles/{n}',
+            content='本文',
+            source_site='qiita' if n % 2 else 'zenn',
+            # 3件ずつ同じ scraped_at にして、同じ値の中では id で並ぶことを確かめる
+            scraped_at=BASE_TIME + timedelta(hours=n // 3),
+            published_at=BASE_TIME - timedelta(days=n),
+            tech_feed_score=None if n % 5 == 0 else float(n % 7),
+            is_tutorial=n % 3 == 0,
+        )
+        if n % 4 == 0:
+            article.tags.append(python)
+        articles.append(article)
+    session.add_all(articles)
+    session.flush()
+    # 近似重複の記事は一覧から除かれる
+    articles[10].canonical_id = articles[0].id
+    session.commit()
+    return [article for article in articles if article.canonical_id is None]
+
+def read_all_pages(session, limit, **filters):
+    """カーソルをたどって全ページを読み、記事IDのリストとページ数を返す"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = article_page(session, limit=limit, cursor=cursor, **filters)
+        ids.extend(row['id'] for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+def expected_ids(articles, key):
+    """(値, id) の降順（NULLは末尾で id の降順）"""
+    with_value = [article for article in articles if getattr(article, key) is not None]
+    without_value = [article for article in articles if getattr(article, key) is None]
+    with_value.sort(key=lambda article: (getattr(article, key), article.id), reverse=True)
+    without_value.sort(key=lambda article: article.id, reverse=True)
+    return [article.id for article in with_value + without_value]
+
+def test_cursor_round_trip():
+    """カーソルは同じ並び順でだけ元の値に戻せる"""
+    print("Testing cursor round trip...")
+    scraped_at = datetime(2025, 3, 1, 12, 30, 15, 123456)
+    assert decode_cursor('scraped_at', encode_cursor('scraped_at', scraped_at, 42)) == (scraped_at, 42)
+    assert decode_cursor('score', encode_cursor('score', 1.5, 7)) == (1.5, 7)
+    assert decode_cursor('score', encode_cursor('score', None, 7)) == (None, 7)
+
+    for sort, cursor in [
+        ('score', encode_cursor('scraped_at', scraped_at, 42)),  # 別の並び順のカーソル
+        ('scraped_at', 'not-a-cursor'),
+        ('scraped_at', ''),
+    ]:
+        try:
+            decode_cursor(sort, cursor)
+        except ValueError:
+            continue
+        raise AssertionError(f"Cursor {cursor!r} should be rejected for sort '{sort}'")
+    print("Cursor round trip: OK")
+
+def test_article_page():
+    """全ページをたどると、重複も欠けもなく (並び順の値, id) の降順になる"""
+    print("\nTesting article_page...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine, SessionLocal = get_shared_database(f"sqlite:///{os.path.join(tmpdir, 'articles.db')}")
+        session = SessionLocal()
+        try:
+            articles = create_articles(session)
+
+            ids, pages = read_all_pages(session, limit=7, sort='scraped_at')
+            assert ids == expected_ids(articles, 'scraped_at')
+            assert pages == 5
+
+            ids, _ = read_all_pages(session, limit=4, sort='score')
+            assert ids == expected_ids(articles, 'tech_feed_score')
+
+            qiita = [article for article in articles if article.source_site == 'qiita']
+            ids, _ = read_all_pages(session, limit=3, sort='score', source_site='qiita')
+            assert ids == expected_ids(qiita, 'tech_feed_score')
+
+            # タグは別名でも絞り込める
+            tagged = [article for article in articles if int(article.url.rsplit('/', 1)[1]) % 4 == 0]
+            ids, _ = read_all_pages(session, limit=2, sort='scraped_at', tag='Python')
+            assert ids == expected_ids(tagged, 'scraped_at')
+
+            rows, cursor = article_page(session, limit=100, include_duplicates=True)
+            assert len(rows) == 30 and cursor is None
+        finally:
+            session.close()
+    print("article_page: OK")
+
+def test_article_page_published_range():
+    """公開日時の範囲指定（狭い範囲では公開日時のインデックスで読む）でも並び順は変わらない"""
+    print("\nTesting article_page with a published_at range...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine, SessionLocal = get_shared_database(f"sqlite:///{os.path.join(tmpdir, 'articles.db')}")
+        session = SessionLocal()
+        try:
+            articles = create_articles(session)
+            # タイムゾーン付きの日時はUTCに変換して比較する
+            since = (BASE_TIME - timedelta(days=20)).replace(tzinfo=timezone.utc)
+            until = BASE_TIME - timedelta(days=5)
+            in_range = [
+                article for article in articles
+                if since.replace(tzinfo=None) <= article.published_at < until
+            ]
+            for sort, key in [('scraped_at', 'scraped_at'), ('score', 'tech_feed_score')]:
+                ids, _ = read_all_pages(session, limit=4, sort=sort, since=since, until=until)
+                assert ids == expected_ids(in_range, key)
+        finally:
+            session.close()
+    print("article_page with a published_at range: OK")
+
+if __name__ == '__main__':
+    print("=== Article listing pagination tests ===")
+    test_cursor_round_trip()
+    test_article_page()
+    test_article_page_published_range()
+    print("\nAll tests passed!")
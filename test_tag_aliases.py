@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""タグ名の正規化・別名解決（TagAliasMap）とタグ統合の計画（plan_tag_merges）のテスト"""
+
+import sys
+import os
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engineed.utils.tag_aliases import TagAliasMap, normalize_tag, alias_key
+from engineed.utils.tech_keywords import TechKeywordManager
+from engineed.models.tags import plan_tag_merges
+
+def create_alias_map(tmpdir):
+    """一時ディレクトリのデフォルトの別名ファイル・キーワード辞書で TagAliasMap を作る"""
+    keyword_manager = TechKeywordManager(os.path.join(tmpdir, 'tech_keywords.json'))
+    return TagAliasMap(os.path.join(tmpdir, 'tag_aliases.json'), keyword_manager)
+
+def test_normalize_tag():
+    """正規化は NFKC・小文字化・先頭の#と余分な空白の除去"""
+    print("Testing normalize_tag...")
+    assert normalize_tag('  #Python ') == 'python'
+    assert normalize_tag('ＰＹＴＨＯＮ') == 'python'
+    assert normalize_tag('Machine   Learning') == 'machine learning'
+    assert normalize_tag(None) == ''
+    assert alias_key('react-native') == alias_key('react native') == 'reactnative'
+    assert alias_key('vue.js') == 'vuejs'
+    print("normalize_tag: OK")
+
+def test_resolve():
+    """別名ファイル・キーワード辞書の表記ゆれを正規タグ名に解決する"""
+    print("\nTesting resolve...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        aliases = create_alias_map(tmpdir)
+        cases = {
+            'Vue': 'vue.js',  # 別名ファイル
+            'VUE.JS': 'vue.js',
+            'vuejs': 'vue.js',  # 比較キー
+            'golang': 'go',
+            'K8s': 'kubernetes',
+            'Python3': 'python',
+            '#Python': 'python',
+            '機械学習': 'machine learning',
+            'React-Native': 'react native',  # キーワード辞書の比較キー
+            'nodejs': 'node.js',
+            'node': 'node',  # ".js" を除いた名前は一般語と紛れるためまとめない
+            'next': 'next',
+            'foo  bar': 'foo bar',  # どれにも当たらない場合は正規化した名前のまま
+            '': '',
+        }
+        for name, expected in cases.items():
+            assert aliases.resolve(name) == expected, (name, aliases.resolve(name))
+        assert aliases.resolve_all(['JS', 'javascript', '', 'Go', 'golang']) == ['javascript', 'go']
+    print("resolve: OK")
+
+def test_resolve_after_keyword_added():
+    """キーワードが追加されたら辞書を作り直し、新しいキーワードの表記ゆれも解決する"""
+    print("\nTesting resolve after a keyword is added...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        aliases = create_alias_map(tmpdir)
+        assert aliases.resolve('honojs') == 'honojs'
+        aliases.keyword_manager.add_keyword('frameworks', 'Hono.js')
+        assert aliases.resolve('honojs') == 'hono.js'
+        assert aliases.resolve('Hono-JS') == 'hono.js'
+    print("Resolve after a keyword is added: OK")
+
+def test_plan_tag_merges():
+    """正規タグ名そのもののタグ（無ければ記事数の最も多いタグ）に統合する"""
+    print("\nTesting plan_tag_merges...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        aliases = create_alias_map(tmpdir)
+        tags = [
+            (1, 'JS', 5),
+            (2, 'javascript', 1),  # 正規タグ名そのもの → 記事数が少なくても残す
+            (3, 'golang', 3),
+            (4, 'Golang', 7),  # 正規タグ名のタグが無い → 記事数の多いタグを残して改名
+            (5, 'rust', 2),  # 統合対象なし
+            (6, 'vuejs', 4),
+            (7, 'Vue', 4),  # 記事数が同じなら id の小さいタグを残す
+            (8, '', 9),  # 空のタグ名は対象外
+        ]
+        merges, renames = plan_tag_merges(tags, aliases)
+        assert merges == {1: 2, 3: 4, 7: 6}
+        assert renames == {4: 'go', 6: 'vue.js'}
+    print("plan_tag_merges: OK")
+
+if __name__ == '__main__':
+    print("=== Tag alias tests ===")
+    test_normalize_tag()
+    test_resolve()
+    test_resolve_after_keyword_added()
+    test_plan_tag_merges()
+    print("\nAll tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""新語候補のストリーミングカウンタ（TermSketch）と候補語の抽出のテスト"""
+
+import sys
+import os
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engineed.ai.term_sketch import TermSketch, SECONDS_PER_DAY
+from engineed.ai.keyword_extractor import TechKeywordExtractor
+
+def test_counts_and_top():
+    """1記事につき1回数え、回数の多い順に返す"""
+    print("Testing counts and top...")
+    sketch = TermSketch(path='', width=1024, depth=4, capacity=10)
+    for _ in range(8):
+        sketch.add_document({'htmx': 'htmx', 'bun.js': 'Bun.js'})
+    for _ in range(3):
+        sketch.add_document({'bun.js': 'Bun.js'})
+    sketch.add_document({})
+
+    assert sketch.documents == 12
+    assert sketch.top(min_count=1) == [('Bun.js', 11.0), ('htmx', 8.0)]
+    assert sketch.top(min_count=10) == [('Bun.js', 11.0)]
+    assert sketch.top(min_count=1, exclude={'bun.js'}) == [('htmx', 8.0)]
+
+    sketch.discard(['htmx'])
+    assert sketch.top(min_count=1) == [('Bun.js', 11.0)]
+    print("Counts and top: OK")
+
+def test_capacity():
+    """上位 capacity 件だけを保持し、回数の少ない語から追い出す"""
+    print("\nTesting capacity...")
+    sketch = TermSketch(path='', width=4096, depth=4, capacity=3)
+    for n in range(10):
+        for _ in range(n + 1):
+            sketch.add_document({f'term{n}': f'Term{n}'})
+
+    top = sketch.top(min_count=1)
+    assert len(sketch.estimates) == 3
+    assert [label for label, _ in top] == ['Term9', 'Term8', 'Term7']
+    # Count-Min sketch は過小評価しない
+    assert all(estimate >= int(label[4:]) + 1 for label, estimate in top)
+    print("Capacity: OK")
+
+def test_decay_and_persistence():
+    """半減期で回数が減り、保存した状態を読み込める"""
+    print("\nTesting decay and persistence...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'term_sketch.npz')
+        sketch = TermSketch(path=path, width=1024, depth=4, capacity=10, half_life_days=30.0)
+        for _ in range(8):
+            sketch.add_document({'htmx': 'htmx'})
+
+        sketch.decay(now=sketch.updated_at + 30 * SECONDS_PER_DAY)
+        assert abs(sketch.top(min_count=1)[0][1] - 4.0) < 1e-6
+        assert abs(sketch.documents - 4.0) < 1e-6
+
+        sketch.save()
+        loaded = TermSketch(path=path, width=1024, depth=4, capacity=10, half_life_days=30.0).load()
+        assert [label for label, _ in loaded.top(min_count=1)] == ['htmx']
+        assert abs(loaded.top(min_count=1)[0][1] - 4.0) < 1e-3
+
+        # 大きさの違う状態は読み込まない
+        other = TermSketch(path=path, width=512, depth=4, capacity=10).load()
+        assert other.top(min_count=0) == []
+    print("Decay and persistence: OK")
+
+def test_candidate_terms():
+    """文頭で大文字になるだけの英単語は新語の候補にしない"""
+    print("\nTesting candidate terms...")
+    extractor = TechKeywordExtractor()
+    _, candidates = extractor.extract_keywords_with_candidates(
+        "However, Today we tried HtmxBoost and Bun.js. Because the Example used the ABCD format."
+    )
+    assert set(candidates) >= {'htmxboost', 'bun.js', 'abcd'}
+    for word in ('however', 'today', 'because', 'example', 'the'):
+        assert word not in candidates
+    print("Candidate terms: OK")
+
+if __name__ == '__main__':
+    print("=== TermSketch tests ===")
+    test_counts_and_top()
+    test_capacity()
+    test_decay_and_persistence()
+    test_candidate_terms()
+    print("\nAll tests passed!")
@@ -1,12 +1,20 @@
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request, Query
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, desc
-from engineed.models.database import Article, TechTag, SessionLocal, create_database
+from fastapi.responses import HTMLResponse, JSONResponse
+from sqlalchemy import desc
+from sqlalchemy.orm import selectinload, undefer
+from engineed.models.database import Article, TechTag, get_shared_database
+from engineed.models.session_runner import SessionRunner
+from engineed.models.search import search_articles
+from engineed.models.stats import total_articles, read_stats
+from engineed.models.queries import article_page, related_articles
+from engineed.ai.personal_feed import get_personal_feed, record_read, set_interests
+from engineed import settings
 import os
+from datetime import datetime
 from pathlib import Path
+from typing import List, Optional
 
 # FastAPIアプリケーション初期化
 app = FastAPI(title="Engineed - Tech News Aggregator", version="1.0.0")
@@ -16,42 +24,112 @@ BASE_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
-# データベース依存関数
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# DBアクセス用のセッションランナー（startupで初期化）
+db_runner = None
 
 @app.on_event("startup")
 async def startup_event():
     """アプリケーション起動時にデータベースを初期化"""
+    global db_runner
     try:
         # データベースディレクトリが存在しない場合は作成
         data_dir = Path("data")
         data_dir.mkdir(exist_ok=True)
-        
-        # データベース初期化
-        create_database()
+
+        # データベース初期化（エンジン・接続プールはプロセス内で共有）
+        engine, SessionLocal = get_shared_database(settings.DATABASE_URL)
+        db_runner = SessionRunner(SessionLocal, max_workers=settings.WEB_DB_WORKERS)
         print("Database initialized successfully")
     except Exception as e:
         print(f"Database initialization error: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """アプリケーション終了時にDBスレッドを停止"""
+    if db_runner is not None:
+        db_runner.shutdown()
+
+# 以下のローダーはDBスレッドで実行される。セッションを閉じた後に
+# テンプレートから参照するため、必要な列・リレーションはここで読み込んでおく
+
+def load_home(db, sort):
+    articles, _ = article_page(db, sort=sort, limit=20, with_excerpt=True)
+    return articles, total_articles(db)
+
+def load_article(db, article_id):
+    article = (
+        db.query(Article)
+        .options(selectinload(Article.tags), undefer(Article.content), undefer(Article.summary))
+        .filter(Article.id == article_id)
+        .first()
+    )
+    return article, related_articles(db, article_id) if article else []
+
+def load_related_articles(db, article_id, limit):
+    return [
+        dict(serialize_article(article), score=article["score"])
+        for article in related_articles(db, article_id, limit=limit)
+    ]
+
+def load_tags(db):
+    return db.query(TechTag).order_by(desc(TechTag.popularity_score)).limit(50).all()
+
+def load_stats(db):
+    return read_stats(db)
+
+def load_api_articles(db, params):
+    articles, next_cursor = article_page(db, **params)
+    return [serialize_article(article) for article in articles], next_cursor
+
+def load_user_feed(db, user_id, limit, difficulty_level):
+    articles = get_personal_feed().feed(db, user_id, limit=limit, difficulty_level=difficulty_level)
+    if articles is None:
+        return None
+    return [dict(serialize_article(article), relevance=article["relevance"]) for article in articles]
+
+def load_search_results(db, query, limit, offset):
+    results = search_articles(db, query, limit=limit, offset=offset)
+    return [
+        {
+            "id": result["id"],
+            "title": result["title"],
+            "url": result["url"],
+            "source_site": result["source_site"],
+            "published_at": result["published_at"].isoformat() if result["published_at"] else None,
+            "snippet": result["snippet"],
+            "rank": result["rank"],
+            "tags": result["tags"]
+        }
+        for result in results
+    ]
+
+def serialize_article(article):
+    """一覧用の記事dictをJSONレスポンス用に変換"""
+    return {
+        "id": article["id"],
+        "title": article["title"],
+        "url": article["url"],
+        "author": article["author"],
+        "source_site": article["source_site"],
+        "published_at": article["published_at"].isoformat() if article["published_at"] else None,
+        "scraped_at": article["scraped_at"].isoformat() if article["scraped_at"] else None,
+        "tech_feed_score": article["tech_feed_score"],
+        "difficulty_level": article["difficulty_level"],
+        "is_tutorial": article["is_tutorial"],
+        "tags": article["tags"]
+    }
+
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request, db: Session = Depends(get_db)):
-    """ホームページ - 最新記事一覧"""
+async def home(request: Request, sort: str = "scraped_at"):
+    """ホームページ - 最新記事一覧（sort=score でスコア順）"""
     try:
-        # 最新記事を20件取得
-        articles = db.query(Article).order_by(desc(Article.scraped_at)).limit(20).all()
-        
-        # 統計情報
-        total_articles = db.query(Article).count()
-        
+        # 最新記事20件と統計情報
+        articles, total = await db_runner.run(load_home, sort)
+
         return templates.TemplateResponse("index.html", {
             "request": request,
             "articles": articles,
-            "total_articles": total_articles,
+            "total_articles": total,
             "page_title": "最新記事"
         })
     except Exception as e:
@@ -65,19 +143,20 @@ async def home(request: Request, db: Session = Depends(get_db)):
         })
 
 @app.get("/article/{article_id}", response_class=HTMLResponse)
-async def article_detail(request: Request, article_id: int, db: Session = Depends(get_db)):
+async def article_detail(request: Request, article_id: int):
     """記事詳細ページ"""
     try:
-        article = db.query(Article).filter(Article.id == article_id).first()
+        article, related = await db_runner.run(load_article, article_id)
         if not article:
             return templates.TemplateResponse("error.html", {
                 "request": request,
                 "error": "記事が見つかりません"
             })
-        
+
         return templates.TemplateResponse("article.html", {
             "request": request,
-            "article": article
+            "article": article,
+            "related_articles": related
         })
     except Exception as e:
         return templates.TemplateResponse("error.html", {
@@ -86,11 +165,11 @@ async def article_detail(request: Request, article_id: int, db: Session = Depend
         })
 
 @app.get("/tags", response_class=HTMLResponse)
-async def tags_page(request: Request, db: Session = Depends(get_db)):
+async def tags_page(request: Request):
     """タグ一覧ページ"""
     try:
-        tags = db.query(TechTag).order_by(desc(TechTag.popularity_score)).limit(50).all()
-        
+        tags = await db_runner.run(load_tags)
+
         return templates.TemplateResponse("tags.html", {
             "request": request,
             "tags": tags,
@@ -105,15 +184,11 @@ async def tags_page(request: Request, db: Session = Depends(get_db)):
         })
 
 @app.get("/stats", response_class=HTMLResponse)
-async def stats_page(request: Request, db: Session = Depends(get_db)):
+async def stats_page(request: Request):
     """統計情報ページ"""
     try:
-        stats = {
-            "total_articles": db.query(Article).count(),
-            "total_tags": db.query(TechTag).count(),
-            "sources": db.query(Article.source_site, db.func.count(Article.id)).group_by(Article.source_site).all()
-        }
-        
+        stats = await db_runner.run(load_stats)
+
         return templates.TemplateResponse("stats.html", {
             "request": request,
             "stats": stats,
@@ -127,29 +202,87 @@ async def stats_page(request: Request, db: Session = Depends(get_db)):
             "error": str(e)
         })
 
+@app.get("/search")
+async def search(q: str, limit: int = 20, offset: int = 0):
+    """全文検索（BM25順、スニペット付き）"""
+    try:
+        results = await db_runner.run(load_search_results, q, limit, offset)
+        return {"query": q, "results": results}
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.get("/api/articles")
-async def api_articles(db: Session = Depends(get_db), limit: int = 10):
-    """API: 記事一覧取得"""
+async def api_articles(limit: int = 10,
+                       cursor: Optional[str] = None,
+                       sort: str = "scraped_at",
+                       source_site: Optional[str] = None,
+                       tag: Optional[str] = None,
+                       since: Optional[datetime] = None,
+                       until: Optional[datetime] = None,
+                       is_tutorial: Optional[bool] = None,
+                       difficulty_level: Optional[int] = None,
+                       include_duplicates: bool = False):
+    """API: 記事一覧取得（next_cursor を cursor に渡すと次のページを返す）"""
     try:
-        articles = db.query(Article).order_by(desc(Article.scraped_at)).limit(limit).all()
-        return {
-            "articles": [
-                {
-                    "id": article.id,
-                    "title": article.title,
-                    "url": article.url,
-                    "author": article.author,
-                    "source_site": article.source_site,
-                    "published_at": article.published_at.isoformat() if article.published_at else None,
-                    "scraped_at": article.scraped_at.isoformat() if article.scraped_at else None,
-                    "tags": [tag.name for tag in article.tags] if article.tags else []
-                }
-                for article in articles
-            ]
+        params = {
+            "sort": sort, "limit": limit, "cursor": cursor,
+            "source_site": source_site, "tag": tag, "since": since, "until": until,
+            "is_tutorial": is_tutorial, "difficulty_level": difficulty_level,
+            "include_duplicates": include_duplicates,
         }
+        articles, next_cursor = await db_runner.run(load_api_articles, params)
+        return {"articles": articles, "next_cursor": next_cursor}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/articles/{article_id}/related")
+async def api_related_articles(article_id: int, limit: int = 5):
+    """API: 関連記事（事前計算した類似度順）"""
+    try:
+        articles = await db_runner.run(load_related_articles, article_id, min(max(limit, 1), 20))
+        return {"article_id": article_id, "articles": articles}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/users/{user_id}/feed")
+async def api_user_feed(user_id: int, limit: int = 20, difficulty_level: Optional[int] = None):
+    """API: ユーザーの興味タグ・既読履歴に基づくおすすめ記事（既読記事は除く）"""
+    try:
+        articles = await db_runner.run(load_user_feed, user_id, limit, difficulty_level)
+        if articles is None:
+            return JSONResponse(status_code=404, content={"error": "User not found"})
+        return {"user_id": user_id, "articles": articles}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/api/users/{user_id}/reads")
+async def api_record_read(user_id: int,
+                          article_id: int,
+                          completion_rate: Optional[float] = None,
+                          rating: Optional[int] = None,
+                          reading_time: Optional[int] = None):
+    """API: 既読を記録（同じ記事なら読了率・評価を更新）"""
+    try:
+        record_id = await db_runner.run(record_read, user_id, article_id, completion_rate, rating, reading_time)
+        if record_id is None:
+            return JSONResponse(status_code=404, content={"error": "User or article not found"})
+        return {"id": record_id}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.put("/api/users/{user_id}/interests")
+async def api_set_interests(user_id: int, tags: List[str] = Query(default=[])):
+    """API: 興味タグを置き換える（登録済みのタグのみ）"""
+    try:
+        names = await db_runner.run(set_interests, user_id, tags)
+        if names is None:
+            return JSONResponse(status_code=404, content={"error": "User not found"})
+        return {"user_id": user_id, "tags": names}
     except Exception as e:
         return {"error": str(e)}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)